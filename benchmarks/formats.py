@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# (c) 2005-2010 Divmod, Inc.  See LICENSE file for details
+
+"""
+Measure how fast L{pyflakes.checker.Checker} gets through format strings, on
+a generated module which logs a lot with the same few messages, with the
+format caches of L{pyflakes.formats} on and off.
+"""
+
+import _ast
+import optparse
+
+from pyflakes import formats
+from nodes import countNodes, measure
+
+
+MESSAGES = [
+    'request %s from %s took %.3fs',
+    'cache %(name)s: %(hits)d hits, %(misses)d misses',
+    'retrying %s (attempt %d of %d) after %s',
+    '{0} items left in {1}',
+    '{name} finished with status {status}',
+    '{}: {} -> {}',
+]
+
+
+def loggingSource(functions=1000):
+    """
+    Return the source of a module of functions logging with C{MESSAGES}.
+    """
+    chunks = ['import logging\n', 'log = logging.getLogger(__name__)\n']
+    for i in range(functions):
+        chunks.append('''
+def handle%(i)d(request, cache, queue, name, status):
+    log.debug(%(a)r %% (request, request.host, request.elapsed))
+    log.info(%(b)r %% {'name': name, 'hits': cache.hits,
+                      'misses': cache.misses})
+    log.warning(%(c)r %% (request, 1, 3, status))
+    log.info(%(d)r.format(len(queue), name))
+    log.info(%(e)r.format(name=name, status=status))
+    log.debug(%(f)r.format(name, request, status))
+    log.debug(%(a)r %% (request, request.host, request.elapsed))
+    return %(i)d
+''' % {'i': i, 'a': MESSAGES[0], 'b': MESSAGES[1], 'c': MESSAGES[2],
+       'd': MESSAGES[3], 'e': MESSAGES[4], 'f': MESSAGES[5]})
+    return ''.join(chunks)
+
+
+def main(args=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                      help='take the best of N rounds (default: %default)')
+    options, args = parser.parse_args(args)
+    tree = compile(loggingSource(), 'logging', 'exec', _ast.PyCF_ONLY_AST)
+    nodes = countNodes(tree)
+    caches = [formats.percentFormats, formats.braceFormats]
+    for label, maxSize in [('uncached', 0), ('cached', formats.DEFAULT_SIZE)]:
+        for cache in caches:
+            cache.maxSize = maxSize
+            cache.clear()
+        elapsed = measure([('logging', tree)], options.repeat)
+        print '%s: %d nodes in %.3fs: %.0f nodes/s; hit rate %s' % (
+            label, nodes, elapsed, nodes / elapsed,
+            ', '.join(['%.1f%%' % (cache.hitRate * 100,) for cache in caches]))
+
+
+if __name__ == '__main__':
+    main()
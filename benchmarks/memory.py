@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# (c) 2005-2010 Divmod, Inc.  See LICENSE file for details
+
+"""
+Measure the memory taken by the bindings and messages
+L{pyflakes.checker.Checker} keeps, on a generated module or on the files
+given on the command line.
+"""
+
+import sys
+import _ast
+import resource
+import optparse
+
+from pyflakes import checker
+
+
+def sampleSource(functions=5000):
+    """
+    Return the source of a generated module with many bindings, and a
+    warning for every function.
+    """
+    chunks = ['import os.path, sys\n']
+    for i in range(functions):
+        chunks.append('''
+def f%(i)d(a, b, c=None):
+    x = a + b
+    y, z = x, c
+    for n in range(x):
+        y += n
+    return y + z + undefined%(i)d
+''' % {'i': i})
+    return ''.join(chunks)
+
+
+def sizeOf(obj):
+    """
+    Return the memory taken by C{obj} itself and by its instance
+    dictionary, if it has one.
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main(args=None):
+    parser = optparse.OptionParser(usage='%prog [file ...]')
+    options, args = parser.parse_args(args)
+    if args:
+        sources = [(name, open(name, 'U').read() + '\n') for name in args]
+    else:
+        sources = [('sample.py', sampleSource())]
+    bindings = messages = 0
+    bindingBytes = messageBytes = 0
+    for filename, source in sources:
+        tree = compile(source, filename, 'exec', _ast.PyCF_ONLY_AST)
+        w = checker.Checker(tree, filename)
+        for scope in w.dead_scopes:
+            for binding in scope.itervalues():
+                bindings += 1
+                bindingBytes += sizeOf(binding)
+        for message in w.messages:
+            messages += 1
+            messageBytes += sizeOf(message)
+    print '%d bindings, %.1f bytes each' % (
+        bindings, bindingBytes / float(bindings or 1))
+    print '%d messages, %.1f bytes each' % (
+        messages, messageBytes / float(messages or 1))
+    print 'peak RSS %d kB' % (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# (c) 2005-2010 Divmod, Inc.  See LICENSE file for details
+
+"""
+Measure how fast L{pyflakes.checker.Checker} resolves names, on generated
+modules which do little besides loading and storing them.
+
+C{kernels} resembles numeric code: long arithmetic on locals, arguments and
+a few module globals and builtins.  C{templates} resembles generated code:
+many small functions reading module constants and names from enclosing
+functions.
+"""
+
+import _ast
+import optparse
+
+from nodes import countNodes, measure
+
+
+def kernelSource(functions=300):
+    """
+    Return the source of a module of numeric kernels.
+    """
+    chunks = ['import math\n', 'SCALE = 0.5\n', 'OFFSET = 3\n']
+    for i in range(functions):
+        chunks.append('''
+def kernel%(i)d(xs, ys, n, alpha, beta):
+    acc = 0.0
+    prev = 0.0
+    for i in range(n):
+        x = xs[i]
+        y = ys[i]
+        dx = x - prev
+        dy = y * alpha + beta
+        acc = acc + dx * dy * SCALE - OFFSET
+        acc = acc + math.sqrt(abs(dx * dx + dy * dy)) * alpha
+        if acc > beta:
+            acc = acc - beta * x * y + alpha * dx
+        else:
+            acc = acc + beta * y * x - alpha * dy
+        prev = x + y + dx + dy + acc
+    return min(acc, prev) * max(alpha, beta) + len(xs) + len(ys)
+''' % {'i': i})
+    return ''.join(chunks)
+
+
+def templateSource(functions=1000):
+    """
+    Return the source of a module of generated accessors.
+    """
+    chunks = ['import re\n']
+    for i in range(50):
+        chunks.append('FIELD%d = %r\n' % (i, 'field%d' % (i,)))
+    for i in range(functions):
+        chunks.append('''
+def make%(i)d(record, default=None):
+    key = FIELD%(a)d
+    other = FIELD%(b)d
+    def get(name=key):
+        value = record.get(name, default)
+        if value is None:
+            value = record.get(other, default)
+        if isinstance(value, str) and re.match(FIELD%(c)d, value):
+            return str(value), key, other, record
+        return value, key, other, default
+    return get, key, other, FIELD%(a)d, FIELD%(b)d, FIELD%(c)d
+''' % {'i': i, 'a': i % 50, 'b': (i * 7) % 50, 'c': (i * 13) % 50})
+    return ''.join(chunks)
+
+
+def main(args=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                      help='take the best of N rounds (default: %default)')
+    options, args = parser.parse_args(args)
+    for name, source in [('kernels', kernelSource()),
+                         ('templates', templateSource())]:
+        tree = compile(source, name, 'exec', _ast.PyCF_ONLY_AST)
+        nodes = countNodes(tree)
+        elapsed = measure([(name, tree)], options.repeat)
+        print '%s: %d nodes in %.3fs: %.0f nodes/s' % (
+            name, nodes, elapsed, nodes / elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# (c) 2005-2010 Divmod, Inc.  See LICENSE file for details
+
+"""
+Measure how many AST nodes per second L{pyflakes.checker.Checker} gets
+through, on a generated module or on the files given on the command line.
+
+Each file is parsed once; only checking is timed.
+"""
+
+import os
+import gc
+import _ast
+import optparse
+
+from pyflakes import checker
+
+
+def sampleSource(functions=2000):
+    """
+    Return the source of a module resembling ordinary application code.
+    """
+    chunks = ['"""docstring"""\n', 'from __future__ import division\n',
+              'import os, sys\n']
+    for i in range(functions):
+        chunks.append('''
+class C%(i)d(object):
+    attr = %(i)d
+
+    def method(self, a, b=None, *args, **kw):
+        total = 0
+        for x in range(a):
+            if x %% 2 and b:
+                total += x * self.attr
+            elif x > 10:
+                total -= len(args)
+            else:
+                total = [y + x for y in kw if y]
+        try:
+            os.path.join('a', str(total))
+        except (OSError, ValueError), e:
+            sys.stderr.write('%%s: %%d' %% (e, total))
+        return {'a': total, 'b': lambda q: q + a}
+''' % {'i': i})
+    return ''.join(chunks)
+
+
+def countNodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(checker.iter_child_nodes(node))
+    return count
+
+
+def cpuTime():
+    times = os.times()
+    return times[0] + times[1]
+
+
+def measure(trees, repeat):
+    """
+    Check every tree C{repeat} times and return the best CPU time per round.
+    """
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = cpuTime()
+            for filename, tree in trees:
+                checker.Checker(tree, filename)
+            elapsed = cpuTime() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(args=None):
+    parser = optparse.OptionParser(usage='%prog [options] [file ...]')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                      help='take the best of N rounds (default: %default)')
+    options, args = parser.parse_args(args)
+    if args:
+        sources = [(name, open(name, 'U').read() + '\n') for name in args]
+    else:
+        sources = [('sample.py', sampleSource())]
+    trees = []
+    for filename, source in sources:
+        trees.append(
+            (filename, compile(source, filename, 'exec', _ast.PyCF_ONLY_AST)))
+    nodes = sum([countNodes(tree) for filename, tree in trees])
+    elapsed = measure(trees, options.repeat)
+    print '%d nodes in %.3fs: %.0f nodes/s' % (nodes, elapsed, nodes / elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- test-case-name: pyflakes.test.test_builtins -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+The names every module can use without binding them, for each version of
+Python checked code may be meant for.
+
+These are fixed here rather than taken from the running interpreter, so
+that results do not depend on which interpreter runs pyflakes, or on
+whether it imported C{site}.
+"""
+
+_PYTHON25 = """
+    ArithmeticError AssertionError AttributeError BaseException
+    DeprecationWarning EOFError Ellipsis EnvironmentError Exception False
+    FloatingPointError FutureWarning GeneratorExit IOError ImportError
+    ImportWarning IndentationError IndexError KeyError KeyboardInterrupt
+    LookupError MemoryError NameError None NotImplemented NotImplementedError
+    OSError OverflowError PendingDeprecationWarning ReferenceError
+    RuntimeError RuntimeWarning StandardError StopIteration SyntaxError
+    SyntaxWarning SystemError SystemExit TabError True TypeError
+    UnboundLocalError UnicodeDecodeError UnicodeEncodeError UnicodeError
+    UnicodeTranslateError UnicodeWarning UserWarning ValueError Warning
+    ZeroDivisionError __debug__ __doc__ __import__ __name__ abs all any apply
+    basestring bool buffer callable chr classmethod cmp coerce compile
+    complex copyright credits delattr dict dir divmod enumerate eval execfile
+    exit file filter float frozenset getattr globals hasattr hash help hex id
+    input int intern isinstance issubclass iter len license list locals long
+    map max min object oct open ord pow property quit range raw_input reduce
+    reload repr reversed round set setattr slice sorted staticmethod str sum
+    super tuple type unichr unicode vars xrange zip
+    """.split()
+
+_PYTHON26 = _PYTHON25 + """
+    BufferError BytesWarning __package__ bin bytearray bytes format next
+    print
+    """.split()
+
+_PYTHON27 = _PYTHON26 + """
+    memoryview
+    """.split()
+
+# Globally defined names which are not attributes of the __builtin__ module.
+_MAGIC_GLOBALS = ['__file__', '__builtins__']
+
+#: The builtin names of each version of Python that can be targeted.
+BUILTINS = {
+    '2.5': frozenset(_PYTHON25 + _MAGIC_GLOBALS),
+    '2.6': frozenset(_PYTHON26 + _MAGIC_GLOBALS),
+    '2.7': frozenset(_PYTHON27 + _MAGIC_GLOBALS),
+}
+
+TARGET_VERSIONS = sorted(BUILTINS)
+
+DEFAULT_TARGET = '2.7'
+
+
+def builtinNames(targetVersion=DEFAULT_TARGET, extra=()):
+    """
+    Return the names builtin for C{targetVersion}, along with the names in
+    C{extra}, which code is run with in some other way.
+
+    @rtype: C{frozenset}
+
+    @raise ValueError: If C{targetVersion} is not one of L{TARGET_VERSIONS}.
+    """
+    try:
+        names = BUILTINS[targetVersion]
+    except KeyError:
+        raise ValueError('unknown target version %r (choose from %s)'
+                         % (targetVersion, ', '.join(TARGET_VERSIONS)))
+    if extra:
+        names = names.union(extra)
+    return names
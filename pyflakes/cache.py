@@ -0,0 +1,284 @@
+# -*- test-case-name: pyflakes.test.test_cache -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+A persistent cache of check results, keyed on the content of the source.
+"""
+
+import os
+import sys
+import time
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+import pyflakes
+
+
+# Default cap on the total size of the stored results, in bytes.
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# Files modified this many seconds before they were looked at may still be
+# changing within the timestamp granularity of the file system, so their
+# stat data is not trusted.
+RACY_INTERVAL = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    stat TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_key ON files (key);
+"""
+
+# One connection per database file and process; see L{_connect}.
+_connections = {}
+
+
+def _connect(path):
+    """
+    Return this process' connection to the cache database at C{path},
+    creating the database if needed.
+    """
+    key = (os.getpid(), path)
+    db = _connections.get(key)
+    if db is None:
+        db = sqlite3.connect(path, timeout=60)
+        db.text_factory = str
+        try:
+            # lets worker processes read while the writer holds a transaction
+            db.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError:
+            pass
+        db.executescript(_SCHEMA)
+        _connections[key] = db
+    return db
+
+
+
+def statSignature(path):
+    """
+    Return the modification time in nanoseconds, size and inode number of
+    C{path}, or C{None} if it cannot be stat'ed or was modified too recently
+    for that to identify its content.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    mtime = getattr(st, 'st_mtime_ns', None)
+    if mtime is None:
+        mtime = int(st.st_mtime * 1000000000)
+    if st.st_mtime >= time.time() - RACY_INTERVAL:
+        return None
+    return (mtime, st.st_size, st.st_ino)
+
+
+
+class ResultCache(object):
+    """
+    I store L{pyflakes.scripts.pyflakes.FileResult}s in a single SQLite
+    database, keyed on a hash of the checked source.
+
+    Results are evicted least recently used first once their total size
+    exceeds C{maxSize}.  An index of the L{statSignature} each file had when
+    it was last checked allows L{getByStat} to answer for unchanged files
+    without reading them.  Instances can be pickled to worker processes, which
+    may then look results up; only the process which created the cache
+    should L{record} them.
+
+    @ivar salt: Everything besides the source which influences a result,
+        such as the options in effect.  It is part of every key.
+    """
+
+    def __init__(self, path, maxSize=DEFAULT_MAX_SIZE, salt=()):
+        if sqlite3 is None:
+            raise RuntimeError('the result cache requires sqlite3')
+        self.path = path
+        self.maxSize = maxSize
+        self.salt = repr((pyflakes.__version__, sys.version, salt))
+        self._touched = []
+        self._size = None
+        self._clock = None
+
+
+    def __getstate__(self):
+        return {'path': self.path, 'maxSize': self.maxSize,
+                'salt': self.salt, '_touched': [],
+                '_size': None, '_clock': None}
+
+
+    def _db(self):
+        db = _connect(self.path)
+        if self._clock is None:
+            size, clock = db.execute(
+                'SELECT SUM(size), MAX(used) FROM results').fetchone()
+            self._size = size or 0
+            self._clock = clock or 0
+        return db
+
+
+    def key(self, filename, content):
+        """
+        Return the key the result of checking C{content} is stored under.
+
+        Only the base name of C{filename} is significant, since
+        C{__init__.py} files are checked slightly differently.
+        """
+        isInit = os.path.basename(filename) == '__init__.py'
+        return sha1('%s\0%d\0%s' % (self.salt, isInit, content)).hexdigest()
+
+
+    def blobKey(self, filename, blob):
+        """
+        Return the key the result of checking the git blob named C{blob} is
+        stored under, so that a file git knows to be unchanged can be looked
+        up without reading it.
+        """
+        isInit = os.path.basename(filename) == '__init__.py'
+        return sha1('%s\0%d\0blob %s' % (self.salt, isInit, blob)
+                    ).hexdigest()
+
+
+    def get(self, key, filename):
+        """
+        Return the result stored under C{key}, reported under C{filename}, or
+        C{None} if there is none.
+        """
+        row = _connect(self.path).execute(
+            'SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return self._load(key, str(row[0]), filename)
+
+
+    def _fileKey(self, filename):
+        """
+        Return the key of C{filename} in the stat index, which like result
+        keys depends on the salt.
+        """
+        return sha1('%s\0%s' % (self.salt, os.path.abspath(filename))
+                    ).hexdigest()
+
+
+    def getByStat(self, filename, signature):
+        """
+        Return the result for C{filename} if it was recorded with the same
+        L{statSignature}, or C{None}.
+        """
+        if signature is None:
+            return None
+        row = _connect(self.path).execute(
+            'SELECT files.key, value FROM files '
+            'JOIN results ON results.key = files.key '
+            'WHERE path = ? AND stat = ?',
+            (self._fileKey(filename), repr(signature))).fetchone()
+        if row is None:
+            return None
+        return self._load(row[0], str(row[1]), filename)
+
+
+    def _load(self, key, value, filename):
+        result = pickle.loads(value)
+        result.filename = filename
+        for message in result.messages:
+            message.filename = filename
+        result.cacheKey = key
+        result.cached = True
+        return result
+
+
+    def record(self, result):
+        """
+        Mark a result which came from the cache as recently used, or store a
+        freshly computed one.  Results with a C{stat} signature are entered
+        into the stat index.  Results without a C{cacheKey} and results for
+        files which could not be read or checked in time are ignored.
+        """
+        if (result.cacheKey is None or result.ioError is not None or
+            result.timedOut):
+            return
+        if result.stat is not None:
+            self._db().execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?)',
+                (self._fileKey(result.filename), repr(result.stat),
+                 result.cacheKey))
+        if result.cached:
+            self._touched.append(result.cacheKey)
+            return
+        # the stat data belongs in the index, not with the result
+        stat = result.__dict__.pop('stat', None)
+        try:
+            value = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        finally:
+            result.stat = stat
+        db = self._db()
+        self._clock += 1
+        old = db.execute('SELECT size FROM results WHERE key = ?',
+                         (result.cacheKey,)).fetchone()
+        if old is not None:
+            self._size -= old[0]
+        db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                   (result.cacheKey, sqlite3.Binary(value), len(value),
+                    self._clock))
+        self._size += len(value)
+        if self._size > self.maxSize:
+            self._evict()
+
+
+    def _flushTouched(self):
+        if self._touched:
+            db = self._db()
+            self._clock += 1
+            db.executemany('UPDATE results SET used = ? WHERE key = ?',
+                           [(self._clock, key) for key in self._touched])
+            self._touched = []
+
+
+    def _evict(self):
+        """
+        Remove least recently used results until they fit in three quarters
+        of C{maxSize}, so that eviction does not run on every insertion.
+        """
+        self._flushTouched()
+        db = self._db()
+        excess = self._size - self.maxSize * 3 // 4
+        doomed = []
+        cursor = db.execute('SELECT key, size FROM results ORDER BY used')
+        for key, size in cursor:
+            if excess <= 0:
+                break
+            doomed.append((key,))
+            excess -= size
+            self._size -= size
+        cursor.close()
+        db.executemany('DELETE FROM results WHERE key = ?', doomed)
+        db.executemany('DELETE FROM files WHERE key = ?', doomed)
+
+
+    def commit(self):
+        """
+        Write out everything recorded so far.
+        """
+        self._flushTouched()
+        self._db().commit()
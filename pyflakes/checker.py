@@ -2,15 +2,10 @@
 # (c) 2005-2010 Divmod, Inc.
 # See LICENSE file for details
 
-import __builtin__
 import os.path
 import _ast
-import re
 
-from pyflakes import messages
-
-interpol = re.compile(r'%(\([a-zA-Z0-9_]+\))?[-#0 +]*([0-9]+|[*])?'
-                      r'(\.([0-9]+|[*]))?[hlL]?[diouxXeEfFgGcrs%]')
+from pyflakes import messages, builtins, formats
 
 # utility function to iterate over an AST node's children, adapted
 # from Python 2.6's standard ast module
@@ -42,12 +37,22 @@ class Binding(object):
 
     @ivar used: pair of (L{Scope}, line-number) indicating the scope and
                 line number that this binding was last used
+
+    @ivar inListComp: Whether the binding was made inside a list
+        comprehension.
+
+    @ivar inLoop: Whether the binding was made inside a C{for} loop or a
+        list comprehension.
     """
+    # one is made for every name bound, so keep them small
+    __slots__ = ('name', 'source', 'used', 'inListComp', 'inLoop')
 
     def __init__(self, name, source):
         self.name = name
         self.source = source
         self.used = False
+        self.inListComp = False
+        self.inLoop = False
 
 
     def __str__(self):
@@ -64,6 +69,7 @@ class Binding(object):
 
 class UnBinding(Binding):
     '''Created by the 'del' operator.'''
+    __slots__ = ()
 
 
 
@@ -75,9 +81,13 @@ class Importation(Binding):
         possibly including multiple dotted components.
     @type fullName: C{str}
     """
+    __slots__ = ('fullName',)
+
     def __init__(self, name, source):
         self.fullName = name
-        name = name.split('.')[0]
+        if '.' in name:
+            # share the string with all other bindings of the name
+            name = intern(name.split('.')[0])
         super(Importation, self).__init__(name, source)
 
 
@@ -86,6 +96,7 @@ class Argument(Binding):
     """
     Represents binding a name as an argument.
     """
+    __slots__ = ()
 
 
 
@@ -97,11 +108,16 @@ class Assignment(Binding):
     the checker does not consider assignments in tuple/list unpacking to be
     Assignments, rather it treats them as simple Bindings.
     """
+    __slots__ = ()
 
 
 
 class FunctionDefinition(Binding):
-    is_property = False
+    __slots__ = ('is_property',)
+
+    def __init__(self, name, source, is_property=False):
+        super(FunctionDefinition, self).__init__(name, source)
+        self.is_property = is_property
 
 
 
@@ -119,6 +135,7 @@ class ExportBinding(Binding):
     Names which are imported and not otherwise used but appear in the value of
     C{__all__} will not have an unused import warning reported for them.
     """
+    __slots__ = ()
     def names(self):
         """
         Return a list of the names referenced by this binding.
@@ -133,7 +150,20 @@ class ExportBinding(Binding):
 
 
 class Scope(dict):
+    """
+    A namespace, mapping names to L{Binding}s.
+
+    @ivar enclosing: The scope this one is nested in, or C{None}.  Scopes
+        are never moved, so a scope stands for the whole chain of scopes
+        ending in it.
+
+    @ivar conditional: Once a L{ConditionScope} shadows this scope, a
+        mapping of the names bound in such scopes to how many of them bind
+        each.
+    """
     importStarred = False       # set to True when import * is found
+    enclosing = None
+    conditional = None
 
 
     def __repr__(self):
@@ -146,6 +176,45 @@ class Scope(dict):
     def of_type(self, type):
         return isinstance(self, type)
 
+    #: Return the binding of a name in this scope, or C{None}.
+    lookup = dict.get
+
+    _lookupScopes = None
+    _outerScopes = None
+
+    def lookupScopes(self):
+        """
+        Return the scopes, innermost first, in which names loaded in this
+        scope and not bound in it are looked for: the enclosing function
+        scopes and, last, the global scope.
+
+        The scopes around a scope never change, so this is worked out once.
+        """
+        if self._lookupScopes is None:
+            scopes = []
+            scope = self.enclosing
+            while scope is not None:
+                if scope.enclosing is None or scope.of_type(FunctionScope):
+                    scopes.append(scope)
+                scope = scope.enclosing
+            self._lookupScopes = tuple(scopes)
+        return self._lookupScopes
+
+    def outerScopes(self):
+        """
+        Return the function and module scopes around this one, innermost
+        first.
+        """
+        if self._outerScopes is None:
+            scopes = []
+            scope = self.enclosing
+            while scope is not None:
+                if isinstance(scope, (FunctionScope, ModuleScope)):
+                    scopes.append(scope)
+                scope = scope.enclosing
+            self._outerScopes = tuple(scopes)
+        return self._outerScopes
+
 class ClassScope(Scope):
     pass
 
@@ -162,44 +231,121 @@ class FunctionScope(Scope):
         self.globals = {}
 
 class ConditionScope(Scope):
+    """
+    The bindings made in one branch of a conditional, shadowing the scope
+    the branch is in.
+
+    Branches can nest deeply, so a lookup does not work its way down
+    through every shadowed scope.  All the condition scopes shadowing a
+    real scope count, in C{base.conditional}, how many of them bind each
+    name; a name none of them binds is looked up in the real scope at
+    once.
+
+    @ivar parent: The scope this one shadows.
+
+    @ivar base: The first scope under C{parent} which is not a
+        L{ConditionScope}.
+    """
     #: set of the scope leaves and may be discarded for promotion
     escapes = False
 
     #XXX: maybe handle in the conditions
     def _get_import_starred(self):
-        return self.parent.importStarred
+        return self.base.importStarred
 
     def _set_import_starred(self, value):
-        self.parent.importStarred = value
+        self.base.importStarred = value
 
     importStarred = property(_get_import_starred, _set_import_starred)
 
     def __init__(self, parent):
         super(ConditionScope, self).__init__()
         self.parent = parent
+        if isinstance(parent, ConditionScope):
+            self.base = parent.base
+        else:
+            self.base = parent
+            if parent.conditional is None:
+                parent.conditional = {}
+        self._conditional = self.base.conditional
+
+    def lookup(self, key):
+        if key not in self._conditional:
+            return self.base.get(key)
+        scope = self
+        while isinstance(scope, ConditionScope):
+            binding = dict.get(scope, key)
+            if binding is not None:
+                return binding
+            scope = scope.parent
+        return scope.get(key)
 
     def __getitem__(self, key):
+        binding = self.lookup(key)
+        if binding is None:
+            raise KeyError(key)
+        return binding
+
+    def __setitem__(self, key, value):
+        if not dict.__contains__(self, key):
+            conditional = self._conditional
+            conditional[key] = conditional.get(key, 0) + 1
+        dict.__setitem__(self, key, value)
+
+    def _forget(self, key):
+        conditional = self._conditional
+        if conditional[key] == 1:
+            del conditional[key]
+        else:
+            conditional[key] -= 1
 
-        try:
-            return dict.__getitem__(self, key)
-        except KeyError:
-            return self.parent[key]
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._forget(key)
+
+    def pop(self, key, *default):
+        if dict.__contains__(self, key):
+            self._forget(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._forget(key)
+        return key, value
+
+    def clear(self):
+        for key in self.keys():
+            del self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).iteritems():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if not dict.__contains__(self, key):
+            self[key] = default
+        return dict.__getitem__(self, key)
 
     @property
     def globals(self):
-        return self.parent.globals
+        return self.base.globals
 
 
     def of_type(self, type):
-        return self.parent.of_type(type) or isinstance(self, type)
+        # every scope down to the base is a condition scope
+        return isinstance(self, type) or isinstance(self.base, type)
 
 
 class ModuleScope(Scope):
     pass
 
 
-# Globally defined names which are not attributes of the __builtin__ module.
-_MAGIC_GLOBALS = ['__file__', '__builtins__']
+
+class _Truncated(Exception):
+    """
+    Raised to stop checking once more than L{Checker.maxMessages} messages
+    were found.
+    """
 
 
 
@@ -209,37 +355,200 @@ class Checker(object):
 
     @ivar _deferredFunctions: Tracking list used by L{deferFunction}.  Elements
         of the list are two-tuples.  The first element is the callable passed
-        to L{deferFunction}.  The second element is a copy of the scope stack
+        to L{deferFunction}.  The second element is the state it runs in: the
+        current scope, which leads to all enclosing ones, and the loop depths
         at the time L{deferFunction} was called.
 
     @ivar _deferredAssignments: Similar to C{_deferredFunctions}, but for
         callables which are deferred assignment checks.
+
+    @ivar _handlers: The handler of each node class, as built by
+        L{_nodeHandlers}.
+
+    @ivar _nameHandlers: The method handling names in each expression
+        context.
+
+    @ivar builtIns: The names which are never undefined, by default the
+        builtins of L{pyflakes.builtins.DEFAULT_TARGET}.
+
+    @ivar _parents: A mapping of each node visited to its parent.  The tree
+        itself is never modified, so that it can be shared with other tools
+        or checked again.
+
+    @ivar _subscribers: The methods of plugins subscribed to each node
+        class, as set up by L{_subscribe}.
+
+    @ivar _bindingListeners: The C{bindingAdded} methods of plugins.
+
+    @ivar _scopeListeners: The C{scopePopped} methods of plugins.
+
+    @ivar enabled: The message classes to report, as a container such as a
+        L{pyflakes.messages.Selection}, or C{None} for all of them.  Checks
+        none of whose messages are enabled are not run at all.
+
+    @ivar maxMessages: C{None}, or the number of messages after which
+        checking stops if there are more.
+
+    @ivar truncated: Whether checking stopped early, having found more than
+        C{maxMessages} messages.
     """
 
     nodeDepth = 0
     traceTree = False
-
-    def __init__(self, tree, filename='(none)', traceTree=False):
+    builtIns = builtins.builtinNames()
+
+    # the number of list comprehensions and for loops around the current node
+    _listCompDepth = 0
+    _forDepth = 0
+
+    _subscribers = {}
+    _bindingListeners = _scopeListeners = ()
+
+    enabled = None
+    maxMessages = None
+    truncated = False
+
+    # whether each optional check is run, by default all of them
+    _checkUndefinedNames = _checkUndefinedLocals = True
+    _checkUnusedImports = _checkUnusedVariables = _checkExports = True
+    _checkUnusedRedefinitions = _checkListCompRedefinitions = True
+    _checkRedefinedFunctions = _checkLoopShadowing = True
+    _checkPercentFormats = _checkBraceFormats = True
+    _checkTupleCalls = _checkExceptionReturns = True
+
+    #: The messages each optional check can report, by the attribute saying
+    #: whether it is run.
+    checks = {
+        '_checkUndefinedNames': (messages.UndefinedName,),
+        '_checkUndefinedLocals': (messages.UndefinedLocal,),
+        '_checkUnusedImports': (messages.UnusedImport,),
+        '_checkUnusedVariables': (messages.UnusedVariable,),
+        '_checkExports': (messages.UndefinedExport,),
+        '_checkUnusedRedefinitions': (messages.RedefinedWhileUnused,),
+        '_checkListCompRedefinitions': (messages.RedefinedInListComp,),
+        '_checkRedefinedFunctions': (messages.RedefinedFunction,),
+        '_checkLoopShadowing': (messages.ImportShadowedByLoopVar,),
+        '_checkPercentFormats': (messages.StringFormattingProblem,),
+        '_checkBraceFormats': (messages.StringFormatProblem,),
+        '_checkTupleCalls': (messages.TupleCall,),
+        '_checkExceptionReturns': (messages.ExceptionReturn,),
+    }
+
+    def __init__(self, tree, filename='(none)', traceTree=False,
+                 builtIns=None, plugins=(), enabled=None, maxMessages=None):
+        self._handlers = self._nodeHandlers()
+        if enabled is not None:
+            self.enabled = enabled
+            for name, messageClasses in self.checks.iteritems():
+                if not [cls for cls in messageClasses if cls in enabled]:
+                    setattr(self, name, False)
+            # plugins declaring their messages are left out when none are
+            # enabled
+            plugins = [plugin for plugin in plugins
+                       if [cls for cls in getattr(plugin, 'messages', [None])
+                           if cls is None or cls in enabled]]
+        if plugins:
+            self._subscribe(plugins)
+        # functions rather than bound methods, which would keep the checker
+        # alive through a reference cycle
+        cls = self.__class__
+        self._nameHandlers = {
+            _ast.Load: cls.handleNameLoad.im_func,
+            _ast.AugLoad: cls.handleNameLoad.im_func,
+            _ast.Store: cls.handleNameStore.im_func,
+            _ast.AugStore: cls.handleNameStore.im_func,
+            _ast.Del: cls.handleNameDelete.im_func}
+        self._parents = {}
         self._deferredFunctions = []
         self._deferredAssignments = []
         self.dead_scopes = []
         self.messages = []
         self.filename = filename
-        self.scopeStack = [ModuleScope()]
+        if builtIns is not None:
+            self.builtIns = builtIns
+        self.maxMessages = maxMessages
+        self.scope = moduleScope = ModuleScope()
         self.traceTree = traceTree
+        if traceTree:
+            self.handleNode = self._traceNode
         self.futuresAllowed = True
-        self.handleChildren(tree)
-        self._runDeferred(self._deferredFunctions)
-        # Set _deferredFunctions to None so that deferFunction will fail
-        # noisily if called after we've run through the deferred functions.
-        self._deferredFunctions = None
-        self._runDeferred(self._deferredAssignments)
-        # Set _deferredAssignments to None so that deferAssignment will fail
-        # noisly if called after we've run through the deferred assignments.
-        self._deferredAssignments = None
-        del self.scopeStack[1:]
-        self.popScope()
-        self.check_dead_scopes()
+        moduleLeft = False
+        try:
+            self._notify(tree)
+            self.handleChildren(tree)
+            self._runDeferred(self._deferredFunctions)
+            # Set _deferredFunctions to None so that deferFunction will fail
+            # noisily if called after we've run through the deferred
+            # functions.
+            self._deferredFunctions = None
+            self._runDeferred(self._deferredAssignments)
+            # Set _deferredAssignments to None so that deferAssignment will
+            # fail noisly if called after we've run through the deferred
+            # assignments.
+            self._deferredAssignments = None
+            self.scope = moduleScope
+            self.popScope()
+            moduleLeft = True
+            self.check_dead_scopes()
+        except _Truncated:
+            self.truncated = True
+        finally:
+            if not moduleLeft:
+                self._abandon(moduleScope)
+
+
+    def _abandon(self, moduleScope):
+        """
+        Tell the plugins listening for scopes that the module scope is left
+        although checking stopped early, so that they still forget the file.
+        What they report beyond the message budget is dropped.
+        """
+        for listener in self._scopeListeners:
+            try:
+                listener(self, moduleScope)
+            except _Truncated:
+                self.truncated = True
+
+
+    def _subscribe(self, plugins):
+        """
+        Have the further checks in C{plugins} see the nodes and the scope
+        events they subscribe to, as described in L{pyflakes.plugins}.
+
+        The handler of each node class subscribed to is replaced, for this
+        checker only, by one calling the subscribers first.
+        """
+        subscribers = {}
+        # the tree itself, imported names and parameters have no handler
+        for nodeClass in self._handlers.keys() + [
+                _ast.Module, _ast.alias, _ast.arguments]:
+            name = nodeClass.__name__.upper()
+            methods = [getattr(plugin, name) for plugin in plugins
+                       if hasattr(plugin, name)]
+            if methods:
+                subscribers[nodeClass] = tuple(methods)
+        if subscribers:
+            self._subscribers = subscribers
+            self._handlers = handlers = dict(self._handlers)
+            for nodeClass, methods in subscribers.iteritems():
+                if nodeClass in handlers:
+                    handlers[nodeClass] = _withSubscribers(
+                        handlers[nodeClass], methods)
+        self._bindingListeners = tuple([
+            plugin.bindingAdded for plugin in plugins
+            if hasattr(plugin, 'bindingAdded')])
+        self._scopeListeners = tuple([
+            plugin.scopePopped for plugin in plugins
+            if hasattr(plugin, 'scopePopped')])
+
+
+    def _notify(self, node):
+        """
+        Pass C{node}, which is handled as part of its parent rather than by
+        a handler of its own, to the plugins subscribed to its class.
+        """
+        for method in self._subscribers.get(node.__class__, ()):
+            method(self, node)
 
 
     def deferFunction(self, callable):
@@ -251,7 +560,7 @@ class Checker(object):
         `callable` is called, the scope at the time this is called will be
         restored, however it will contain any new bindings added to it.
         '''
-        self._deferredFunctions.append((callable, self.scopeStack[:]))
+        self._deferredFunctions.append((callable, self._state()))
 
 
     def deferAssignment(self, callable):
@@ -259,28 +568,49 @@ class Checker(object):
         Schedule an assignment handler to be called just after deferred
         function handlers.
         """
-        self._deferredAssignments.append((callable, self.scopeStack[:]))
+        self._deferredAssignments.append((callable, self._state()))
+
+
+    def _state(self):
+        """
+        Return what L{_runDeferred} needs to restore the current position in
+        the tree.
+        """
+        return self.scope, self._listCompDepth, self._forDepth
 
 
     def _runDeferred(self, deferred):
         """
-        Run the callables in C{deferred} using their associated scope stack.
+        Run the callables in C{deferred} using their associated scopes.
         """
-        for handler, scope in deferred:
-            self.scopeStack = scope
+        for handler, state in deferred:
+            self.scope, self._listCompDepth, self._forDepth = state
             handler()
 
 
-    def scope(self):
-        return self.scopeStack[-1]
-    scope = property(scope)
+    def scopeStack(self):
+        """
+        The current scope and those enclosing it, outermost first.
+        """
+        stack = []
+        scope = self.scope
+        while scope is not None:
+            stack.append(scope)
+            scope = scope.enclosing
+        stack.reverse()
+        return stack
+    scopeStack = property(scopeStack)
 
     def popScope(self):
-        scope = self.scopeStack.pop()
+        scope = self.scope
         # dirty hack
         if isinstance(scope, ConditionScope):
-            self.scopeStack.append(scope.parent)
+            self.scope = scope.parent
+        else:
+            self.scope = scope.enclosing
         self.dead_scopes.append(scope)
+        for listener in self._scopeListeners:
+            listener(self, scope)
         return scope
 
 
@@ -289,11 +619,14 @@ class Checker(object):
         Look at scopes which have been fully examined and report names in them
         which were imported but unused.
         """
+        if not (self._checkUnusedImports or self._checkExports):
+            return
         for scope in self.dead_scopes:
             export = isinstance(scope.get('__all__'), ExportBinding)
             if export:
                 all = scope['__all__'].names()
-                if os.path.split(self.filename)[1] != '__init__.py':
+                if (self._checkExports and
+                    os.path.split(self.filename)[1] != '__init__.py'):
                     # Look for possible mistakes in the export list
                     undefined = set(all) - set(scope)
                     for name in undefined:
@@ -304,6 +637,8 @@ class Checker(object):
             else:
                 all = []
 
+            if not self._checkUnusedImports:
+                continue
             # Look for imported names that aren't used.
             for importation in scope.itervalues():
                 if isinstance(importation, Importation):
@@ -314,17 +649,31 @@ class Checker(object):
                             importation.name)
 
 
+    def pushScope(self, scope):
+        scope.enclosing = self.scope
+        self.scope = scope
+
     def pushFunctionScope(self):
-        self.scopeStack.append(FunctionScope())
+        self.pushScope(FunctionScope())
 
     def pushClassScope(self):
-        self.scopeStack.append(ClassScope())
+        self.pushScope(ClassScope())
 
     def pushConditionScope(self):
         #XXX:hack
-        self.scopeStack[-1] = ConditionScope(self.scope)
+        scope = ConditionScope(self.scope)
+        scope.enclosing = self.scope.enclosing
+        self.scope = scope
 
     def report(self, messageClass, *args, **kwargs):
+        if self.enabled is not None and messageClass not in self.enabled:
+            return
+        if (self.maxMessages is not None and
+            len(self.messages) >= self.maxMessages):
+            if self.truncated:
+                # only plugins told the module scope is left get here
+                return
+            raise _Truncated()
         msg = messageClass(self.filename, *args, **kwargs)
         self.messages.append(msg)
 
@@ -341,22 +690,114 @@ class Checker(object):
                (isinstance(node, _ast.Expr) and
                 isinstance(node.value, _ast.Str))
 
+    def _nodeHandlers(cls):
+        """
+        Return a dictionary mapping node classes to the methods of C{cls}
+        handling them, the one named after the class in upper case.
+
+        The table is built once per class, subclasses getting their own, and
+        node classes not found in C{_ast} are added as they are met.
+        """
+        handlers = cls.__dict__.get('_handlerTable')
+        if handlers is None:
+            handlers = {}
+            for nodeClass in vars(_ast).itervalues():
+                if (isinstance(nodeClass, type) and
+                    issubclass(nodeClass, _ast.AST)):
+                    handler = getattr(cls, nodeClass.__name__.upper(), None)
+                    if handler is not None:
+                        handlers[nodeClass] = handler.im_func
+            cls._handlerTable = handlers
+        return handlers
+    _nodeHandlers = classmethod(_nodeHandlers)
+
+
+    def getParent(self, node):
+        """
+        Return the parent of C{node}, which must have been visited, or
+        C{None} for the root of the tree.
+        """
+        return self._parents.get(node)
+
+
+    def _missingHandler(self, nodeClass):
+        handler = getattr(self.__class__, nodeClass.__name__.upper()).im_func
+        self._handlers[nodeClass] = handler
+        return handler
+
+
     def handleNode(self, node, parent):
-        node.parent = parent
-        if self.traceTree:
-            print '  ' * self.nodeDepth + node.__class__.__name__
+        """
+        Handle C{node} and everything below it.
+
+        The tree is walked with a stack of the nodes still to be handled
+        rather than by recursion, so that long chains of expressions do not
+        exhaust the Python stack.  The children of nodes handled by
+        L{handleChildren} are pushed in its stead, leaving out expression
+        contexts and operators, which need no handling.  Other handlers
+        whose last act would be to handle some children return a list of
+        them instead, to be pushed once the handler returns; the rest call
+        L{handleNode} for their children as they go.
+        """
+        handlers = self._handlers
+        parents = self._parents
+        parents[node] = parent
+        # the nodes still to be handled, last first; their parents are
+        # recorded as they are pushed
+        stack = None
+        while True:
+            # once anything but a docstring or import was seen, it stays so
+            if self.futuresAllowed and not \
+                   (isinstance(node, _ast.ImportFrom) or
+                    self.isDocstring(node)):
+                self.futuresAllowed = False
+            try:
+                handler = handlers[node.__class__]
+            except KeyError:
+                handler = self._missingHandler(node.__class__)
+            if handler is _handleChildren:
+                children = _childNodes(node)
+            else:
+                children = handler(self, node)
+            if children:
+                for child in children:
+                    parents[child] = node
+                if len(children) == 1:
+                    # it would be popped straight away
+                    node = children[0]
+                    continue
+                if stack is None:
+                    stack = children[::-1]
+                else:
+                    stack.extend(children[::-1])
+            if not stack:
+                return
+            node = stack.pop()
+
+
+    def _traceNode(self, node, parent):
+        """
+        L{handleNode}, printing the tree as it goes; used when C{traceTree}
+        is set.  The tree is walked recursively.
+        """
+        print '  ' * self.nodeDepth + node.__class__.__name__
         self.nodeDepth += 1
-        if self.futuresAllowed and not \
-               (isinstance(node, _ast.ImportFrom) or self.isDocstring(node)):
-            self.futuresAllowed = False
-        nodeType = node.__class__.__name__.upper()
         try:
-            handler = getattr(self, nodeType)
-            handler(node)
+            self._parents[node] = parent
+            if self.futuresAllowed and not \
+                   (isinstance(node, _ast.ImportFrom) or
+                    self.isDocstring(node)):
+                self.futuresAllowed = False
+            try:
+                handler = self._handlers[node.__class__]
+            except KeyError:
+                handler = self._missingHandler(node.__class__)
+            for child in handler(self, node) or ():
+                self.handleNode(child, node)
         finally:
             self.nodeDepth -= 1
-        if self.traceTree:
-            print '  ' * self.nodeDepth + 'end ' + node.__class__.__name__
+        print '  ' * self.nodeDepth + 'end ' + node.__class__.__name__
+
 
     def ignore(self, node):
         pass
@@ -388,13 +829,13 @@ class Checker(object):
     COMPREHENSION = EXCEPTHANDLER = KEYWORD = handleChildren
 
     def hasParent(self, node, kind):
-        parent = getattr(node, 'parent', None)
+        parent = self._parents.get(node)
         while True:
             if not parent:
                 return False
             elif isinstance(parent, kind):
                 return True
-            parent = getattr(parent, 'parent', None)
+            parent = self._parents.get(parent)
 
     def addBinding(self, node, value, reportRedef=True):
         '''Called when a binding is altered.
@@ -405,17 +846,28 @@ class Checker(object):
         - if `reportRedef` is True (default), rebinding while unused will be
           reported.
         '''
-        if (isinstance(self.scope.get(value.name), FunctionDefinition)
+        if (self._checkRedefinedFunctions
+                    and isinstance(self.scope.get(value.name), FunctionDefinition)
                     and isinstance(value, FunctionDefinition)
                     and not self.scope.get(value.name).is_property
                     and not value.is_property):
             self.report(messages.RedefinedFunction,
                         node, value.name, self.scope[value.name].source.lineno)
 
+        if self._listCompDepth:
+            value.inListComp = value.inLoop = True
+        elif self._forDepth:
+            value.inLoop = True
+
         redefinedWhileUnused = False
 
-        if not isinstance(self.scope, ClassScope):
-            for scope in self.scopeStack[::-1]:
+        # redefinitions in list comprehensions are not reported when they
+        # are of unused imports
+        if ((self._checkUnusedRedefinitions or
+             (self._checkListCompRedefinitions and value.inListComp))
+                and not isinstance(self.scope, ClassScope)):
+            scope = self.scope
+            while scope is not None:
                 existing = scope.get(value.name)
                 if (isinstance(existing, Importation)
                         and not existing.used
@@ -425,13 +877,12 @@ class Checker(object):
 
                     self.report(messages.RedefinedWhileUnused,
                                 node, value.name, scope[value.name].source.lineno)
+                scope = scope.enclosing
 
-        if (not redefinedWhileUnused and
-            self.hasParent(value.source, _ast.ListComp)):
+        if (self._checkListCompRedefinitions and not redefinedWhileUnused
+                and value.inListComp):
             existing = self.scope.get(value.name)
-            if (existing and
-                not self.hasParent(existing.source, (_ast.For, _ast.ListComp))
-                and reportRedef):
+            if existing and not existing.inLoop and reportRedef:
                 self.report(messages.RedefinedInListComp, node, value.name,
                             self.scope[value.name].source.lineno)
 
@@ -445,6 +896,8 @@ class Checker(object):
                 self.report(messages.UndefinedName, node, value.name)
         else:
             self.scope[value.name] = value
+            for listener in self._bindingListeners:
+                listener(self, node, value)
 
     def GLOBAL(self, node):
         """
@@ -453,20 +906,21 @@ class Checker(object):
         if isinstance(self.scope, FunctionScope):
             self.scope.globals.update(dict.fromkeys(node.names))
 
-    def LISTCOMP(self, node):
+    def GENERATOREXP(self, node):
         # handle generators before element
-        for gen in node.generators:
-            self.handleNode(gen, node)
-        self.handleNode(node.elt, node)
+        return node.generators + [node.elt]
+
+    SETCOMP = GENERATOREXP
 
-    GENERATOREXP = SETCOMP = LISTCOMP
+    def LISTCOMP(self, node):
+        self._listCompDepth += 1
+        for child in self.GENERATOREXP(node):
+            self.handleNode(child, node)
+        self._listCompDepth -= 1
 
     # dictionary comprehensions; introduced in Python 2.7
     def DICTCOMP(self, node):
-        for gen in node.generators:
-            self.handleNode(gen, node)
-        self.handleNode(node.key, node)
-        self.handleNode(node.value, node)
+        return node.generators + [node.key, node.value]
 
     def FOR(self, node):
         """
@@ -482,7 +936,8 @@ class Checker(object):
                 for c in iter_child_nodes(n):
                     collectLoopVars(c)
 
-        collectLoopVars(node.target)
+        if self._checkLoopShadowing:
+            collectLoopVars(node.target)
         for varn in vars:
             if (isinstance(self.scope.get(varn), Importation)
                     # unused ones will get an unused import warning
@@ -490,15 +945,14 @@ class Checker(object):
                 self.report(messages.ImportShadowedByLoopVar,
                             node, varn, self.scope[varn].source.lineno)
 
+        self._forDepth += 1
         self.handleChildren(node)
+        self._forDepth -= 1
 
     def BINOP(self, node):
-        if isinstance(node.op, _ast.Mod) and isinstance(node.left, _ast.Str):
-            dictfmt = ('%(' in node.left.s and '%%(' not in node.left.s)
-            nplaces = 0
-            for m in interpol.finditer(node.left.s):
-                if m.group()[-1] != '%':
-                    nplaces += 1 + m.group().count('*')
+        if (isinstance(node.op, _ast.Mod) and isinstance(node.left, _ast.Str)
+                and self._checkPercentFormats):
+            dictfmt, nplaces = formats.percentFormats(node.left.s)
             if isinstance(node.right, _ast.Dict):
                 if not dictfmt:
                     self.report(messages.StringFormattingProblem,
@@ -513,42 +967,32 @@ class Checker(object):
                         if nobjects != nplaces:
                             self.report(messages.StringFormattingProblem,
                                         node, nplaces, nobjects)
-            self.handleNode(node.right, node)
+            return [node.left, node.right]
+        elif isinstance(node.left, _ast.BinOp):
+            # chains of operators nest to the left without limit
+            return [node.left, node.right]
         else:
             self.handleNode(node.left, node)
-            self.handleNode(node.right, node)
+            return [node.right]
 
     def CALL(self, node):
-        if isinstance(node.func, _ast.Tuple):
+        if self._checkTupleCalls and isinstance(node.func, _ast.Tuple):
             self.report(messages.TupleCall, node)
-        self.handleChildren(node)
+        return _childNodes(node)
 
     def ATTRIBUTE(self, node):
-        if isinstance(node.value, _ast.Str) and node.attr == 'format' and \
-           isinstance(node.parent, _ast.Call) and node is node.parent.func:
-            try:
-                num = 0
-                maxnum = -1
-                kwds = set()
-                for lit, fn, fs, conv in node.value.s._formatter_parser():
-                    if lit:
-                        continue
-                    fn = fn.partition('.')[0].partition('[')[0]
-                    if not fn:
-                        num += 1
-                    elif fn.isdigit():
-                        maxnum = max(maxnum, int(fn))
-                    else:
-                        kwds.add(fn)
-            except ValueError, err:
-                self.report(messages.StringFormatProblem,
-                            node, str(err))
+        callnode = self.getParent(node)
+        if self._checkBraceFormats and isinstance(node.value, _ast.Str) and \
+           node.attr == 'format' and isinstance(callnode, _ast.Call) and \
+           node is callnode.func:
+            err, num, maxnum, kwds = formats.braceFormats(node.value.s)
+            if err is not None:
+                self.report(messages.StringFormatProblem, node, err)
             else:
-                callnode = node.parent
                 # can only really check if no *args or **kwds are used
                 if not (callnode.starargs or callnode.kwargs):
-                    nargs = len(node.parent.args)
-                    kwdset = set(kwd.arg for kwd in node.parent.keywords)
+                    nargs = len(callnode.args)
+                    kwdset = set(kwd.arg for kwd in callnode.keywords)
                     if nargs < num:
                         self.report(messages.StringFormatProblem, node,
                                     'not enough positional args (need %s)' % num)
@@ -560,97 +1004,99 @@ class Checker(object):
                     if missing:
                         self.report(messages.StringFormatProblem, node,
                                     'keyword args missing: %s' % ', '.join(missing))
-        else:
-            self.handleNode(node.value, node)
+        return [node.value]
 
     def NAME(self, node):
         """
         Handle occurrence of Name (which can be a load/store/delete access.)
         """
         # Locate the name in locals / function / globals scopes.
-        if isinstance(node.ctx, (_ast.Load, _ast.AugLoad)):
-            # try local scope
-            importStarred = self.scope.importStarred
-            try:
-                self.scope[node.id].used = (self.scope, node)
-            except KeyError:
-                pass
+        try:
+            handler = self._nameHandlers[node.ctx.__class__]
+        except KeyError:
+            # must be a Param context -- this only happens for names in function
+            # arguments, but these aren't dispatched through here
+            raise RuntimeError(
+                "Got impossible expression context: %r" % (node.ctx,))
+        handler(self, node)
+
+
+    def handleNameLoad(self, node):
+        name = node.id
+        scope = self.scope
+        binding = scope.lookup(name)
+        if binding is None:
+            for outer in scope.lookupScopes():
+                binding = outer.lookup(name)
+                if binding is not None:
+                    break
             else:
+                if self._checkUndefinedNames:
+                    self.handleUndefinedName(node)
                 return
+        binding.used = (scope, node)
 
-            # try enclosing function scopes
 
-            for scope in self.scopeStack[-2:0:-1]:
-                importStarred = importStarred or scope.importStarred
-                if not scope.of_type(FunctionScope):
-                    continue
-                try:
-                    scope[node.id].used = (self.scope, node)
-                except KeyError:
-                    pass
-                else:
-                    return
+    def handleUndefinedName(self, node):
+        """
+        Report a name which is bound in none of the scopes it is looked for
+        in, unless it is a builtin or a star import may have bound it.
+        """
+        name = node.id
+        if name in self.builtIns:
+            return
+        scope = self.scope
+        while scope is not None:
+            if scope.importStarred:
+                return
+            scope = scope.enclosing
+        if (os.path.basename(self.filename) == '__init__.py' and
+            name == '__path__'):
+            # the special name __path__ is valid only in packages
+            return
+        self.report(messages.UndefinedName, node, name)
+
+
+    def handleNameStore(self, node):
+        name = node.id
+        scope = self.scope
+        # if the name hasn't already been defined in the current scope
+        if (self._checkUndefinedLocals and isinstance(scope, FunctionScope)
+                and name not in scope and name not in scope.globals):
+            # find the outermost function or module scope above us where
+            # the name was defined and has been accessed already in the
+            # current scope
+            culprit = None
+            for outer in scope.outerScopes():
+                binding = outer.get(name)
+                if (binding is not None and binding.used
+                        and binding.used[0] is scope):
+                    culprit = binding
+            if culprit is not None:
+                # then it's probably a mistake
+                self.report(messages.UndefinedLocal,
+                            culprit.used[1], name, culprit.source.lineno)
+
+        parent = self.getParent(node)
+        if isinstance(parent,
+                      (_ast.For, _ast.comprehension, _ast.Tuple, _ast.List)):
+            binding = Binding(name, node)
+        elif name == '__all__' and isinstance(scope, ModuleScope):
+            binding = ExportBinding(name, parent.value)
+        else:
+            binding = Assignment(name, node)
+        existing = scope.get(name)
+        if existing is not None:
+            binding.used = existing.used
+        self.addBinding(node, binding)
 
-            # try global scope
 
-            importStarred = importStarred or self.scopeStack[0].importStarred
-            try:
-                self.scopeStack[0][node.id].used = (self.scope, node)
-            except KeyError:
-                if ((not hasattr(__builtin__, node.id))
-                        and node.id not in _MAGIC_GLOBALS
-                        and not importStarred):
-                    if (os.path.basename(self.filename) == '__init__.py' and
-                        node.id == '__path__'):
-                        # the special name __path__ is valid only in packages
-                        pass
-                    else:
-                        self.report(messages.UndefinedName, node, node.id)
-        elif isinstance(node.ctx, (_ast.Store, _ast.AugStore)):
-            # if the name hasn't already been defined in the current scope
-            if isinstance(self.scope, FunctionScope) and node.id not in self.scope:
-                # for each function or module scope above us
-                for scope in self.scopeStack[:-1]:
-                    if not isinstance(scope, (FunctionScope, ModuleScope)):
-                        continue
-                    # if the name was defined in that scope, and the name has
-                    # been accessed already in the current scope, and hasn't
-                    # been declared global
-                    if (node.id in scope
-                            and scope[node.id].used
-                            and scope[node.id].used[0] is self.scope
-                            and node.id not in self.scope.globals):
-                        # then it's probably a mistake
-                        self.report(messages.UndefinedLocal,
-                                    scope[node.id].used[1],
-                                    node.id,
-                                    scope[node.id].source.lineno)
-                                    # kevins fork used the source info instead of lineno here,
-                                    # however the message ctor did just revert that
-                        break
-
-            if isinstance(node.parent,
-                          (_ast.For, _ast.comprehension, _ast.Tuple, _ast.List)):
-                binding = Binding(node.id, node)
-            elif (node.id == '__all__' and
-                  isinstance(self.scope, ModuleScope)):
-                binding = ExportBinding(node.id, node.parent.value)
-            else:
-                binding = Assignment(node.id, node)
-            if node.id in self.scope:
-                binding.used = self.scope[node.id].used
-            self.addBinding(node, binding)
-        elif isinstance(node.ctx, _ast.Del):
-            if isinstance(self.scope, FunctionScope) and \
-                   node.id in self.scope.globals:
-                del self.scope.globals[node.id]
-            else:
-                self.addBinding(node, UnBinding(node.id, node))
+    def handleNameDelete(self, node):
+        if isinstance(self.scope, FunctionScope) and \
+               node.id in self.scope.globals:
+            del self.scope.globals[node.id]
         else:
-            # must be a Param context -- this only happens for names in function
-            # arguments, but these aren't dispatched through here
-            raise RuntimeError(
-                "Got impossible expression context: %r" % (node.ctx,))
+            self.addBinding(node, UnBinding(node.id, node))
 
 
     def FUNCTIONDEF(self, node):
@@ -668,29 +1114,32 @@ class Checker(object):
             if getattr(deco, 'attr', None) in ('setter', 'deleter'):
                 is_property = True
 
-        funcdef = FunctionDefinition(node.name, node)
-        funcdef.is_property = is_property
-        self.addBinding(node, funcdef)
+        self.addBinding(node, FunctionDefinition(node.name, node, is_property))
         self.LAMBDA(node)
 
     def LAMBDA(self, node):
+        self._parents[node.args] = node
+        self._notify(node.args)
         for default in node.args.defaults:
             self.handleNode(default, node)
 
         def runFunction():
             args = []
 
-            def addArgs(arglist):
-                for arg in arglist:
-                    if isinstance(arg, _ast.Tuple):
-                        addArgs(arg.elts)
-                    else:
-                        if arg.id in args:
-                            self.report(messages.DuplicateArgument, node, arg.id)
-                        args.append(arg.id)
-
             self.pushFunctionScope()
-            addArgs(node.args.args)
+            # a closure calling itself would keep the checker alive through
+            # a reference cycle, so tuple arguments are unpacked in a loop
+            pending = [(arg, node.args) for arg in node.args.args[::-1]]
+            while pending:
+                arg, parent = pending.pop()
+                self._parents[arg] = parent
+                self._notify(arg)
+                if isinstance(arg, _ast.Tuple):
+                    pending.extend([(elt, arg) for elt in arg.elts[::-1]])
+                else:
+                    if arg.id in args:
+                        self.report(messages.DuplicateArgument, node, arg.id)
+                    args.append(arg.id)
             # vararg/kwarg identifiers are not Name nodes
             if node.args.vararg:
                 args.append(node.args.vararg)
@@ -717,7 +1166,8 @@ class Checker(object):
                         and isinstance(binding, Assignment)):
                         self.report(messages.UnusedVariable,
                                     binding.source, name)
-            self.deferAssignment(checkUnusedAssignments)
+            if self._checkUnusedVariables:
+                self.deferAssignment(checkUnusedAssignments)
             self.popScope()
 
         self.deferFunction(runFunction)
@@ -741,21 +1191,22 @@ class Checker(object):
         self.addBinding(node, Binding(node.name, node))
 
     def ASSIGN(self, node):
-        self.handleNode(node.value, node)
-        for target in node.targets:
-            self.handleNode(target, node)
+        return [node.value] + node.targets
 
     def AUGASSIGN(self, node):
-        # AugAssign is awkward: must set the context explicitly and visit twice,
-        # once with AugLoad context, once with AugStore context
-        node.target.ctx = _ast.AugLoad()
-        self.handleNode(node.target, node)
-        self.handleNode(node.value, node)
-        node.target.ctx = _ast.AugStore()
-        self.handleNode(node.target, node)
+        # AugAssign is awkward: the target is visited twice, first as a load
+        # and then, with the Store context it has, as a store
+        if isinstance(node.target, _ast.Name):
+            self._parents[node.target] = node
+            self.handleNameLoad(node.target)
+        else:
+            self.handleNode(node.target, node)
+        return [node.value, node.target]
 
     def IMPORT(self, node):
         for alias in node.names:
+            self._parents[alias] = node
+            self._notify(alias)
             name = alias.asname or alias.name
             importation = Importation(name, node)
             self.addBinding(node, importation)
@@ -769,6 +1220,8 @@ class Checker(object):
             self.futuresAllowed = False
 
         for alias in node.names:
+            self._parents[alias] = node
+            self._notify(alias)
             if alias.name == '*':
                 self.scope.importStarred = True
                 self.report(messages.ImportStarUsed, node, node.module)
@@ -784,6 +1237,8 @@ class Checker(object):
         if not node.value:
             return
         self.handleNode(node.value, node)
+        if not self._checkExceptionReturns:
+            return
         if isinstance(node.value, _ast.Name):
             name = node.value.id
         elif isinstance(node.value, _ast.Call) and \
@@ -799,47 +1254,19 @@ class Checker(object):
         Handle C{try}-C{except}.  In particular, do not report redefinitions
         when occurring in an "except ImportError" block.
         """
-        self.pushConditionScope()
-        for stmt in node.body:
-            self.handleNode(stmt, node)
-        body_scope = self.popScope()
-
-        handler_scopes = [body_scope]
+        branches = [self.handleBranch(node.body, node)]
         for handler in node.handlers:
+            self._parents[handler] = node
+            self._notify(handler)
             if handler.type:
                 self.handleNode(handler.type, node)
                 if handler.name:
                     self.handleNode(handler.name, node)
-            self.pushConditionScope()
-            for stmt in handler.body:
-                self.handleNode(stmt, node)
-            handler_scopes.append(self.popScope())
-
-        #XXX complicated logic, check
-        valid_scopes = [scope for scope in handler_scopes if not scope.escapes]
-        if valid_scopes:
-            common = set(valid_scopes[0])
-            for scope in valid_scopes[1:]:
-                common.intersection_update(scope)
-            # when the body scope doesnt raise,
-            # its currently the best to consider its names
-            # availiable for the orelse part
-            if not body_scope.escapes:
-                common.update(body_scope)
-
-            for name in common:
-                #XXX: really ok?
-                self.scope[name] = valid_scopes[0].pop(name)
-                for scope in valid_scopes[1:]:
-                    scope.pop(name, None) # might not exist when body is ok
-
-        for scope in valid_scopes:
-            for key, binding in scope.items():
-                if key not in self.scope and not binding.used:
-                    # bubble up all unused variables
-                    # this should rather use the possible flowgraphs
-                    self.scope[key] = binding
-
+            branches.append(self.handleBranch(handler.body, node))
+        # when the body scope doesnt raise,
+        # its currently the best to consider its names
+        # availiable for the orelse part
+        self.mergeBranches(branches, keepAll=branches[0])
 
         for stmt in node.orelse:
             self.handleNode(stmt, node)
@@ -857,6 +1284,11 @@ class Checker(object):
         handle if statements,
         use subscopes, and reconcile them in the parent scope
         special conditions for raising
+
+        A chain of C{elif}s is handled as one statement with many branches,
+        rather than as nested statements, so that long chains do not
+        recurse.  Their bindings are still reconciled as if each C{elif}
+        were nested in the C{else} of the branch before; see L{mergeChain}.
         """
 
         self.handleNode(node.test, node)
@@ -873,38 +1305,199 @@ class Checker(object):
             #XXX: is that semantically valid?
             self.addBinding(node, Binding('channel', node))
 
+        branches = [self.handleBranch(node.body, node)]
+        while len(node.orelse) == 1 and isinstance(node.orelse[0], _ast.If):
+            parent, node = node, node.orelse[0]
+            # the test of an elif runs as part of its branch
+            self.pushConditionScope()
+            self._parents[node] = parent
+            self._notify(node)
+            self.handleNode(node.test, node)
+            for stmt in node.body:
+                self.handleNode(stmt, node)
+            branches.append(self.popScope())
+        branches.append(self.handleBranch(node.orelse, node))
+        self.mergeChain(branches)
 
-        self.pushConditionScope()
-        for stmt in node.body:
-            self.handleNode(stmt, node)
-        body_scope = self.popScope()
 
+    def handleBranch(self, body, node):
+        """
+        Handle the statements in C{body}, one of the branches of C{node}, in
+        a L{ConditionScope} of their own, and return it.
+        """
         self.pushConditionScope()
-        for stmt in node.orelse:
+        for stmt in body:
             self.handleNode(stmt, node)
-        else_scope = self.popScope()
-
-        if body_scope.escapes and else_scope.escapes:
-            pass
-        elif body_scope.escapes:
-            self.scope.update(else_scope)
-        elif else_scope.escapes:
-            self.scope.update(body_scope)
-        else:
-            #XXX: better scheme for unsure bindings
-            common = set(body_scope) & set(else_scope)
-            for key in common:
-                self.scope[key] = body_scope[key]
+        return self.popScope()
 
-            for key, binding in body_scope.items():
-                if key not in self.scope and not binding.used:
-                    #XXX: wrap it?
-                    self.scope[key] = binding
 
-            for key, binding in else_scope.items():
-                if key not in self.scope and not binding.used:
+    def mergeChain(self, branches):
+        """
+        Reconcile the bindings made in C{branches}, those of an C{if}, its
+        C{elif}s and its C{else}, in the current scope.
+
+        Going from the last branch back, each is merged with what the
+        branches after it left, as L{mergePair} would merge them into the
+        C{else} they would be nested in.  Unlike with L{mergeBranches}, a
+        name need not be bound in every branch to count as bound after the
+        chain: it is enough for a branch and what the branches after it left
+        to bind it.
+
+        What the branches left is kept in one of their scopes, along with
+        the names of the used bindings in it, which are dropped unless the
+        branch before binds them too.  Each branch therefore costs what it
+        binds, however long the chain.
+        """
+        merged = branches[-1]
+        used = set([name for name, binding in merged.iteritems()
+                    if binding.used])
+        for body in branches[-2:0:-1]:
+            if body.escapes and merged.escapes:
+                merged = ConditionScope(self.scope)
+                used = set()
+            elif merged.escapes:
+                merged = body
+                used = set([name for name, binding in body.iteritems()
+                            if binding.used])
+            elif not body.escapes:
+                kept = set()
+                for name, binding in body.items():
+                    if name in merged:
+                        merged[name] = binding
+                        del body[name]
+                        used.discard(name)
+                        if binding.used:
+                            kept.add(name)
+                    elif not binding.used:
+                        merged[name] = binding
+                        del body[name]
+                for name in used:
+                    del merged[name]
+                used = kept
+        self.mergePair(branches[0], merged, self.scope)
+
+
+    def mergePair(self, body, orelse, scope):
+        """
+        Reconcile the bindings made in C{body} and C{orelse}, the two
+        branches of an C{if}, in C{scope}.
+
+        If one branch escapes, all bindings of the other are kept.
+        Otherwise a name bound in both gets the binding of C{body}, and that
+        of C{orelse} is dropped, so that an alternative import is not
+        reported as unused when the name is used later.  Other unused
+        bindings are kept too, unless the name is bound in C{scope} already.
+        Kept bindings are moved out of the branches, so that they are
+        reported once.
+        """
+        if body.escapes and orelse.escapes:
+            return
+        if body.escapes or orelse.escapes:
+            if body.escapes:
+                body = orelse
+            scope.update(body)
+            body.clear()
+            return
+        #XXX: better scheme for unsure bindings
+        for name in body.keys():
+            if name in orelse:
+                scope[name] = body.pop(name)
+                del orelse[name]
+        for branch in (body, orelse):
+            for name, binding in branch.items():
+                if name not in scope and not binding.used:
                     #XXX: wrap it?
-                    self.scope[key] = binding
+                    scope[name] = binding
+                    del branch[name]
+
 
+    def mergeBranches(self, branches, keepAll=None):
+        """
+        Reconcile the bindings made in C{branches}, the scopes of code of
+        which at most one part runs, in the current scope.
+
+        A name bound in all branches which don't escape gets the binding of
+        the first of them; if only one branch doesn't escape, or it is
+        C{keepAll}, all names it binds do.  Other unused bindings are kept
+        too, unless the name is bound already.  Kept bindings are moved out
+        of the branches, so that they are looked at once.
 
+        Only the names bound in the branches are looked at, however many
+        there are.
+        """
+        live = [branch for branch in branches if not branch.escapes]
+        if not live:
+            return
+        scope = self.scope
+        if len(live) == 1:
+            keepAll = live[0]
+        elif keepAll is not None and keepAll.escapes:
+            keepAll = None
+
+        #XXX: better scheme for unsure bindings
+        counts = {}
+        for branch in live:
+            for name in branch:
+                counts[name] = counts.get(name, 0) + 1
+        for name, count in counts.iteritems():
+            if count == len(live) or (keepAll is not None and name in keepAll):
+                binding = None
+                for branch in live:
+                    found = branch.pop(name, None)
+                    if binding is None:
+                        binding = found
+                scope[name] = binding
+
+        for branch in live:
+            for name, binding in branch.items():
+                if name not in scope and not binding.used:
+                    # bubble up all unused variables
+                    # this should rather use the possible flowgraphs
+                    scope[name] = binding
+                    del branch[name]
 
+
+_handleChildren = Checker.__dict__['handleChildren']
+
+
+def _withSubscribers(handler, subscribers):
+    """
+    Return a node handler which calls C{subscribers} with the checker and
+    the node, and then C{handler}.
+    """
+    if handler is _handleChildren:
+        def handle(checker, node):
+            for subscriber in subscribers:
+                subscriber(checker, node)
+            return _childNodes(node)
+    else:
+        def handle(checker, node):
+            for subscriber in subscribers:
+                subscriber(checker, node)
+            return handler(checker, node)
+    return handle
+
+
+# the names of the fields holding the nodes below a node, by node class
+_childFields = {}
+
+
+def _childNodes(node, AST=_ast.AST):
+    """
+    Return the nodes below C{node}, other than its expression context and
+    operators, in the order of its fields.
+    """
+    try:
+        fields = _childFields[node.__class__]
+    except KeyError:
+        fields = _childFields[node.__class__] = [
+            name for name in node._fields
+            if name not in ('ctx', 'op', 'ops')]
+    children = []
+    for name in fields:
+        field = getattr(node, name, None)
+        if isinstance(field, AST):
+            children.append(field)
+        elif isinstance(field, list):
+            children.extend(field)
+    return children
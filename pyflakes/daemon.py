@@ -0,0 +1,263 @@
+# -*- test-case-name: pyflakes.test.test_daemon -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+A resident checker which answers requests from I{pyflakes-client} over a
+Unix socket, so that neither interpreter start-up nor importing the checker
+is paid per file.
+
+The daemon process binds the socket and then forks workers which all accept
+connections on it, handling one request at a time.  Dead workers are
+replaced, and each worker is recycled after a number of requests.
+"""
+
+import os
+import sys
+import time
+import errno
+import signal
+import socket
+import optparse
+from StringIO import StringIO
+
+from pyflakes.scripts import client
+script = __import__('pyflakes.scripts.pyflakes').scripts.pyflakes
+parallel = __import__('pyflakes.parallel').parallel
+
+
+def handle(f):
+    """
+    Read one request from the file C{f} and write the response to it.
+    """
+    kind = client.readChunk(f)
+    cwd = client.readChunk(f)
+    out = StringIO()
+    err = StringIO()
+    count = 0
+    os.chdir(cwd)
+    if kind == 'paths':
+        paths = [client.readChunk(f) for i in range(int(client.readChunk(f)))]
+        checkFile = script.FileChecker()
+        for path in script.iterSourcePaths(paths):
+            # problems reading files go to standard output, like checkPath
+            count += checkFile(path).report(out, out)
+    elif kind == 'source':
+        filename = client.readChunk(f)
+        source = client.readChunk(f)
+        count = script.check(source, filename, err, out)
+    else:
+        err.write('pyflakesd: unknown request %r\n' % (kind,))
+        count = 1
+    client.writeChunks(f, [str(count), out.getvalue(), err.getvalue()])
+
+
+
+class _Stop(Exception):
+    """
+    Raised in the daemon process when it is asked to shut down.
+    """
+
+
+
+class Daemon(object):
+    """
+    I bind the socket and keep a number of forked workers serving it.
+
+    @ivar workers: The number of worker processes to keep running.
+    @ivar maxRequests: The number of requests after which a worker exits and
+        is replaced.
+    @ivar timeout: Seconds a worker waits for a client to send its request.
+    """
+    spawning = False
+    stopping = False
+
+    def __init__(self, path, workers, maxRequests=1000, timeout=60):
+        self.path = path
+        self.workers = workers
+        self.maxRequests = maxRequests
+        self.timeout = timeout
+        self.children = set()
+
+
+    def listen(self):
+        """
+        Bind the socket, replacing the socket of a daemon which is gone.  A
+        missing directory for it is made, readable by this user only.
+
+        @raise socket.error: If another daemon is listening already, or the
+            socket could not be made where no other user can replace it.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.mkdir(directory, 0700)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise socket.error(e.errno, 'cannot make %s: %s'
+                                   % (directory, e.strerror))
+        client.checkDirectory(directory)
+        if os.path.lexists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                try:
+                    probe.connect(self.path)
+                except socket.error:
+                    try:
+                        os.unlink(self.path)
+                    except OSError, e:
+                        raise socket.error(e.errno,
+                                           'cannot remove stale %s: %s'
+                                           % (self.path, e.strerror))
+                else:
+                    raise socket.error(errno.EADDRINUSE,
+                                       '%s is in use' % (self.path,))
+            finally:
+                probe.close()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # only this user may talk to the daemon
+        umask = os.umask(077)
+        try:
+            self.sock.bind(self.path)
+        finally:
+            os.umask(umask)
+        self.sock.listen(128)
+
+
+    def serve(self):
+        """
+        Handle requests in a worker process until C{maxRequests} are done.
+        """
+        for i in xrange(self.maxRequests):
+            try:
+                conn, address = self.sock.accept()
+            except socket.error, e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            try:
+                # don't let a client which stops talking hold on to a worker
+                conn.settimeout(self.timeout)
+                f = conn.makefile('rwb', 65536)
+                try:
+                    handle(f)
+                except (EOFError, socket.error):
+                    pass
+                f.close()
+            finally:
+                conn.close()
+
+
+    def spawn(self):
+        """
+        Fork a worker.  A request to stop which arrives meanwhile is only
+        acted upon once the worker is in C{children}, so that it is not left
+        behind.
+        """
+        self.spawning = True
+        try:
+            pid = os.fork()
+            if pid == 0:
+                status = 0
+                try:
+                    try:
+                        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                        signal.signal(signal.SIGINT, signal.SIG_DFL)
+                        if not self.stopping:
+                            self.serve()
+                    except:
+                        status = 1
+                finally:
+                    os._exit(status)
+            self.children.add(pid)
+        finally:
+            self.spawning = False
+        if self.stopping:
+            raise _Stop()
+
+
+    def stop(self, *args):
+        """
+        Signal handler which makes L{run} shut down.  Raising, rather than
+        setting a flag, cannot be missed while L{run} is about to block in
+        C{os.wait}.
+        """
+        if self.spawning:
+            self.stopping = True
+        else:
+            raise _Stop()
+
+
+    def run(self):
+        """
+        Keep C{workers} processes serving until told to stop.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            try:
+                while True:
+                    while len(self.children) < self.workers:
+                        self.spawn()
+                    try:
+                        pid, status = os.wait()
+                    except OSError, e:
+                        if e.args[0] != errno.EINTR:
+                            raise
+                    else:
+                        self.children.discard(pid)
+            except _Stop:
+                pass
+        finally:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            self.reap()
+            self.sock.close()
+            os.unlink(self.path)
+
+
+    def reap(self, grace=5):
+        """
+        Terminate all workers.  SIGTERM is sent repeatedly, since a worker
+        which has only just been forked may lose it, and after C{grace}
+        seconds SIGKILL is used instead.
+        """
+        deadline = time.time() + grace
+        while self.children:
+            if time.time() < deadline:
+                sig = signal.SIGTERM
+            else:
+                sig = signal.SIGKILL
+            for pid in list(self.children):
+                try:
+                    os.kill(pid, sig)
+                except OSError:
+                    self.children.discard(pid)
+            time.sleep(0.01)
+            for pid in list(self.children):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        self.children.discard(pid)
+                except OSError:
+                    self.children.discard(pid)
+
+
+
+def main(args=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option(
+        '--socket', metavar='PATH', default=client.defaultSocketPath(),
+        help='listen on the Unix socket PATH (default: %default)')
+    parser.add_option(
+        '-j', '--workers', type='int', metavar='N',
+        default=min(4, parallel.availableCPUs()),
+        help='keep N worker processes (default: %default)')
+    options, args = parser.parse_args(args)
+    if args:
+        parser.error('unexpected arguments')
+    daemon = Daemon(options.socket, max(1, options.workers))
+    try:
+        daemon.listen()
+    except socket.error, e:
+        print >> sys.stderr, 'pyflakesd: %s' % (e.args[-1],)
+        raise SystemExit(1)
+    daemon.run()
@@ -0,0 +1,142 @@
+# -*- test-case-name: pyflakes.test.test_formats -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Analysis of the placeholders in format string literals, remembered per
+process since the same few strings tend to recur throughout a code base.
+"""
+
+import re
+
+interpol = re.compile(r'%(\([a-zA-Z0-9_]+\))?[-#0 +]*([0-9]+|[*])?'
+                      r'(\.([0-9]+|[*]))?[hlL]?[diouxXeEfFgGcrs%]')
+
+DEFAULT_SIZE = 4096
+
+
+class FormatCache(object):
+    """
+    I remember what C{analyze} returned for the most recently used format
+    strings.
+
+    @ivar maxSize: How many strings are remembered at most.  Once there are
+        that many, the least recently used half is forgotten.  With C{0}
+        nothing is remembered.
+
+    @ivar hits: How many lookups were answered from memory.
+
+    @ivar misses: How many lookups called C{analyze}.
+    """
+
+    def __init__(self, analyze, maxSize=DEFAULT_SIZE):
+        self.analyze = analyze
+        self.maxSize = maxSize
+        self.clear()
+
+
+    def __call__(self, text):
+        """
+        Return the analysis of C{text}.
+        """
+        self._clock += 1
+        entry = self._entries.get(text)
+        if entry is not None:
+            self.hits += 1
+            entry[0] = self._clock
+            return entry[1]
+        self.misses += 1
+        summary = self.analyze(text)
+        if self.maxSize:
+            while len(self._entries) >= self.maxSize:
+                self._evict()
+            self._entries[text] = [self._clock, summary]
+        return summary
+
+
+    def _evict(self):
+        """
+        Forget the least recently used half of the strings, which keeps the
+        cost of finding them low when new strings keep coming.
+        """
+        uses = sorted([entry[0] for entry in self._entries.itervalues()])
+        last = uses[max(1, len(uses) // 2) - 1]
+        for text, entry in self._entries.items():
+            if entry[0] <= last:
+                del self._entries[text]
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def hitRate(self):
+        """
+        The fraction of lookups answered from memory, or C{0.0} if there
+        were none.
+        """
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return float(self.hits) / lookups
+    hitRate = property(hitRate)
+
+
+    def clear(self):
+        """
+        Forget all strings and reset the statistics.
+        """
+        self._entries = {}
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+
+
+
+def analyzePercent(text):
+    """
+    Summarize the placeholders of the C{%} format string C{text}.
+
+    @return: Whether the placeholders take their values from a mapping, and
+        how many values they take from a tuple otherwise.
+    """
+    dictStyle = '%(' in text and '%%(' not in text
+    count = 0
+    for match in interpol.finditer(text):
+        if match.group()[-1] != '%':
+            count += 1 + match.group().count('*')
+    return dictStyle, count
+
+
+def analyzeBrace(text):
+    """
+    Summarize the replacement fields of the C{str.format} string C{text}.
+
+    @return: The problem parsing it, or C{None}; the number of automatically
+        numbered fields; the highest explicit field number, or C{-1}; and
+        the C{frozenset} of keyword field names.
+    """
+    count = 0
+    maxIndex = -1
+    keywords = set()
+    try:
+        for literal, name, spec, conversion in text._formatter_parser():
+            if literal:
+                continue
+            name = name.partition('.')[0].partition('[')[0]
+            if not name:
+                count += 1
+            elif name.isdigit():
+                maxIndex = max(maxIndex, int(name))
+            else:
+                keywords.add(name)
+    except ValueError, e:
+        return str(e), 0, -1, frozenset()
+    return None, count, maxIndex, frozenset(keywords)
+
+
+#: The analyses of C{%} format strings made in this process.
+percentFormats = FormatCache(analyzePercent)
+
+#: The analyses of C{str.format} strings made in this process.
+braceFormats = FormatCache(analyzeBrace)
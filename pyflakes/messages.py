@@ -1,11 +1,21 @@
 # (c) 2005 Divmod, Inc.  See LICENSE file for details
 
 class Message(object):
+    """
+    A problem found in checked code.
+
+    @cvar code: The short code the kind of problem is selected by, which is
+        never changed once given out, or C{None}.
+    """
     message = ''
-    message_args = ()
+    code = None
     use_column = True
     names = ()
 
+    # there can be very many of these, so keep them small; subclasses must
+    # declare empty __slots__ as well
+    __slots__ = ('filename', 'lineno', 'col', 'message_args')
+
     def __init__(self, filename, source_node, *message_args):
         self.filename = filename
         self.lineno = source_node.lineno
@@ -18,60 +28,90 @@ class Message(object):
     def __str__(self):
         return '%s:%s: %s' % (self.filename, self.lineno, self.message % self.message_args)
 
+    # slots need help to be pickled with the oldest protocols
+
+    def __getstate__(self):
+        return (self.filename, self.lineno, self.col, self.message_args)
+
+    def __setstate__(self, state):
+        self.filename, self.lineno, self.col, self.message_args = state
+
 
 class UnusedImport(Message):
     message = '%r imported but unused'
+    code = 'F401'
+    __slots__ = ()
     names = ('name',)
     use_column = False
 
 
 class RedefinedWhileUnused(Message):
     message = 'redefinition of unused %r from line %r'
+    code = 'F811'
+    __slots__ = ()
     names = 'name', 'orig_lineno'
 
 
 class RedefinedInListComp(Message):
     message = 'list comprehension redefines %r from line %r'
+    code = 'F812'
+    __slots__ = ()
     names = 'name', 'orig_lineno'
 
 
 class ImportShadowedByLoopVar(Message):
     message = 'import %r from line %r shadowed by loop variable'
+    code = 'F402'
+    __slots__ = ()
     names = 'name', 'orig_lineno'
 
 
 class ImportStarUsed(Message):
     message = "'from %s import *' used; unable to detect undefined names"
+    code = 'F403'
+    __slots__ = ()
     names = ('modname',)
 
 
 class UndefinedName(Message):
     message = 'undefined name %r'
+    code = 'F821'
+    __slots__ = ()
     names = ('name',)
 
 
 class UndefinedExport(Message):
     message = 'undefined name %r in __all__'
+    code = 'F822'
+    __slots__ = ()
     names = ('name',)
 
 
 class UndefinedLocal(Message):
     message = "local variable %r (defined in enclosing scope on line %r) referenced before assignment"
+    code = 'F823'
+    __slots__ = ()
     names = 'name', 'orig_lineno'
 
 
 class DuplicateArgument(Message):
     message = 'duplicate argument %r in function definition'
+    code = 'F831'
+    __slots__ = ()
     names = ('name',)
 
 
 class RedefinedFunction(Message):
     message = 'redefinition of function %r from line %r'
+    code = 'F813'
+    __slots__ = ()
     names = 'name', 'orig_lineno'
 
 
 class LateFutureImport(Message):
     message = 'future import(s) %r after other statements'
+    code = 'F404'
+    __slots__ = ()
     names = ('names',)
 
 
@@ -82,16 +122,22 @@ class UnusedVariable(Message):
     """
 
     message = 'local variable %r is assigned to but never used'
+    code = 'F841'
+    __slots__ = ()
     names = ('names',)
 
 
 class StringFormattingProblem(Message):
     message = 'string formatting arguments: should have %s, has %s'
+    code = 'F501'
+    __slots__ = ()
     names = 'nshould', 'nhave'
 
 
 class StringFormatProblem(Message):
     message = 'string.format(): %s'
+    code = 'F521'
+    __slots__ = ()
     names = ('msg',)
 
 
@@ -101,6 +147,8 @@ class ExceptionReturn(Message):
     """
 
     message = 'exception %r is returned'
+    code = 'F901'
+    __slots__ = ()
     names = ('name',)
 
 
@@ -110,3 +158,60 @@ class TupleCall(Message):
     """
 
     message = 'calling tuple literal, forgot a comma?'
+    code = 'F902'
+    __slots__ = ()
+
+
+def messageClasses():
+    """
+    Return the classes of the messages pyflakes itself reports, ordered by
+    code.
+    """
+    classes = [value for value in globals().values()
+               if isinstance(value, type) and issubclass(value, Message)
+               and value.code is not None]
+    classes.sort(key=lambda cls: cls.code)
+    return classes
+
+
+class Selection(object):
+    """
+    A choice of the messages to report, made with selectors which are either
+    the name of a message class or a prefix of the codes of message classes,
+    such as C{'UnusedImport'}, C{'F401'} or C{'F4'}.
+
+    A message class is in the selection if a selector in C{select} matches
+    it, or C{select} is empty, and no selector in C{ignore} does.
+    """
+
+    def __init__(self, select=(), ignore=()):
+        self.select = tuple(select)
+        self.ignore = tuple(ignore)
+        self._included = {}
+
+    def _matches(self, selectors, messageClass):
+        for selector in selectors:
+            if selector == messageClass.__name__:
+                return True
+            if messageClass.code and messageClass.code.startswith(selector):
+                return True
+        return False
+
+    def __contains__(self, messageClass):
+        try:
+            return self._included[messageClass]
+        except KeyError:
+            included = ((not self.select or
+                         self._matches(self.select, messageClass)) and
+                        not self._matches(self.ignore, messageClass))
+            self._included[messageClass] = included
+            return included
+
+    def unknown(self, classes):
+        """
+        Return the selectors which match none of the message classes
+        C{classes}.
+        """
+        return [selector for selector in self.select + self.ignore
+                if not [cls for cls in classes
+                        if self._matches([selector], cls)]]
@@ -0,0 +1,318 @@
+# -*- test-case-name: pyflakes.test.test_parallel -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Helpers for spreading the checking of many files over several processes.
+"""
+
+import os
+import time
+import errno
+import select
+from collections import deque
+from itertools import chain, islice, imap
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+def _parseCPUList(text):
+    """
+    Count the CPUs in a kernel CPU list such as C{"0-3,8,10-11"}.
+    """
+    count = 0
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            low, high = part.split('-', 1)
+            count += int(high) - int(low) + 1
+        else:
+            count += 1
+    return count
+
+
+def _affinityCPUs():
+    """
+    Return the number of CPUs in this process' scheduler affinity mask, or
+    C{None} if it cannot be determined.
+    """
+    try:
+        status = open('/proc/self/status')
+    except IOError:
+        return None
+    try:
+        for line in status:
+            if line.startswith('Cpus_allowed_list:'):
+                return _parseCPUList(line.split(':', 1)[1]) or None
+    finally:
+        status.close()
+    return None
+
+
+def _readFirstLine(path):
+    try:
+        f = open(path)
+    except IOError:
+        return None
+    try:
+        return f.readline().strip()
+    finally:
+        f.close()
+
+
+def _quotaCPUs(quota, period):
+    """
+    Turn a CFS quota and period into a whole number of CPUs, or C{None} if
+    there is no quota.
+    """
+    try:
+        quota, period = int(quota), int(period)
+    except (TypeError, ValueError):
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, -(-quota // period))
+
+
+def _cgroupCPUs(root='/sys/fs/cgroup'):
+    """
+    Return the number of CPUs the cgroup CPU controller lets this process
+    use, or C{None} if it is not limited.
+    """
+    # cgroup v2 keeps "<quota> <period>" (or "max <period>") in cpu.max
+    line = _readFirstLine(os.path.join(root, 'cpu.max'))
+    if line:
+        fields = line.split()
+        if len(fields) == 2 and fields[0] != 'max':
+            return _quotaCPUs(fields[0], fields[1])
+        return None
+    # cgroup v1 splits them over two files
+    for controller in ('cpu', 'cpu,cpuacct', 'cpuacct,cpu'):
+        base = os.path.join(root, controller)
+        quota = _readFirstLine(os.path.join(base, 'cpu.cfs_quota_us'))
+        if quota is not None:
+            period = _readFirstLine(os.path.join(base, 'cpu.cfs_period_us'))
+            return _quotaCPUs(quota, period)
+    return None
+
+
+def availableCPUs():
+    """
+    Return the number of CPUs this process can actually make use of.
+
+    This is the machine's CPU count, narrowed by the scheduler affinity mask
+    and by any cgroup CPU quota, so that containers limited to a few CPUs do
+    not start one process per CPU of the host.
+    """
+    count = None
+    if multiprocessing is not None:
+        try:
+            count = multiprocessing.cpu_count()
+        except NotImplementedError:
+            pass
+    for limit in (_affinityCPUs(), _cgroupCPUs()):
+        if limit is not None and (count is None or limit < count):
+            count = limit
+    return max(1, count or 1)
+
+
+def _mapChunk(function, items):
+    return [function(item) for item in items]
+
+
+def _serve(function, connection):
+    """
+    Call C{function} on the items received over C{connection} with their
+    index, sending back each index with whether the call succeeded and its
+    result or exception, until C{None} is received.
+    """
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        index, item = task
+        try:
+            outcome = (True, function(item))
+        except Exception, e:
+            outcome = (False, e)
+        connection.send((index, outcome))
+
+
+
+class _Worker(object):
+    """
+    A process calling a function on one item at a time, for
+    L{_imapWithTimeout}.
+
+    @ivar task: C{None} while idle, otherwise the index of the item being
+        handled, the item, and when it was handed over.
+    """
+
+    def __init__(self, function):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve,
+                                               args=(function, child))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.task = None
+
+
+    def submit(self, index, item):
+        self.connection.send((index, item))
+        self.task = (index, item, time.time())
+
+
+    def receive(self):
+        """
+        Return the index of the item handled and its outcome.
+
+        @raise RuntimeError: If the process died instead.
+        """
+        try:
+            index, outcome = self.connection.recv()
+        except EOFError:
+            raise RuntimeError('worker %d died while handling %r'
+                               % (self.process.pid, self.task[1]))
+        self.task = None
+        return index, outcome
+
+
+    def stop(self):
+        self.connection.send(None)
+        self.process.join()
+        self.connection.close()
+
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+
+def _imapWithTimeout(function, iterator, jobs, window, timeout, onTimeout):
+    """
+    L{imapOrdered} with a C{timeout}, each worker being a process of its
+    own, so that a stuck one can be replaced without disturbing the others.
+    """
+    workers = [_Worker(function) for i in range(jobs)]
+    try:
+        # outcomes of items not yet yielded, by index
+        outcomes = {}
+        submitted = yielded = 0
+        exhausted = False
+        while True:
+            for worker in workers:
+                if (worker.task is None and not exhausted and
+                    submitted - yielded < jobs * window):
+                    try:
+                        item = iterator.next()
+                    except StopIteration:
+                        exhausted = True
+                    else:
+                        worker.submit(submitted, item)
+                        submitted += 1
+            if yielded in outcomes:
+                succeeded, value = outcomes.pop(yielded)
+                yielded += 1
+                if not succeeded:
+                    raise value
+                yield value
+                continue
+            if exhausted and yielded == submitted:
+                break
+            busy = [worker for worker in workers if worker.task is not None]
+            deadline = min([worker.task[2] for worker in busy]) + timeout
+            try:
+                ready = select.select([worker.connection for worker in busy],
+                                      [], [], max(0, deadline - time.time()))[0]
+            except select.error, e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                ready = []
+            for worker in busy:
+                if worker.connection in ready:
+                    index, outcome = worker.receive()
+                    outcomes[index] = outcome
+                elif worker.task[2] + timeout <= time.time():
+                    index, item, started = worker.task
+                    outcomes[index] = (
+                        True, onTimeout(item, time.time() - started))
+                    worker.kill()
+                    workers[workers.index(worker)] = _Worker(function)
+    except:
+        for worker in workers:
+            worker.kill()
+        raise
+    for worker in workers:
+        worker.stop()
+
+
+def imapOrdered(function, iterable, jobs, chunksize=8, window=4,
+                timeout=None, onTimeout=None):
+    """
+    Like C{itertools.imap}, but spread the calls over up to C{jobs} worker
+    processes.  Results are yielded in the order of C{iterable}, each as soon
+    as it and all results before it are available.
+
+    Items are handed to the workers C{chunksize} at a time, and no more than
+    C{window} chunks per worker are taken from C{iterable} ahead of the
+    results consumed so far.  Memory use is therefore bounded however long
+    C{iterable} is and however slowly the results are consumed.
+
+    With a C{timeout}, each worker is handed one item at a time, and a
+    worker still busy with an item C{timeout} seconds after it was handed
+    over is taken to be stuck.  C{onTimeout(item, elapsed)} stands in for
+    the result of that item, and that worker alone is replaced by a new one.
+    Timeouts need C{select} to work on pipes, as it does on POSIX systems.
+
+    Closing the generator before it is exhausted terminates the workers,
+    abandoning the items they were busy with.
+
+    C{function} and the items of C{iterable} must be picklable.  When
+    multiprocessing is unavailable, C{jobs} is less than two or there is at
+    most one item, everything runs in the current process instead, and
+    C{timeout} does not apply.
+    """
+    iterator = iter(iterable)
+    head = []
+    if multiprocessing is not None and jobs >= 2:
+        head = list(islice(iterator, jobs))
+    if len(head) < 2:
+        for result in imap(function, chain(head, iterator)):
+            yield result
+        return
+
+    jobs = min(jobs, len(head))
+    iterator = chain(head, iterator)
+    if timeout is not None:
+        for result in _imapWithTimeout(function, iterator, jobs, window,
+                                       timeout, onTimeout):
+            yield result
+        return
+    pool = multiprocessing.Pool(jobs)
+    try:
+        pending = deque()
+        while True:
+            chunk = list(islice(iterator, chunksize))
+            if chunk:
+                pending.append(
+                    pool.apply_async(_mapChunk, (function, chunk)))
+            # hand out whatever is done without waiting, unless the window
+            # is full or nothing is left to submit
+            while pending and (pending[0].ready() or not chunk or
+                               len(pending) >= jobs * window):
+                for result in pending.popleft().get():
+                    yield result
+            if not chunk:
+                break
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    pool.join()
@@ -0,0 +1,127 @@
+# -*- test-case-name: pyflakes.test.test_plugins -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Loading further checks to be run by L{pyflakes.checker.Checker} in the same
+walk of the tree as its own.
+
+A plugin is any object.  The checker looks at it for:
+
+  - methods named after node classes in upper case, like the checker's own
+    handlers, such as C{CALL} or C{FUNCTIONDEF}.  Each is called with the
+    checker and every node of that class, before the checker handles the
+    node; C{MODULE} is called with the tree itself, before anything else.
+    The node's parent is available from
+    L{getParent<pyflakes.checker.Checker.getParent>}.  Expression contexts
+    and operators, such as C{Load} or C{Add}, are never passed on.  The
+    parameters of a function, its C{arguments} included, are passed on
+    along with its body.
+
+  - C{bindingAdded(checker, node, binding)}, called whenever the statement
+    C{node} added C{binding} to the current scope.
+
+  - C{scopePopped(checker, scope)}, called whenever C{scope} has been left.
+    The module scope is left last, once everything else was checked, or
+    once checking stops early, as when too many messages were found.
+
+  - C{messages}, the message classes the plugin reports.  When none of them
+    are L{enabled<pyflakes.checker.Checker.enabled>}, the plugin is not run.
+
+Problems are reported with L{report<pyflakes.checker.Checker.report>}, using
+L{pyflakes.messages.Message} subclasses of the plugin's own.  Node classes
+which no plugin subscribes to are handled exactly as without plugins.
+
+A plugin loaded by name serves every checker in its process, so whatever
+it keeps about the file being checked should be reset when the module
+scope is popped.
+
+Cached results are kept apart by the L{pluginVersion} of each plugin: the
+C{__version__} of the module defining it or, failing that, the source of
+that module.
+"""
+
+import os
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+_loaded = {}
+
+
+def _importModule(name):
+    """
+    Import the module holding the plugin class C{name} and return it along
+    with the name of the class.
+
+    @raise ValueError: If there is no such module.
+    """
+    moduleName, dot, className = name.rpartition('.')
+    if not moduleName:
+        raise ValueError('plugin %r is not given as module.Class' % (name,))
+    try:
+        module = __import__(moduleName, {}, {}, [className])
+    except ImportError, e:
+        raise ValueError('cannot import plugin %r: %s' % (name, e))
+    return module, className
+
+
+def loadPlugin(name):
+    """
+    Import the module holding the plugin class C{name}, given as a dotted
+    name such as C{'house.checks.LoggingPlugin'}, and return an instance of
+    the class.
+
+    @raise ValueError: If there is no such class.
+    """
+    module, className = _importModule(name)
+    try:
+        pluginClass = getattr(module, className)
+    except AttributeError:
+        raise ValueError('module %r has no plugin %r'
+                         % (module.__name__, className))
+    return pluginClass()
+
+
+def loadPlugins(names):
+    """
+    Return the instances of the plugin classes C{names}, in order, as
+    L{loadPlugin} does.  Each class is instantiated once per process.
+
+    @rtype: C{tuple}
+    """
+    plugins = []
+    for name in names:
+        plugin = _loaded.get(name)
+        if plugin is None:
+            plugin = _loaded[name] = loadPlugin(name)
+        plugins.append(plugin)
+    return tuple(plugins)
+
+
+def pluginVersion(name):
+    """
+    Return what changes whenever the plugin class C{name} may check
+    differently: the C{__version__} of its module if it has one, or else a
+    hash of the module's source.  C{None} is returned for a module without a
+    source file.
+
+    @raise ValueError: If the module cannot be imported.
+    """
+    module, className = _importModule(name)
+    version = getattr(module, '__version__', None)
+    if version is not None:
+        return str(version)
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return None
+    base, ext = os.path.splitext(path)
+    if ext in ('.pyc', '.pyo') and os.path.exists(base + '.py'):
+        path = base + '.py'
+    try:
+        source = open(path, 'rb').read()
+    except IOError:
+        return None
+    return sha1(source).hexdigest()
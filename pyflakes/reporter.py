@@ -0,0 +1,114 @@
+# -*- test-case-name: pyflakes.test.test_reporter -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Writing the results of many checks out efficiently.
+"""
+
+import sys
+import time
+import threading
+
+
+class BufferedStream(object):
+    """
+    A file-like object collecting what is written to it and passing it on to
+    C{stream} in large chunks.
+
+    @ivar size: The number of bytes which, once collected, are written out.
+    """
+    softspace = 0
+
+    def __init__(self, stream, size=64 * 1024):
+        self.stream = stream
+        self.size = size
+        self._chunks = []
+        self._length = 0
+
+
+    def write(self, data):
+        self._chunks.append(data)
+        self._length += len(data)
+        if self._length >= self.size:
+            self.flush()
+
+
+    def flush(self):
+        if self._chunks:
+            self.stream.write(''.join(self._chunks))
+            self._chunks = []
+            self._length = 0
+        self.stream.flush()
+
+
+
+class Reporter(object):
+    """
+    I print L{pyflakes.scripts.pyflakes.FileResult}s as they are handed to
+    me, buffering the output so that it reaches slow consumers in a few
+    large writes rather than one per line.
+
+    Whatever is buffered is written out at least every C{interval} seconds,
+    even while no result arrives, so progress stays visible during long
+    runs.  This is done by a thread started with the first report, which
+    L{close} stops.
+    """
+
+    def __init__(self, stdout=None, stderr=None, size=64 * 1024, interval=1.0):
+        self.stdout = BufferedStream(stdout or sys.stdout, size)
+        if stderr is None or stderr is stdout:
+            # keep both kinds of output in order
+            self.stderr = self.stdout
+        else:
+            self.stderr = BufferedStream(stderr, size)
+        self.interval = interval
+        self.count = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+
+
+    def report(self, result):
+        """
+        Print C{result}, returning its number of warnings.
+        """
+        self._lock.acquire()
+        try:
+            if self._flusher is None and not self._closed.isSet():
+                self._flusher = threading.Thread(target=self._flushEvery)
+                self._flusher.setDaemon(True)
+                self._flusher.start()
+            count = result.report(self.stdout, self.stderr)
+            self.count += count
+        finally:
+            self._lock.release()
+        return count
+
+
+    def _flushEvery(self):
+        while True:
+            self._closed.wait(self.interval)
+            if self._closed.isSet():
+                return
+            self.flush()
+
+
+    def flush(self):
+        self._lock.acquire()
+        try:
+            self.stdout.flush()
+            if self.stderr is not self.stdout:
+                self.stderr.flush()
+        finally:
+            self._lock.release()
+
+
+    def close(self):
+        """
+        Stop flushing periodically, and write out whatever is buffered.
+        """
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
@@ -0,0 +1,190 @@
+"""
+Implementation of the I{pyflakes-client} tool, which has a running
+I{pyflakesd} check files so that it does not have to import the checker
+itself.
+
+This module is imported on every invocation, so it deliberately imports
+nothing beyond a few standard modules.
+"""
+
+import os
+import sys
+import stat
+import socket
+import struct
+
+
+def defaultSocketPath():
+    """
+    Return the path of the socket the daemon listens on unless told
+    otherwise: C{$PYFLAKES_SOCKET}, or a socket in C{$XDG_RUNTIME_DIR} or in
+    a directory of this user's own in the temporary directory.
+    """
+    path = os.environ.get('PYFLAKES_SOCKET')
+    if path:
+        return path
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'pyflakes.sock')
+    return os.path.join('/tmp', 'pyflakes-%d' % (os.getuid(),),
+                        'pyflakes.sock')
+
+
+
+class UnsafeSocket(socket.error):
+    """
+    Raised when the socket to talk to the daemon over may belong to another
+    user.
+    """
+
+
+
+def checkDirectory(path):
+    """
+    Make sure no other user can replace what is in the directory C{path}: it
+    must belong to this user or to root, and only be writable by others if
+    it is sticky, like C{/tmp}.
+
+    @raise UnsafeSocket: If it is not so.
+    """
+    info = os.stat(path)
+    if (info.st_uid not in (os.getuid(), 0) or
+        (info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and
+         not info.st_mode & stat.S_ISVTX)):
+        raise UnsafeSocket('%s may be written to by other users' % (path,))
+
+
+def checkSocket(path):
+    """
+    Make sure the socket at C{path} was made by this user, in a directory
+    where no other user can replace it.
+
+    @raise UnsafeSocket: If it is not so.
+    @raise socket.error: If there is no socket.
+    """
+    try:
+        info = os.lstat(path)
+    except OSError, e:
+        raise socket.error(e.errno, e.strerror)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise UnsafeSocket('%s is not a socket of this user' % (path,))
+    checkDirectory(os.path.dirname(os.path.abspath(path)))
+
+
+# the option for the credentials of the peer of a Unix socket, on Linux
+_SO_PEERCRED = getattr(socket, 'SO_PEERCRED',
+                       sys.platform.startswith('linux') and 17 or None)
+
+
+def checkPeer(sock):
+    """
+    Make sure the process at the other end of the connected Unix socket
+    C{sock} runs as this user, where the system tells.
+
+    @raise UnsafeSocket: If it does not.
+    """
+    if _SO_PEERCRED is None:
+        return
+    credentials = sock.getsockopt(socket.SOL_SOCKET, _SO_PEERCRED,
+                                  struct.calcsize('3i'))
+    pid, uid, gid = struct.unpack('3i', credentials)
+    if uid != os.getuid():
+        raise UnsafeSocket('the daemon runs as another user')
+
+
+# The protocol is a sequence of length-prefixed chunks in each direction.  A
+# request is the kind ('paths' or 'source'), the working directory and then
+# either the number of paths followed by the paths, or a file name followed
+# by the source.  The response is the number of warnings, the text for
+# standard output and the text for standard error.
+
+def writeChunks(f, chunks):
+    f.write(''.join(['%d\n%s' % (len(chunk), chunk) for chunk in chunks]))
+    f.flush()
+
+
+def readChunk(f):
+    """
+    Read one chunk from C{f}, raising C{EOFError} if the peer went away.
+    """
+    header = f.readline()
+    if not header.endswith('\n'):
+        raise EOFError()
+    size = int(header)
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError()
+    return data
+
+
+def request(chunks, path=None):
+    """
+    Send the request made of C{chunks} to the daemon listening at C{path},
+    returning the number of warnings and the texts for standard output and
+    standard error.
+
+    @raise UnsafeSocket: If the daemon may be another user's.
+    @raise socket.error: If there is no daemon to talk to.
+    """
+    path = path or defaultSocketPath()
+    checkSocket(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        checkPeer(sock)
+        f = sock.makefile('rwb', 65536)
+        writeChunks(f, chunks)
+        count = int(readChunk(f))
+        return count, readChunk(f), readChunk(f)
+    finally:
+        sock.close()
+
+
+def checkPaths(paths, path=None):
+    return request(['paths', os.getcwd(), str(len(paths))] + list(paths),
+                   path)
+
+
+def checkSource(source, filename, path=None):
+    return request(['source', os.getcwd(), filename, source], path)
+
+
+def _paths(args):
+    """
+    Return the paths among C{args}, or C{None} if there are options.
+    """
+    for i, arg in enumerate(args):
+        if arg == '--':
+            return args[:i] + args[i + 1:]
+        if arg.startswith('-') and arg != '-':
+            return None
+    return args
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    paths = _paths(args)
+    source = None
+    try:
+        if paths is None:
+            # the daemon checks with the default options only, so that the
+            # outcome does not depend on whether it is running
+            raise EOFError()
+        if paths:
+            count, out, err = checkPaths(paths)
+        else:
+            source = sys.stdin.read()
+            count, out, err = checkSource(source, '<stdin>')
+    except (socket.error, EOFError), e:
+        if isinstance(e, UnsafeSocket):
+            sys.stderr.write('pyflakes-client: not using the daemon: %s\n'
+                             % (e.args[0],))
+        # no daemon; do the work ourselves
+        script = __import__('pyflakes.scripts.pyflakes').scripts.pyflakes
+        if source is None:
+            script.main(args)
+        raise SystemExit(script.check(source, '<stdin>') > 0)
+    sys.stdout.write(out)
+    sys.stderr.write(err)
+    raise SystemExit(count > 0)
@@ -1,28 +1,144 @@
-
 """
 Implementation of the command-line I{pyflakes} tool.
 """
 
 import sys
 import os
+import time
 import _ast
+import optparse
 
 checker = __import__('pyflakes.checker').checker
+parallel = __import__('pyflakes.parallel').parallel
+cache = __import__('pyflakes.cache').cache
+watch = __import__('pyflakes.watch').watch
+reporter = __import__('pyflakes.reporter').reporter
+vcs = __import__('pyflakes.vcs').vcs
+walk = __import__('pyflakes.walk').walk
+builtins = __import__('pyflakes.builtins').builtins
+watchdog = __import__('pyflakes.watchdog').watchdog
+messages = __import__('pyflakes.messages').messages
+plugins = __import__('pyflakes.plugins').plugins
+formats = __import__('pyflakes.formats').formats
+
+
+class FileResult(object):
+    """
+    The outcome of checking the source of a single file.
+
+    @ivar filename: The name the source is reported under.
+    @type filename: C{str}
+
+    @ivar messages: The L{pyflakes.messages.Message} instances found, sorted
+        by line number.
+    @type messages: C{list}
+
+    @ivar syntaxError: C{None}, or a four-tuple of the message, line number,
+        column offset and source line of the syntax error which prevented the
+        source from being checked.  The source line is C{None} if the source
+        could not be decoded.
+
+    @ivar ioError: C{None}, or the reason the file could not be read.
+    @type ioError: C{str}
+
+    @ivar cacheKey: C{None}, or the key of this result in a
+        L{pyflakes.cache.ResultCache}.
+
+    @ivar cached: Whether this result was taken from a cache rather than
+        computed.
+
+    @ivar stat: C{None}, or the L{pyflakes.cache.statSignature} of the file
+        just before it was read, to be entered into the stat index.
+
+    @ivar elapsed: The seconds it took to produce this result.
+    @type elapsed: C{float}
+
+    @ivar truncated: C{None}, or the number of messages after which checking
+        stopped because there were more.
+
+    @ivar timedOut: Whether checking was given up on for taking too long, in
+        which case C{elapsed} is how long it had taken.
+    """
+    syntaxError = None
+    ioError = None
+    cacheKey = None
+    cached = False
+    stat = None
+    elapsed = 0.0
+    truncated = None
+    timedOut = False
 
-def check(codeString, filename, stderr=sys.stderr):
+    def __init__(self, filename, messages=()):
+        self.filename = filename
+        self.messages = list(messages)
+
+
+    def count(self):
+        """
+        The number of warnings this result accounts for; a file which could
+        not be read, parsed or checked in time counts as one.
+        """
+        if (self.syntaxError is not None or self.ioError is not None or
+            self.timedOut):
+            return 1
+        return len(self.messages)
+    count = property(count)
+
+
+    def report(self, stdout=None, stderr=None):
+        """
+        Print this result, warnings to C{stdout} and problems which prevented
+        checking to C{stderr}.
+
+        @return: The number of warnings emitted.
+        @rtype: C{int}
+        """
+        if self.ioError is not None:
+            print >> stderr, "%s: %s" % (self.filename, self.ioError)
+        elif self.timedOut:
+            print >> stderr, "%s: timed out after %.1fs" % (
+                self.filename, self.elapsed)
+        elif self.syntaxError is not None:
+            msg, lineno, offset, line = self.syntaxError
+            if line is None:
+                print >> stderr, "%s: problem decoding source" % (
+                    self.filename, )
+            else:
+                print >> stderr, '%s:%d: %s' % (self.filename, lineno, msg)
+                print >> stderr, line
+
+                if offset is not None:
+                    print >> stderr, " " * offset, "^"
+        else:
+            for warning in self.messages:
+                print >> stdout, warning
+            if self.truncated is not None:
+                print >> stdout, "%s: more than %d messages, stopped" % (
+                    self.filename, self.truncated)
+        return self.count
+
+
+
+def _checkSource(codeString, filename, builtIns=None, extraChecks=(),
+                 enabled=None, maxMessages=None):
     """
     Check the Python source given by C{codeString} for flakes.
 
-    @param codeString: The Python source to check.
-    @type codeString: C{str}
+    @param builtIns: The names to consider builtin, or C{None} for the
+        default ones.
 
-    @param filename: The name of the file the source came from, used to report
-        errors.
-    @type filename: C{str}
+    @param extraChecks: The plugins, as described in L{pyflakes.plugins}, to
+        run along with the checker.
 
-    @return: The number of warnings emitted.
-    @rtype: C{int}
+    @param enabled: The message classes to report, or C{None} for all.
+
+    @param maxMessages: C{None}, or the number of messages after which to
+        stop checking if there are more.
+
+    @return: The outcome of the check.
+    @rtype: L{FileResult}
     """
+    result = FileResult(filename)
     # First, compile into an AST and handle syntax errors.
     try:
         try:
@@ -48,28 +164,231 @@ def check(codeString, filename, stderr=sys.stderr):
             # Avoid using msg, since for the only known case, it contains a
             # bogus message that claims the encoding the file declared was
             # unknown.
-            print >> stderr, "%s: problem decoding source" % (filename, )
+            line = None
         else:
             line = codeString.splitlines()[lineno-1].rstrip()
 
             if offset is not None:
                 offset = offset - (len(text) - len(line))
 
-            print >> stderr, '%s:%d: %s' % (filename, lineno, msg)
-            print >> stderr, line
-
-            if offset is not None:
-                print >> stderr, " " * offset, "^"
-
-        return 1
+        result.syntaxError = (msg, lineno, offset, line)
     else:
         # Okay, it's syntactically valid.  Now check it.
-        w = checker.Checker(tree, filename)
+        w = checker.Checker(tree, filename, builtIns=builtIns,
+                            plugins=extraChecks, enabled=enabled,
+                            maxMessages=maxMessages)
         w.messages.sort(lambda a, b: cmp(a.lineno, b.lineno))
         for warning in w.messages:
             warning.lineno -= lnooffset
-            print warning
-        return len(w.messages)
+        result.messages = w.messages
+        if w.truncated:
+            result.truncated = maxMessages
+    return result
+
+
+def check(codeString, filename, stderr=sys.stderr, stdout=None,
+          builtIns=None, extraChecks=(), enabled=None, maxMessages=None):
+    """
+    Check the Python source given by C{codeString} for flakes.
+
+    @param codeString: The Python source to check.
+    @type codeString: C{str}
+
+    @param filename: The name of the file the source came from, used to report
+        errors.
+    @type filename: C{str}
+
+    @param builtIns: The names to consider builtin, or C{None} for the
+        default ones.
+
+    @param extraChecks: The plugins, as described in L{pyflakes.plugins}, to
+        run along with the checker.
+
+    @param enabled: The message classes to report, or C{None} for all.
+
+    @param maxMessages: C{None}, or the number of messages after which to
+        stop checking if there are more.
+
+    @return: The number of warnings emitted.
+    @rtype: C{int}
+    """
+    return _checkSource(codeString, filename, builtIns, extraChecks,
+                        enabled, maxMessages).report(stdout, stderr)
+
+
+class FileChecker(object):
+    """
+    I check files or sources, one per call, producing L{FileResult}s.
+
+    Instances are picklable so that they can be handed to worker processes.
+
+    @ivar cache: C{None}, or a L{pyflakes.cache.ResultCache} to look results
+        up in before checking.  Fresh results still have to be
+        L{recorded<pyflakes.cache.ResultCache.record>} in it by the caller.
+
+    @ivar incremental: If true, files whose stat data is unchanged since
+        their result was recorded are not read at all.
+
+    @ivar builtIns: The names to consider builtin, or C{None} for the
+        default ones.  When there is a cache, they must be part of its salt.
+
+    @ivar pluginNames: The names of the plugin classes to run along with the
+        checker, loaded by L{pyflakes.plugins.loadPlugins} in the process
+        checking.  When there is a cache, they must be part of its salt.
+
+    @ivar enabled: The message classes to report, or C{None} for all.  When
+        there is a cache, they must be part of its salt.
+
+    @ivar maxMessages: C{None}, or the number of messages after which to
+        stop checking a file if there are more.  When there is a cache, it
+        must be part of its salt.
+
+    @ivar timeout: C{None}, or the number of seconds after which to give up
+        on checking a file, as far as L{pyflakes.watchdog.callWithTimeout}
+        can.
+    """
+
+    def __init__(self, cache=None, incremental=False, builtIns=None,
+                 pluginNames=(), enabled=None, maxMessages=None, timeout=None):
+        self.cache = cache
+        self.incremental = incremental
+        self.builtIns = builtIns
+        self.pluginNames = tuple(pluginNames)
+        self.enabled = enabled
+        self.maxMessages = maxMessages
+        self.timeout = timeout
+
+
+    def __call__(self, item):
+        """
+        Check C{item}, either the path of a file, a C{(filename, source)}
+        pair or a L{pyflakes.vcs.IndexedFile}, and record how long that took.
+
+        @rtype: L{FileResult}
+        """
+        start = time.time()
+        try:
+            if self.timeout is None:
+                result = self.checkItem(item)
+            else:
+                result = watchdog.callWithTimeout(self.timeout,
+                                                  self.checkItem, item)
+        except watchdog.Timeout:
+            # it may have struck while the format caches were being updated;
+            # plugins were told the module scope is left by the checker
+            formats.percentFormats.clear()
+            formats.braceFormats.clear()
+            result = self.timedOut(item, time.time() - start)
+        result.elapsed = time.time() - start
+        return result
+
+
+    def checkItem(self, item):
+        """
+        Check C{item}, as L{__call__} does, without a time limit.
+        """
+        if isinstance(item, tuple):
+            return self.checkSource(*item)
+        elif isinstance(item, vcs.IndexedFile):
+            return self.checkIndexed(item)
+        else:
+            return self.checkFile(item)
+
+
+    def timedOut(self, item, elapsed):
+        """
+        Return the result of C{item} given up on after C{elapsed} seconds.
+        """
+        if isinstance(item, tuple):
+            filename = item[0]
+        elif isinstance(item, vcs.IndexedFile):
+            filename = item.path
+        else:
+            filename = item
+        result = FileResult(filename)
+        result.timedOut = True
+        result.elapsed = elapsed
+        return result
+
+
+    def checkFile(self, filename):
+        """
+        Read and check the file at C{filename}.
+        """
+        signature = None
+        if self.cache is not None and self.incremental:
+            signature = cache.statSignature(filename)
+            result = self.cache.getByStat(filename, signature)
+            if result is not None:
+                return result
+        try:
+            content = open(filename, 'U').read() + '\n'
+        except IOError, msg:
+            result = FileResult(filename)
+            result.ioError = msg.args[1]
+            return result
+        result = self.checkSource(filename, content)
+        result.stat = signature
+        return result
+
+
+    def checkIndexed(self, entry):
+        """
+        Check the file C{entry} describes.  If git vouches for its content,
+        the result is looked up by blob without reading the file.
+        """
+        if self.cache is None or entry.blob is None:
+            return self.checkFile(entry.path)
+        key = self.cache.blobKey(entry.path, entry.blob)
+        result = self.cache.get(key, entry.path)
+        if result is None:
+            result = self.checkFile(entry.path)
+            result.cacheKey = key
+            result.cached = False
+        return result
+
+
+    def checkSource(self, filename, source):
+        """
+        Check C{source}, reporting it as coming from C{filename}.
+        """
+        extraChecks = plugins.loadPlugins(self.pluginNames)
+        if self.cache is None:
+            return _checkSource(source, filename, self.builtIns, extraChecks,
+                                self.enabled, self.maxMessages)
+        key = self.cache.key(filename, source)
+        result = self.cache.get(key, filename)
+        if result is None:
+            result = _checkSource(source, filename, self.builtIns,
+                                  extraChecks, self.enabled, self.maxMessages)
+            result.cacheKey = key
+        return result
+
+
+
+def check_many(items, jobs=1, checkFile=None):
+    """
+    Check many sources, lazily yielding a L{FileResult} for each, in order.
+
+    @param items: An iterable of paths of files to check, or of
+        C{(filename, source)} pairs.
+
+    @param jobs: The number of processes to check with.  With more than
+        one, results for later items may be computed ahead of time, but are
+        still yielded in order.
+
+    @param checkFile: The L{FileChecker} to use, a default one if C{None}.
+        With a C{timeout}, workers still busy with a file well after it are
+        replaced.
+    """
+    if checkFile is None:
+        checkFile = FileChecker()
+    if checkFile.timeout is None:
+        return parallel.imapOrdered(checkFile, items, jobs)
+    # workers are given the time to give up by themselves first
+    return parallel.imapOrdered(checkFile, items, jobs,
+                                timeout=checkFile.timeout * 2 + 1,
+                                onTimeout=checkFile.timedOut)
 
 
 def checkPath(filename, stderr=None):
@@ -78,27 +397,248 @@ def checkPath(filename, stderr=None):
 
     @return: the number of warnings printed
     """
+    return FileChecker()(filename).report(stderr=stderr)
+
+
+_defaultExclude = walk.compileExclude(walk.DEFAULT_EXCLUDE)
+
+
+def iterSourcePaths(paths, exclude=_defaultExclude):
+    """
+    Yield the Python files named by C{paths}, descending into directories, in
+    the order they are checked.
+
+    @param exclude: A predicate from L{pyflakes.walk.compileExclude} for the
+        files and directories below C{paths} to leave out.  Paths given
+        explicitly are never excluded.
+    """
+    for arg in paths:
+        if os.path.isdir(arg):
+            for dirpath, filenames in walk.walk(arg, exclude):
+                for filename in filenames:
+                    if filename.endswith('.py'):
+                        yield os.path.join(dirpath, filename)
+        else:
+            yield arg
+
+
+def _makeParser():
+    parser = optparse.OptionParser(usage='%prog [options] [path ...]')
+    parser.add_option(
+        '-j', '--jobs', type='int', metavar='N',
+        help='check files using N processes '
+             '(default: the number of usable CPUs)')
+    parser.add_option(
+        '--cache', metavar='FILE',
+        help='keep the results for unchanged sources in the database FILE')
+    parser.add_option(
+        '--cache-size', type='int', metavar='MB',
+        default=cache.DEFAULT_MAX_SIZE // (1024 * 1024),
+        help='evict the least recently used cached results once they take '
+             'up more than MB megabytes (default: %default)')
+    parser.add_option(
+        '--incremental', action='store_true', default=False,
+        help='do not even read files whose size, modification time and '
+             'inode are unchanged since they were cached (requires --cache)')
+    parser.add_option(
+        '--watch', action='store_true', default=False,
+        help='keep running, and whenever files change re-check them and '
+             'report warnings which appeared (+) or went away (-)')
+    parser.add_option(
+        '--exclude', metavar='PATTERNS',
+        default=','.join(walk.DEFAULT_EXCLUDE),
+        help='comma-separated glob patterns of files and directories not to '
+             'check or descend into (default: %default)')
+    parser.add_option(
+        '--extend-exclude', metavar='PATTERNS', default='',
+        help='comma-separated glob patterns to exclude in addition to those '
+             'of --exclude')
+    parser.add_option(
+        '--git', action='store_true', default=False,
+        help='check the Python files tracked by git below the current '
+             'directory or the paths given, and use the blob hashes in the '
+             'index as cache keys for unmodified files')
+    parser.add_option(
+        '--diff', metavar='REV',
+        help='only check the Python files changed in the git working tree '
+             'since revision REV, and only report warnings on changed lines; '
+             'paths given restrict the diff')
+    parser.add_option(
+        '--target-version', metavar='VERSION', type='choice',
+        choices=builtins.TARGET_VERSIONS, default=builtins.DEFAULT_TARGET,
+        help='the version of Python whose builtins the checked code may use, '
+             'one of %s (default: %%default)'
+             % (', '.join(builtins.TARGET_VERSIONS),))
+    parser.add_option(
+        '--builtins', metavar='NAMES', default='',
+        help='comma-separated names to consider builtin in addition to '
+             'those of the target version')
+    parser.add_option(
+        '--plugin', metavar='CLASS', action='append', default=[],
+        help='also run the checks of the plugin class CLASS, given by its '
+             'dotted name; may be repeated')
+    parser.add_option(
+        '--select', metavar='MESSAGES', default='',
+        help='comma-separated codes, code prefixes or class names of the only '
+             'messages to report; other checks are not run')
+    parser.add_option(
+        '--ignore', metavar='MESSAGES', default='',
+        help='comma-separated codes, code prefixes or class names of '
+             'messages not to report; their checks are not run')
+    parser.add_option(
+        '--list-messages', action='store_true', default=False,
+        help='list the code and class name of every message and exit')
+    parser.add_option(
+        '--fail-fast', action='store_true', default=False,
+        help='stop at the first file with warnings, without checking the '
+             'rest')
+    parser.add_option(
+        '--max-messages-per-file', type='int', metavar='N',
+        help='stop checking a file once it has more than N warnings')
+    parser.add_option(
+        '--timeout', type='float', metavar='SECONDS',
+        help='give up on checking a file after SECONDS, reporting it as '
+             'timed out, and replace workers stuck for longer')
+    return parser
+
+
+def _splitList(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _resultOptions(options):
+    """
+    Return the options which influence the result of checking a file, along
+    with the L{version<plugins.pluginVersion>} of each plugin, for use as
+    part of a cache key.
+    """
+    return (('target-version', options.target_version),
+            ('builtins', tuple(sorted(set(_splitList(options.builtins))))),
+            ('plugins', tuple([(name, plugins.pluginVersion(name))
+                               for name in options.plugin])),
+            ('select', tuple(sorted(set(_splitList(options.select))))),
+            ('ignore', tuple(sorted(set(_splitList(options.ignore))))),
+            ('max-messages-per-file', options.max_messages_per_file))
+
+
+def _watch(paths, checkFile, resultCache, exclude):
+    """
+    Check C{paths} and then keep re-checking them as they change, until
+    interrupted.
+    """
+    record = None
+    if resultCache is not None:
+        def record(result):
+            resultCache.record(result)
+            resultCache.commit()
+    watcher = watch.Watcher(checkFile, record=record)
     try:
-        content = open(filename, 'U').read() + '\n'
-    except IOError, msg:
-        print >> stderr, "%s: %s" % (filename, msg.args[1])
-        return 1
-    return check(content, filename, stderr=stderr)
+        watcher.run(paths, watch.makeObserver(
+            paths, lambda paths: iterSourcePaths(paths, exclude),
+            exclude=exclude))
+    except KeyboardInterrupt:
+        pass
+    raise SystemExit(watcher.count() > 0)
 
 
-def main():
+def main(args=None):
+    parser = _makeParser()
+    options, args = parser.parse_args(args)
+    if options.list_messages:
+        for messageClass in messages.messageClasses():
+            print '%s %s' % (messageClass.code, messageClass.__name__)
+        raise SystemExit(False)
+    jobs = options.jobs
+    if jobs is None:
+        jobs = parallel.availableCPUs()
+    exclude = walk.compileExclude(
+        _splitList(options.exclude) + _splitList(options.extend_exclude))
+    builtIns = builtins.builtinNames(options.target_version,
+                                     _splitList(options.builtins))
+    try:
+        extraChecks = plugins.loadPlugins(options.plugin)
+    except ValueError, e:
+        parser.error(str(e))
+    enabled = None
+    if options.select or options.ignore:
+        enabled = messages.Selection(_splitList(options.select),
+                                     _splitList(options.ignore))
+        known = messages.messageClasses()
+        for plugin in extraChecks:
+            known.extend(getattr(plugin, 'messages', ()))
+        unknown = enabled.unknown(known)
+        if unknown:
+            parser.error('unknown messages: %s' % (', '.join(unknown),))
+    maxMessages = options.max_messages_per_file
+    if maxMessages is not None and maxMessages < 1:
+        parser.error('--max-messages-per-file must be at least 1')
+    if options.timeout is not None and options.timeout <= 0:
+        parser.error('--timeout must be positive')
+    resultCache = None
+    if options.cache:
+        if cache.sqlite3 is None:
+            parser.error('--cache requires the sqlite3 module')
+        resultCache = cache.ResultCache(
+            options.cache, options.cache_size * 1024 * 1024,
+            _resultOptions(options))
+    elif options.incremental:
+        parser.error('--incremental requires --cache')
+
+    if options.git and options.diff:
+        parser.error('--git cannot be combined with --diff')
+    if options.watch:
+        if options.diff or options.git:
+            parser.error('--watch cannot be combined with --diff or --git')
+        if options.fail_fast:
+            parser.error('--watch cannot be combined with --fail-fast')
+        if not args:
+            parser.error('--watch needs paths to watch')
+        _watch(args, FileChecker(resultCache, options.incremental, builtIns,
+                                 options.plugin, enabled, maxMessages,
+                                 options.timeout),
+               resultCache, exclude)
+
+    changes = None
+    if options.diff:
+        try:
+            changes = vcs.changedLines(options.diff, args)
+        except vcs.GitError, e:
+            parser.error(str(e))
+        paths = sorted(changes)
+    elif options.git:
+        try:
+            paths = vcs.indexedFiles(args)
+        except vcs.GitError, e:
+            parser.error(str(e))
+    else:
+        paths = iterSourcePaths(args, exclude)
+
     warnings = 0
-    args = sys.argv[1:]
-    if args:
-        for arg in args:
-            if os.path.isdir(arg):
-                for dirpath, dirnames, filenames in os.walk(arg):
-                    for filename in sorted(filenames):
-                        if filename.endswith('.py'):
-                            warnings += checkPath(os.path.join(dirpath, filename))
-            else:
-                warnings += checkPath(arg)
+    if args or options.git or changes is not None:
+        results = check_many(paths, jobs,
+                             FileChecker(resultCache, options.incremental,
+                                         builtIns, options.plugin, enabled,
+                                         maxMessages, options.timeout))
+        output = reporter.Reporter()
+        try:
+            for result in results:
+                if resultCache is not None:
+                    resultCache.record(result)
+                if changes is not None:
+                    vcs.restrictToLines(result, changes[result.filename])
+                warnings += output.report(result)
+                if warnings and options.fail_fast:
+                    # stops the workers still checking files ahead
+                    results.close()
+                    break
+        finally:
+            output.close()
+        if resultCache is not None:
+            resultCache.commit()
     else:
-        warnings += check(sys.stdin.read(), '<stdin>')
+        checkFile = FileChecker(None, False, builtIns, options.plugin,
+                                enabled, maxMessages, options.timeout)
+        warnings += checkFile(('<stdin>', sys.stdin.read())).report(
+            stderr=sys.stderr)
 
     raise SystemExit(warnings > 0)
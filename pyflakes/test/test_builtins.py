@@ -0,0 +1,54 @@
+"""
+Tests for L{pyflakes.builtins}.
+"""
+
+import _ast
+
+from unittest import TestCase
+from pyflakes import builtins, checker, messages
+
+
+class BuiltinNamesTests(TestCase):
+    """
+    Tests for L{builtins.builtinNames}.
+    """
+
+    def test_versions(self):
+        """
+        Each version has the builtins of the previous ones and its own.
+        """
+        self.assertNotIn('next', builtins.builtinNames('2.5'))
+        self.assertIn('next', builtins.builtinNames('2.6'))
+        self.assertNotIn('memoryview', builtins.builtinNames('2.6'))
+        self.assertIn('memoryview', builtins.builtinNames('2.7'))
+        for version in builtins.TARGET_VERSIONS:
+            names = builtins.builtinNames(version)
+            self.assertTrue(isinstance(names, frozenset))
+            for name in ['len', 'None', '__file__', '__builtins__']:
+                self.assertIn(name, names)
+        self.assertIs(builtins.builtinNames(), builtins.BUILTINS['2.7'])
+
+
+    def test_extra(self):
+        names = builtins.builtinNames('2.6', ['_', 'request'])
+        self.assertTrue(names.issuperset(['_', 'request', 'len']))
+        self.assertNotIn('_', builtins.builtinNames('2.6'))
+
+
+    def test_unknownVersion(self):
+        self.assertRaises(ValueError, builtins.builtinNames, '1.5')
+
+
+    def test_checker(self):
+        """
+        The checker reports names outside the builtins it is given.
+        """
+        tree = compile('next, _\n', '<test>', 'exec', _ast.PyCF_ONLY_AST)
+        def undefined(builtIns=None):
+            return [message.message_args[0] for message in
+                    checker.Checker(tree, builtIns=builtIns).messages
+                    if isinstance(message, messages.UndefinedName)]
+        self.assertEquals(undefined(), ['_'])
+        self.assertEquals(undefined(builtins.builtinNames('2.5')),
+                          ['next', '_'])
+        self.assertEquals(undefined(builtins.builtinNames('2.7', ['_'])), [])
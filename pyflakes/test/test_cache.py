@@ -0,0 +1,165 @@
+"""
+Tests for L{pyflakes.cache}.
+"""
+
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from pyflakes import cache
+from pyflakes.scripts.pyflakes import FileChecker, FileResult, _checkSource
+
+
+class ResultCacheTests(TestCase):
+    """
+    Tests for L{cache.ResultCache}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'cache.sqlite')
+
+
+    def tearDown(self):
+        for key in cache._connections.keys():
+            if key[1] == self.path:
+                cache._connections.pop(key).close()
+        shutil.rmtree(self.tempdir)
+
+
+    def makeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        f = open(path, 'w')
+        f.write(content)
+        f.close()
+        return path
+
+
+    def test_keys(self):
+        """
+        Keys depend on the source, on the salt and on whether the file is a
+        package's C{__init__.py}, but not on the rest of its name.
+        """
+        resultCache = cache.ResultCache(self.path)
+        key = resultCache.key('a/b.py', 'x\n')
+        self.assertEquals(resultCache.key('c/d.py', 'x\n'), key)
+        self.assertNotEquals(resultCache.key('a/b.py', 'y\n'), key)
+        self.assertNotEquals(resultCache.key('a/__init__.py', 'x\n'), key)
+        other = cache.ResultCache(self.path, salt=('select',))
+        self.assertNotEquals(other.key('a/b.py', 'x\n'), key)
+
+
+    def test_roundTrip(self):
+        """
+        A recorded result can be got back under another file name, with its
+        messages reported under that name.
+        """
+        resultCache = cache.ResultCache(self.path)
+        result = _checkSource('import os\n', 'a.py')
+        result.cacheKey = resultCache.key('a.py', 'import os\n')
+        resultCache.record(result)
+        resultCache.commit()
+
+        cached = cache.ResultCache(self.path).get(result.cacheKey, 'b.py')
+        self.assertTrue(cached.cached)
+        self.assertEquals([str(m) for m in cached.messages],
+                          ["b.py:1: 'os' imported but unused"])
+        self.assertEquals(cache.ResultCache(self.path).get('nope', 'b.py'),
+                          None)
+
+
+    def test_ioErrorsNotStored(self):
+        """
+        Files which could not be read are not cached.
+        """
+        resultCache = cache.ResultCache(self.path)
+        result = FileResult('a.py')
+        result.ioError = 'Permission denied'
+        result.cacheKey = 'k'
+        resultCache.record(result)
+        self.assertEquals(resultCache.get('k', 'a.py'), None)
+
+
+    def test_eviction(self):
+        """
+        Once the cache is full the least recently used results are evicted.
+        """
+        results = []
+        for i in range(5):
+            result = _checkSource('x%d\n' % i, 'a.py')
+            result.cacheKey = 'key%d' % i
+            results.append(result)
+        size = len(cache.pickle.dumps(results[0], cache.pickle.HIGHEST_PROTOCOL))
+        resultCache = cache.ResultCache(self.path, maxSize=size * 4)
+        for result in results[:4]:
+            resultCache.record(result)
+        # the first result has been used since, the second and third not
+        resultCache.record(resultCache.get('key0', 'a.py'))
+        resultCache.record(results[4])
+        resultCache.commit()
+        present = [result.cacheKey for result in results
+                   if resultCache.get(result.cacheKey, 'a.py') is not None]
+        self.assertEquals(present, ['key0', 'key3', 'key4'])
+        self.assertEquals(resultCache._size, size * 3)
+
+
+    def test_fileChecker(self):
+        """
+        L{FileChecker} answers from the cache when the source is unchanged.
+        """
+        path = self.makeFile('a.py', 'import os\n')
+        checker = FileChecker(cache.ResultCache(self.path))
+        first = checker(path)
+        self.assertFalse(first.cached)
+        checker.cache.record(first)
+        checker.cache.commit()
+
+        second = checker(path)
+        self.assertTrue(second.cached)
+        self.assertEquals(map(str, second.messages), map(str, first.messages))
+
+        self.makeFile('a.py', 'import sys\n')
+        self.assertFalse(checker(path).cached)
+
+
+    def test_statIndex(self):
+        """
+        An incremental L{FileChecker} answers for files whose stat data is
+        unchanged without opening them.
+        """
+        from pyflakes.scripts import pyflakes
+        path = self.makeFile('a.py', 'import os\n')
+        os.utime(path, (1000000000, 1000000000))
+        checker = FileChecker(cache.ResultCache(self.path), incremental=True)
+        first = checker(path)
+        self.assertEquals(first.stat, cache.statSignature(path))
+        checker.cache.record(first)
+        checker.cache.commit()
+
+        def mock_open(*k):
+            raise IOError(None, 'should not be read')
+        pyflakes.open = mock_open
+        try:
+            second = checker(path)
+        finally:
+            del pyflakes.open
+        self.assertTrue(second.cached)
+        self.assertEquals(map(str, second.messages), map(str, first.messages))
+
+        self.makeFile('a.py', 'import sys\n')
+        os.utime(path, (1000000005, 1000000005))
+        self.assertEquals(map(str, checker(path).messages),
+                          ["%s:1: 'sys' imported but unused" % (path,)])
+
+
+    def test_racyFiles(self):
+        """
+        Files modified just now are not entered into the stat index, since
+        they might change again without their stat data changing.
+        """
+        path = self.makeFile('a.py', 'import os\n')
+        self.assertEquals(cache.statSignature(path), None)
+        os.utime(path, (1000000000, 1000000000))
+        self.assertNotEquals(cache.statSignature(path), None)
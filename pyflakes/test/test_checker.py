@@ -0,0 +1,464 @@
+"""
+Tests for the machinery of L{pyflakes.checker.Checker}, rather than for the
+problems it finds.
+"""
+
+import sys
+import _ast
+from StringIO import StringIO
+
+from unittest import TestCase
+from pyflakes import checker, messages
+
+
+def parse(source):
+    return compile(source, '<test>', 'exec', _ast.PyCF_ONLY_AST)
+
+
+
+class DispatchTests(TestCase):
+    """
+    Tests for the table mapping node classes to handlers.
+    """
+
+    def test_perClass(self):
+        """
+        Each checker class gets its own table, with its own handlers.
+        """
+        class TupleCounter(checker.Checker):
+            tuples = 0
+            def TUPLE(self, node):
+                TupleCounter.tuples += 1
+                self.handleChildren(node)
+
+        TupleCounter(parse('a = (1, (2, 3))\n'))
+        self.assertEquals(TupleCounter.tuples, 2)
+        self.assertEquals(
+            checker.Checker._nodeHandlers()[_ast.Tuple],
+            checker.Checker.__dict__['handleChildren'])
+        self.assertEquals(
+            [message.__class__ for message in
+             TupleCounter(parse('a = (b, 1)\n')).messages],
+            [messages.UndefinedName])
+
+
+    def test_builtOnce(self):
+        self.assertIs(checker.Checker._nodeHandlers(),
+                      checker.Checker._nodeHandlers())
+
+
+    def test_unknownNode(self):
+        """
+        A node class without a handler is an error.
+        """
+        class Unknown(_ast.AST):
+            pass
+        w = checker.Checker(parse(''))
+        self.assertRaises(AttributeError, w.handleNode, Unknown(), None)
+
+
+    def test_traceTree(self):
+        """
+        With C{traceTree}, every node is printed, indented by depth.
+        """
+        out = StringIO()
+        stdout, sys.stdout = sys.stdout, out
+        try:
+            checker.Checker(parse('a\n'), traceTree=True)
+        finally:
+            sys.stdout = stdout
+        self.assertEquals(out.getvalue().splitlines(), [
+            'Expr', '  Name', '  end Name', 'end Expr'])
+
+
+
+class TreeTests(TestCase):
+    """
+    Tests that checking leaves the tree alone.
+    """
+
+    source = '''\
+import os
+x = 1
+x += os.sep
+a.b += 1
+__all__ = ['x']
+def f(y=[z for z in x]):
+    return '{0}'.format(y, *x)
+'''
+
+    def test_unmodified(self):
+        """
+        No attributes are added to or changed on the nodes of the tree.
+        """
+        import ast
+        tree = parse(self.source)
+        before = ast.dump(tree, include_attributes=True)
+        checker.Checker(tree)
+        self.assertEquals(ast.dump(tree, include_attributes=True), before)
+        for node in ast.walk(tree):
+            self.assertFalse(hasattr(node, 'parent'))
+
+
+    def test_checkTwice(self):
+        """
+        A tree can be checked again with the same results.
+        """
+        tree = parse(self.source + 'del x\nundefined\n')
+        first = [str(message) for message in checker.Checker(tree).messages]
+        self.assertTrue(first)
+        self.assertEquals(
+            [str(message) for message in checker.Checker(tree).messages],
+            first)
+
+
+    def test_noCycles(self):
+        """
+        A checker is freed as soon as it is no longer referenced, without
+        waiting for the garbage collector.
+        """
+        import gc, weakref
+        gc.disable()
+        try:
+            ref = weakref.ref(checker.Checker(parse(self.source)))
+            self.assertIs(ref(), None)
+        finally:
+            gc.enable()
+
+
+    def test_deepChains(self):
+        """
+        Chains of operators, attributes, calls and subscripts a hundred
+        thousand deep are checked without running out of stack.
+        """
+        import threading
+        # compiling such chains takes more C stack than the default
+        stackSize = threading.stack_size(256 * 1024 * 1024)
+        try:
+            outcomes = []
+            def run():
+                for chain in ['+'.join(['a'] * 100000),
+                              'a' + '.b' * 100000,
+                              'a' + '()' * 100000,
+                              'a' + '[a]' * 100000,
+                              '"%s" % a + ' + ' - '.join(['a'] * 100000)]:
+                    tree = parse('a = 1\nx = %s\nundefined\n' % (chain,))
+                    outcomes.append(
+                        [(message.__class__, message.lineno) for message in
+                         checker.Checker(tree).messages])
+                    del tree
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+        finally:
+            threading.stack_size(stackSize)
+        self.assertEquals(outcomes, [[(messages.UndefinedName, 3)]] * 5)
+
+
+
+class AncestryTests(TestCase):
+    """
+    Tests for what bindings record about the loops around them.
+    """
+
+    def bindings(self, source):
+        w = checker.Checker(parse(source))
+        found = {}
+        for scope in w.dead_scopes:
+            for name, binding in scope.items():
+                found[name] = (binding.inListComp, binding.inLoop)
+        return found
+
+    def test_loops(self):
+        """
+        The loops around function definitions count for their bodies, which
+        are handled later.
+        """
+        self.assertEquals(self.bindings('''\
+a = 1
+for b in c:
+    def f():
+        d = [e for e in b]
+        return d
+[g for g in f]
+'''), {'a': (False, False), 'b': (False, True), 'f': (False, True),
+       'd': (False, True), 'e': (True, True), 'g': (True, True)})
+
+
+
+class ScopeChainTests(TestCase):
+    """
+    Tests for the chain of scopes the checker keeps.
+    """
+
+    def test_deferredShareScopes(self):
+        """
+        Functions deferred in the same scope keep a reference to that scope
+        rather than a copy of the scope stack.
+        """
+        states = []
+        class Recorder(checker.Checker):
+            def deferFunction(self, callable):
+                states.append(self._state()[0])
+                checker.Checker.deferFunction(self, callable)
+        Recorder(parse('''\
+class C:
+    def f(self): pass
+    def g(self): pass
+'''))
+        self.assertEquals(len(states), 2)
+        self.assertIs(states[0], states[1])
+        self.assertTrue(isinstance(states[0], checker.ClassScope))
+        self.assertTrue(isinstance(states[0].enclosing, checker.ModuleScope))
+
+
+    def test_scopeStack(self):
+        """
+        C{scopeStack} lists the scopes outermost first.
+        """
+        stacks = []
+        class Recorder(checker.Checker):
+            def GLOBAL(self, node):
+                stacks.append([scope.__class__ for scope in self.scopeStack])
+        Recorder(parse('''\
+class C:
+    def f(self):
+        global x
+'''))
+        self.assertEquals(stacks, [[checker.ModuleScope, checker.ClassScope,
+                                    checker.FunctionScope]])
+
+
+    def test_lookupScopes(self):
+        """
+        Names loaded in a function are looked for in the enclosing function
+        scopes and the global scope, but not in class scopes; the scopes
+        around are worked out once.
+        """
+        chains = []
+        class Recorder(checker.Checker):
+            def handleNameLoad(self, node):
+                chains.append(self.scope.lookupScopes())
+                checker.Checker.handleNameLoad(self, node)
+        Recorder(parse('''\
+def f():
+    class C:
+        def g(self):
+            return a, b
+'''))
+        self.assertIs(chains[0], chains[1])
+        self.assertEquals([scope.__class__ for scope in chains[0]],
+                          [checker.FunctionScope, checker.ModuleScope])
+
+
+
+class ConditionScopeTests(TestCase):
+    """
+    Tests for lookups through nested L{checker.ConditionScope}s.
+    """
+
+    def nest(self, base, depth):
+        scopes = [base]
+        for i in range(depth):
+            scopes.append(checker.ConditionScope(scopes[-1]))
+        return scopes
+
+
+    def test_shadowing(self):
+        """
+        A name is found in the innermost scope binding it.
+        """
+        node = parse('x').body[0]
+        scopes = self.nest(checker.FunctionScope(), 50)
+        outer, inner = checker.Binding('x', node), checker.Binding('x', node)
+        scopes[0]['x'] = outer
+        scopes[10]['y'] = inner
+        self.assertIs(scopes[50]['x'], outer)
+        self.assertIs(scopes[50]['y'], inner)
+        scopes[30]['x'] = inner
+        self.assertIs(scopes[50]['x'], inner)
+        self.assertIs(scopes[29]['x'], outer)
+        self.assertRaises(KeyError, scopes[5].__getitem__, 'y')
+        self.assertEquals(scopes[0].conditional, {'x': 1, 'y': 1})
+        del scopes[30]['x']
+        scopes[10].pop('y')
+        self.assertEquals(scopes[0].conditional, {})
+        self.assertRaises(KeyError, scopes[50].__getitem__, 'y')
+        self.assertTrue(scopes[50].of_type(checker.FunctionScope))
+        self.assertFalse(scopes[50].of_type(checker.ClassScope))
+
+
+    def test_flat(self):
+        """
+        A name which no condition scope binds is looked up in the real scope
+        directly, without going through the scopes in between.
+        """
+        node = parse('x').body[0]
+        scopes = self.nest(checker.ModuleScope(), 50)
+        binding = checker.Binding('x', node)
+        scopes[0]['x'] = binding
+        for scope in scopes[1:]:
+            scope.parent = None
+        self.assertIs(scopes[50]['x'], binding)
+        self.assertRaises(KeyError, scopes[50].__getitem__, 'y')
+
+
+    def test_deepBranches(self):
+        """
+        Branches nested fifty deep are checked like shallow ones.
+        """
+        lines = ['import os', 'def f(a):']
+        for depth in range(50):
+            lines.append('    ' * (depth + 1) + 'if a:')
+        lines.append('    ' * 51 + 'b = os.sep')
+        lines.append('    ' * 51 + 'return b, c')
+        self.assertEquals(
+            [(message.__class__, message.message_args) for message in
+             checker.Checker(parse('\n'.join(lines) + '\n')).messages],
+            [(messages.UndefinedName, ('c',))])
+
+
+
+class SelectionTests(TestCase):
+    """
+    Tests for the I{enabled} messages of L{checker.Checker}.
+    """
+
+    def check(self, source, *enabled):
+        return sorted(
+            (message.lineno, message.__class__.__name__) for message in
+            checker.Checker(parse(source), enabled=set(enabled)).messages)
+
+
+    def test_onlyEnabled(self):
+        source = 'import os\nimport os\nundefined\n'
+        self.assertEquals(self.check(source, messages.UndefinedName),
+                          [(3, 'UndefinedName')])
+        self.assertEquals(
+            self.check(source, messages.UnusedImport,
+                       messages.RedefinedWhileUnused),
+            [(2, 'RedefinedWhileUnused'), (2, 'UnusedImport')])
+        self.assertEquals(self.check(source), [])
+
+
+    def test_disabledChecksNotRun(self):
+        """
+        Checks are not run when none of their messages are enabled.
+        """
+        w = checker.Checker(parse(''), enabled=set([messages.UndefinedName,
+                                                    messages.TupleCall]))
+        self.assertEquals(
+            sorted(name for name in checker.Checker.checks
+                   if getattr(w, name)),
+            ['_checkTupleCalls', '_checkUndefinedNames'])
+        analyzed = []
+        class Formats(object):
+            def percentFormats(self, text):
+                analyzed.append(text)
+                return False, 1
+            braceFormats = percentFormats
+        self.patch(checker, 'formats', Formats())
+        self.assertEquals(
+            self.check("'%s' % (a, b)\n'{}'.format()\n",
+                       messages.UndefinedName),
+            [(1, 'UndefinedName'), (1, 'UndefinedName')])
+        self.assertEquals(analyzed, [])
+
+
+    def test_listCompRedefinitions(self):
+        """
+        Redefinitions in list comprehensions of unused imports are not
+        reported as such, whether or not the imports are reported.
+        """
+        self.assertEquals(
+            self.check('import x\n[x for x in range(3)]\n',
+                       messages.RedefinedInListComp), [])
+        self.assertEquals(
+            self.check('x = 1\n[x for x in range(3)]\n',
+                       messages.RedefinedInListComp),
+            [(2, 'RedefinedInListComp')])
+
+
+    def patch(self, obj, name, value):
+        old = getattr(obj, name)
+        setattr(obj, name, value)
+        self.addCleanup(setattr, obj, name, old)
+
+
+
+class BudgetTests(TestCase):
+    """
+    Tests for the I{maxMessages} of L{checker.Checker}.
+    """
+
+    def test_truncated(self):
+        """
+        Checking stops at the first message beyond the budget, leaving the
+        rest of the tree alone.
+        """
+        seen = []
+        class Recorder(checker.Checker):
+            def handleUndefinedName(self, node):
+                seen.append(node.id)
+                checker.Checker.handleUndefinedName(self, node)
+        source = ''.join(['undefined%d\n' % (i,) for i in range(100)])
+        w = Recorder(parse(source), maxMessages=3)
+        self.assertEquals([message.lineno for message in w.messages],
+                          [1, 2, 3])
+        self.assertTrue(w.truncated)
+        self.assertEquals(len(seen), 4)
+
+
+    def test_withinBudget(self):
+        w = checker.Checker(parse('import os\nundefined\n'), maxMessages=2)
+        self.assertEquals(len(w.messages), 2)
+        self.assertFalse(w.truncated)
+
+
+
+class CompactTests(TestCase):
+    """
+    Tests that bindings and messages, of which there are many, do without
+    an instance dictionary.
+    """
+
+    def subclasses(self, module, base):
+        return [value for value in vars(module).values()
+                if isinstance(value, type) and issubclass(value, base)]
+
+
+    def test_bindings(self):
+        node = parse('x').body[0]
+        for cls in self.subclasses(checker, checker.Binding):
+            self.assertFalse(hasattr(cls('x', node), '__dict__'), cls)
+
+
+    def test_messages(self):
+        node = parse('x').body[0]
+        for cls in self.subclasses(messages, messages.Message):
+            self.assertFalse(hasattr(cls('f.py', node), '__dict__'), cls)
+
+
+    def test_importationName(self):
+        """
+        The bound name of a dotted import is shared with other bindings of
+        it.
+        """
+        node = parse('import os.path').body[0]
+        self.assertIs(checker.Importation('os.path', node).name,
+                      checker.Importation('os.sep', node).name)
+
+
+    def test_pickleMessage(self):
+        """
+        Messages survive pickling with any protocol.
+        """
+        import pickle
+        message = messages.RedefinedWhileUnused(
+            'f.py', parse('\n\nx').body[0], 'x', 1)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(message, protocol))
+            self.assertEquals(
+                (copy.__class__, copy.filename, copy.lineno, copy.col,
+                 copy.message_args),
+                (messages.RedefinedWhileUnused, 'f.py', 3, 0, ('x', 1)))
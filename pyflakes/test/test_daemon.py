@@ -0,0 +1,190 @@
+"""
+Tests for L{pyflakes.daemon} and L{pyflakes.scripts.client}.
+"""
+
+import os
+import stat
+import signal
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from unittest import TestCase
+
+from pyflakes import daemon
+from pyflakes.scripts import client
+from pyflakes.scripts.pyflakes import check
+
+
+class ProtocolTests(TestCase):
+    """
+    Tests for the chunked protocol spoken between client and daemon.
+    """
+
+    def test_chunks(self):
+        """
+        Chunks may contain newlines and be empty.
+        """
+        f = StringIO()
+        client.writeChunks(f, ['a\nb', '', 'c'])
+        f.seek(0)
+        self.assertEquals([client.readChunk(f) for i in range(3)],
+                          ['a\nb', '', 'c'])
+        self.assertRaises(EOFError, client.readChunk, f)
+
+
+    def test_truncated(self):
+        """
+        A chunk cut short by the peer going away raises C{EOFError}.
+        """
+        self.assertRaises(EOFError, client.readChunk, StringIO('5\nabc'))
+
+
+    def test_handleSource(self):
+        """
+        A source request is answered like L{check} would print it.
+        """
+        f = StringIO()
+        client.writeChunks(f, ['source', os.getcwd(), 'dummy.py',
+                               'import os\ndef f(:\n'])
+        end = f.tell()
+        f.seek(0)
+        daemon.handle(f)
+        f.seek(end)
+        out, err = StringIO(), StringIO()
+        count = check('import os\ndef f(:\n', 'dummy.py', err, out)
+        self.assertEquals(
+            [client.readChunk(f) for i in range(3)],
+            [str(count), out.getvalue(), err.getvalue()])
+
+
+
+class SocketTests(TestCase):
+    """
+    Tests for where the daemon's socket may be, and what the client sends it.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+
+    def test_makesDirectory(self):
+        """
+        The daemon makes the directory of its socket, for this user only.
+        """
+        path = os.path.join(self.tempdir, 'run', 'pyflakes.sock')
+        server = daemon.Daemon(path, 1)
+        server.listen()
+        server.sock.close()
+        mode = os.stat(os.path.dirname(path)).st_mode
+        self.assertEquals(stat.S_IMODE(mode), 0700)
+        client.checkSocket(path)
+
+
+    def test_sharedDirectory(self):
+        """
+        Neither the daemon nor the client use a socket in a directory other
+        users may write to, unless it is sticky.
+        """
+        path = os.path.join(self.tempdir, 'pyflakes.sock')
+        os.chmod(self.tempdir, 0700)
+        server = daemon.Daemon(path, 1)
+        server.listen()
+        os.chmod(self.tempdir, 0777)
+        try:
+            self.assertRaises(client.UnsafeSocket, client.checkPaths, [], path)
+            self.assertRaises(client.UnsafeSocket, daemon.Daemon(path, 1).listen)
+            os.chmod(self.tempdir, 0777 | stat.S_ISVTX)
+            client.checkSocket(path)
+        finally:
+            server.sock.close()
+
+
+    def test_notSocket(self):
+        """
+        The client does not talk to anything but a socket.
+        """
+        path = os.path.join(self.tempdir, 'pyflakes.sock')
+        os.symlink(os.path.join(self.tempdir, 'elsewhere'), path)
+        self.assertRaises(client.UnsafeSocket, client.checkPaths, [], path)
+        os.unlink(path)
+        self.assertRaises(client.socket.error, client.checkPaths, [], path)
+
+
+    def test_staleNotRemovable(self):
+        """
+        A stale socket which cannot be removed is reported like any other
+        problem with the socket.
+        """
+        path = os.path.join(self.tempdir, 'pyflakes.sock')
+        os.mkdir(path)
+        self.assertRaises(client.socket.error, daemon.Daemon(path, 1).listen)
+
+
+    def test_options(self):
+        """
+        Only paths are sent to the daemon; options are left to the checker
+        run by the client itself.
+        """
+        self.assertEquals(client._paths(['a.py', '-', 'b']), ['a.py', '-', 'b'])
+        self.assertEquals(client._paths(['a.py', '--', '-b']), ['a.py', '-b'])
+        self.assertEquals(client._paths(['-j4', 'a.py']), None)
+        self.assertEquals(client._paths(['a.py', '--select', 'F401']), None)
+
+
+
+class DaemonTests(TestCase):
+    """
+    Tests for a running L{daemon.Daemon}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.socket = os.path.join(self.tempdir, 'pyflakes.sock')
+        server = daemon.Daemon(self.socket, 2, maxRequests=2)
+        server.listen()
+        self.pid = os.fork()
+        if self.pid == 0:
+            try:
+                server.run()
+            finally:
+                os._exit(0)
+        server.sock.close()
+        # wait until the daemon is serving, and so will clean up when killed
+        client.checkSource('', 'empty.py', self.socket)
+
+
+    def tearDown(self):
+        os.kill(self.pid, signal.SIGTERM)
+        os.waitpid(self.pid, 0)
+        self.assertFalse(os.path.exists(self.socket))
+        shutil.rmtree(self.tempdir)
+
+
+    def test_paths(self):
+        """
+        Paths are checked relative to the client's working directory, with
+        the same output as L{checkPath}, by workers which are recycled.
+        """
+        path = os.path.join(self.tempdir, 'a.py')
+        f = open(path, 'w')
+        f.write('import os\n')
+        f.close()
+        for i in range(5):
+            self.assertEquals(
+                client.checkPaths([self.tempdir, 'missing.py'], self.socket),
+                (2, "%s:1: 'os' imported but unused\n"
+                    "missing.py: No such file or directory\n" % (path,),
+                 ''))
+
+
+    def test_alreadyRunning(self):
+        """
+        A second daemon refuses to take over the socket of a live one.
+        """
+        other = daemon.Daemon(self.socket, 1)
+        self.assertRaises(daemon.socket.error, other.listen)
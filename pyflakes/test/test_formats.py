@@ -0,0 +1,122 @@
+"""
+Tests for L{pyflakes.formats}.
+"""
+
+import _ast
+
+from unittest import TestCase
+from pyflakes import checker, formats
+
+
+class FormatCacheTests(TestCase):
+    """
+    Tests for L{formats.FormatCache}.
+    """
+
+    def setUp(self):
+        self.analyzed = []
+        self.cache = formats.FormatCache(self.analyze, maxSize=2)
+
+
+    def analyze(self, text):
+        self.analyzed.append(text)
+        return len(text)
+
+
+    def test_onlyOnce(self):
+        """
+        Each string is analyzed once, and lookups of it are counted as hits
+        afterwards.
+        """
+        self.assertEquals([self.cache(text) for text in ['a', 'bb', 'a', 'a']],
+                          [1, 2, 1, 1])
+        self.assertEquals(self.analyzed, ['a', 'bb'])
+        self.assertEquals((self.cache.hits, self.cache.misses), (2, 2))
+        self.assertEquals(self.cache.hitRate, 0.5)
+        self.assertEquals(len(self.cache), 2)
+
+
+    def test_bounded(self):
+        """
+        The least recently used string is forgotten to make room for a new
+        one.
+        """
+        for text in ['a', 'b', 'a', 'c', 'a', 'b']:
+            self.cache(text)
+        self.assertEquals(self.analyzed, ['a', 'b', 'c', 'b'])
+        self.assertEquals(len(self.cache), 2)
+
+
+    def test_evictHalf(self):
+        """
+        Once full, the least recently used half of the strings is forgotten
+        at once.
+        """
+        cache = formats.FormatCache(self.analyze, maxSize=4)
+        for text in ['a', 'b', 'c', 'd', 'a', 'b', 'e']:
+            cache(text)
+        self.assertEquals(len(cache), 3)
+        for text in ['a', 'b', 'e', 'c']:
+            cache(text)
+        self.assertEquals(self.analyzed, ['a', 'b', 'c', 'd', 'e', 'c'])
+
+
+    def test_disabled(self):
+        """
+        With a size of C{0}, every lookup analyzes the string.
+        """
+        cache = formats.FormatCache(self.analyze, maxSize=0)
+        cache('a')
+        cache('a')
+        self.assertEquals(self.analyzed, ['a', 'a'])
+        self.assertEquals(len(cache), 0)
+        self.assertEquals(cache.hitRate, 0.0)
+
+
+    def test_clear(self):
+        self.cache('a')
+        self.cache('a')
+        self.cache.clear()
+        self.assertEquals((len(self.cache), self.cache.hits,
+                           self.cache.misses, self.cache.hitRate),
+                          (0, 0, 0, 0.0))
+
+
+
+class AnalysisTests(TestCase):
+    """
+    Tests for the summaries of format strings.
+    """
+
+    def test_percent(self):
+        self.assertEquals(formats.analyzePercent('%s %-*.*f %%'),
+                          (False, 4))
+        self.assertEquals(formats.analyzePercent('%(a)s %(b)d'), (True, 2))
+        self.assertEquals(formats.analyzePercent('%%(a)s'), (False, 0))
+
+
+    def test_brace(self):
+        self.assertEquals(formats.analyzeBrace('{}{}{3.x}{a[0]}{b}'),
+                          (None, 2, 3, frozenset(['a', 'b'])))
+        self.assertEquals(formats.analyzeBrace('{'),
+                          ("Single '{' encountered in format string",
+                           0, -1, frozenset()))
+
+
+    def test_checkerShares(self):
+        """
+        The checker looks format strings up in the caches of the process, so
+        a string repeated across a module is analyzed once.
+        """
+        source = "'%s' % (a,)\n'%s' % (a, b)\n'{0}'.format()\n'{0}'.format()\n"
+        tree = compile(source, '<test>', 'exec', _ast.PyCF_ONLY_AST)
+        for cache in [formats.percentFormats, formats.braceFormats]:
+            cache.clear()
+        self.assertEquals(
+            sorted((message.lineno, message.__class__.__name__)
+                   for message in checker.Checker(tree).messages),
+            [(1, 'UndefinedName'), (2, 'StringFormattingProblem'),
+             (2, 'UndefinedName'), (2, 'UndefinedName'),
+             (3, 'StringFormatProblem'), (4, 'StringFormatProblem')])
+        for cache in [formats.percentFormats, formats.braceFormats]:
+            self.assertEquals((cache.hits, cache.misses, len(cache)), (1, 1, 1))
@@ -113,6 +113,17 @@ class Test(harness.Test):
         if True: print fu
         ''')
 
+    def test_unusedWithFunctionInIf(self):
+        """
+        Unused imports are reported even when the last function of the module
+        is defined inside an C{if}.
+        """
+        self.flakes('''
+        import fu
+        if True:
+            def f(): pass
+        ''', m.UnusedImport)
+
     def test_usedInIfConditional(self):
         self.flakes('''
         import fu
@@ -0,0 +1,90 @@
+"""
+Tests for L{pyflakes.messages}.
+"""
+
+from unittest import TestCase
+from pyflakes import messages
+
+
+class CodeTests(TestCase):
+    """
+    Tests for the short codes of message classes.
+    """
+
+    def test_unique(self):
+        """
+        Every message class of pyflakes has a code of its own.
+        """
+        classes = [value for value in vars(messages).values()
+                   if isinstance(value, type)
+                   and issubclass(value, messages.Message)
+                   and value is not messages.Message]
+        self.assertEquals(sorted(messages.messageClasses()), sorted(classes))
+        codes = [cls.code for cls in classes]
+        self.assertEquals(len(set(codes)), len(classes))
+
+
+    def test_stable(self):
+        """
+        Codes once given out stay with their class.
+        """
+        self.assertEquals(
+            [(cls.code, cls.__name__) for cls in messages.messageClasses()],
+            [('F401', 'UnusedImport'),
+             ('F402', 'ImportShadowedByLoopVar'),
+             ('F403', 'ImportStarUsed'),
+             ('F404', 'LateFutureImport'),
+             ('F501', 'StringFormattingProblem'),
+             ('F521', 'StringFormatProblem'),
+             ('F811', 'RedefinedWhileUnused'),
+             ('F812', 'RedefinedInListComp'),
+             ('F813', 'RedefinedFunction'),
+             ('F821', 'UndefinedName'),
+             ('F822', 'UndefinedExport'),
+             ('F823', 'UndefinedLocal'),
+             ('F831', 'DuplicateArgument'),
+             ('F841', 'UnusedVariable'),
+             ('F901', 'ExceptionReturn'),
+             ('F902', 'TupleCall')])
+
+
+
+class SelectionTests(TestCase):
+    """
+    Tests for L{messages.Selection}.
+    """
+
+    def selected(self, selection):
+        return [cls.__name__ for cls in messages.messageClasses()
+                if cls in selection]
+
+
+    def test_all(self):
+        self.assertEquals(len(self.selected(messages.Selection())),
+                          len(messages.messageClasses()))
+
+
+    def test_select(self):
+        """
+        Classes are selected by name, code or code prefix.
+        """
+        self.assertEquals(
+            self.selected(messages.Selection(['F40', 'F821', 'TupleCall'])),
+            ['UnusedImport', 'ImportShadowedByLoopVar', 'ImportStarUsed',
+             'LateFutureImport', 'UndefinedName', 'TupleCall'])
+
+
+    def test_ignore(self):
+        """
+        Ignored classes are left out, even when selected.
+        """
+        self.assertEquals(
+            self.selected(messages.Selection(['F8'], ['F82', 'F811'])),
+            ['RedefinedInListComp', 'RedefinedFunction', 'DuplicateArgument',
+             'UnusedVariable'])
+
+
+    def test_unknown(self):
+        selection = messages.Selection(['F4', 'F7'], ['Nothing', 'F401'])
+        self.assertEquals(selection.unknown(messages.messageClasses()),
+                          ['F7', 'Nothing'])
@@ -246,6 +246,63 @@ class TestUnusedAssignment(harness.Test):
         ''', m.UnusedVariable)
 
 
+    def test_assignedInSomeBranches(self):
+        """
+        A variable used in the branch of an C{if} binding it is not reported
+        when a later C{elif} binds it without using it, as if the C{elif}
+        were nested in an C{else}.
+        """
+        self.flakes('''
+        def a(b, c):
+            if b:
+                x = 1
+                print x
+            elif c:
+                x = 2
+        ''')
+
+
+    def test_assignedInSomeBranchesInLoop(self):
+        """
+        The same holds for an C{if} in a loop.
+        """
+        self.flakes('''
+        def a(lines, b):
+            for line in lines:
+                if b:
+                    x = line
+                    print x
+                elif line:
+                    x = 2
+                else:
+                    pass
+        ''')
+
+
+    def test_assignedInLaterBranchOnly(self):
+        """
+        A variable only bound, and not used, in a later branch is reported,
+        in a loop or not.
+        """
+        self.flakes('''
+        def a(b, c):
+            if b:
+                pass
+            elif c:
+                x = 2
+        ''', m.UnusedVariable)
+        self.flakes('''
+        def a(lines, b):
+            for line in lines:
+                if b:
+                    pass
+                elif line:
+                    x = 2
+                else:
+                    pass
+        ''', m.UnusedVariable)
+
+
     def test_assignToGlobal(self):
         """
         Assigning to a global and then not using that global is perfectly
@@ -0,0 +1,197 @@
+"""
+Tests for L{pyflakes.parallel}.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from pyflakes import parallel
+
+
+def _square(n):
+    return n * n
+
+
+def _slowUnlessZero(n):
+    if n:
+        time.sleep(60)
+    return n
+
+
+def _logged(item):
+    """
+    Take a while over C{item}, a log file and a number, or for ever if the
+    number is negative, and log the number.
+    """
+    path, n = item
+    time.sleep(n < 0 and 60 or 0.15)
+    log = open(path, 'a')
+    log.write('%d\n' % (n,))
+    log.close()
+    return n
+
+
+class CPUCountTests(TestCase):
+    """
+    Tests for working out how many CPUs may be used.
+    """
+
+    def test_parseCPUList(self):
+        """
+        Kernel CPU lists may mix single CPUs and inclusive ranges.
+        """
+        self.assertEquals(parallel._parseCPUList('0\n'), 1)
+        self.assertEquals(parallel._parseCPUList('0-3,8,10-11'), 7)
+
+
+    def test_quota(self):
+        """
+        A CFS quota is rounded up to whole CPUs, and no quota means no limit.
+        """
+        self.assertEquals(parallel._quotaCPUs('150000', '100000'), 2)
+        self.assertEquals(parallel._quotaCPUs('50000', '100000'), 1)
+        self.assertEquals(parallel._quotaCPUs('-1', '100000'), None)
+
+
+    def test_cgroupV2(self):
+        """
+        The quota in a cgroup v2 C{cpu.max} file limits the CPU count.
+        """
+        root = tempfile.mkdtemp()
+        try:
+            f = open(os.path.join(root, 'cpu.max'), 'w')
+            f.write('300000 100000\n')
+            f.close()
+            self.assertEquals(parallel._cgroupCPUs(root), 3)
+            f = open(os.path.join(root, 'cpu.max'), 'w')
+            f.write('max 100000\n')
+            f.close()
+            self.assertEquals(parallel._cgroupCPUs(root), None)
+        finally:
+            shutil.rmtree(root)
+
+
+    def test_cgroupV1(self):
+        """
+        cgroup v1 keeps the quota and period in separate files.
+        """
+        root = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(root, 'cpu'))
+            for name, value in [('cpu.cfs_quota_us', '400000'),
+                                ('cpu.cfs_period_us', '100000')]:
+                f = open(os.path.join(root, 'cpu', name), 'w')
+                f.write(value + '\n')
+                f.close()
+            self.assertEquals(parallel._cgroupCPUs(root), 4)
+        finally:
+            shutil.rmtree(root)
+
+
+    def test_available(self):
+        """
+        L{parallel.availableCPUs} always allows at least one process.
+        """
+        self.assertTrue(parallel.availableCPUs() >= 1)
+
+
+
+class ImapOrderedTests(TestCase):
+    """
+    Tests for L{parallel.imapOrdered}.
+    """
+
+    def test_serial(self):
+        """
+        With a single job everything runs in this process, in order.
+        """
+        self.assertEquals(list(parallel.imapOrdered(_square, range(5), 1)),
+                          [0, 1, 4, 9, 16])
+
+
+    def test_pool(self):
+        """
+        With several jobs the results still come back in input order.
+        """
+        self.assertEquals(
+            list(parallel.imapOrdered(_square, iter(range(50)), 3, 2)),
+            [n * n for n in range(50)])
+
+
+    def test_bounded(self):
+        """
+        Only a bounded number of items is taken ahead of the results which
+        have been consumed, even from an endless iterable.
+        """
+        taken = []
+        def items():
+            n = 0
+            while True:
+                taken.append(n)
+                yield n
+                n += 1
+        results = parallel.imapOrdered(_square, items(), 2, 3, 2)
+        self.assertEquals([results.next() for i in range(10)],
+                          [n * n for n in range(10)])
+        self.assertTrue(len(taken) <= 10 + 2 * 3 * 2, len(taken))
+        results.close()
+
+
+    def test_close(self):
+        """
+        Closing the results early stops the workers still busy, without
+        waiting for them.
+        """
+        results = parallel.imapOrdered(_slowUnlessZero, range(4), 2, 1)
+        start = time.time()
+        self.assertEquals(results.next(), 0)
+        results.close()
+        self.assertTrue(time.time() - start < 30)
+
+
+    def test_timeout(self):
+        """
+        An item a worker is stuck on is given up on, and the other items are
+        still handled.
+        """
+        results = parallel.imapOrdered(
+            _slowUnlessZero, [0, 0, 1, 0, 0], 2, timeout=1,
+            onTimeout=lambda item, elapsed: ('timed out', item, elapsed >= 1))
+        start = time.time()
+        self.assertEquals(list(results),
+                          [0, 0, ('timed out', 1, True), 0, 0])
+        self.assertTrue(time.time() - start < 30)
+
+
+    def test_timeoutPerItem(self):
+        """
+        The timeout applies to each item on its own: only the item a worker
+        is stuck on is given up on, and only that worker is replaced, the
+        others finishing what they were busy with.
+        """
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, 'log')
+            numbers = [0, 1, 2, -1] + range(3, 11)
+            results = parallel.imapOrdered(
+                _logged, [(path, n) for n in numbers], 2, timeout=1,
+                onTimeout=lambda item, elapsed: 'timed out')
+            self.assertEquals(list(results),
+                              [0, 1, 2, 'timed out'] + range(3, 11))
+            self.assertEquals(sorted(map(int, open(path))), range(11))
+        finally:
+            shutil.rmtree(tempdir)
+
+
+    def test_timeoutErrors(self):
+        """
+        Exceptions raised by the function are raised again with a timeout,
+        too.
+        """
+        results = parallel.imapOrdered(_square, [1, 'x', 3], 2, timeout=10)
+        self.assertEquals(results.next(), 1)
+        self.assertRaises(TypeError, results.next)
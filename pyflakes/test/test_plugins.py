@@ -0,0 +1,298 @@
+"""
+Tests for L{pyflakes.plugins} and the checks plugins add to
+L{pyflakes.checker.Checker}.
+"""
+
+import _ast
+from hashlib import sha1
+
+from unittest import TestCase
+from pyflakes import checker, messages, plugins
+
+
+def parse(source):
+    return compile(source, '<test>', 'exec', _ast.PyCF_ONLY_AST)
+
+
+
+class PrintUsed(messages.Message):
+    message = 'print statement used'
+    __slots__ = ()
+
+
+
+class NoPrint(object):
+    """
+    A plugin reporting print statements.
+    """
+
+    messages = (PrintUsed,)
+
+    def PRINT(self, checker, node):
+        checker.report(PrintUsed, node)
+
+
+
+class Recorder(object):
+    """
+    A plugin recording what it is shown.
+    """
+
+    def __init__(self):
+        self.events = []
+
+
+    def IF(self, checker, node):
+        parent = checker.getParent(node)
+        self.events.append(('if', node.lineno, parent.__class__.__name__))
+
+
+    def EXCEPTHANDLER(self, checker, node):
+        self.events.append(('except', node.lineno))
+
+
+    def NAME(self, checker, node):
+        self.events.append(('name', node.id))
+
+
+    def bindingAdded(self, checker, node, binding):
+        self.events.append(('bound', binding.name, node.lineno))
+
+
+    def scopePopped(self, checker, scope):
+        self.events.append(('popped', scope.__class__.__name__, sorted(scope)))
+
+
+
+class ParentRecorder(object):
+    """
+    A plugin recording the nodes the checker handles as part of their
+    parent, along with the parent.
+    """
+
+    def __init__(self):
+        self.events = []
+
+
+    def record(self, checker, node):
+        self.events.append((node.__class__.__name__,
+                            checker.getParent(node).__class__.__name__))
+
+    ALIAS = ARGUMENTS = NAME = TUPLE = MODULE = STR = record
+
+
+
+class FileNames(object):
+    """
+    A plugin keeping the names used in the file being checked, and reporting
+    on the first of them once the file is done with.
+    """
+
+    messages = (PrintUsed,)
+
+    def __init__(self):
+        self.names = []
+        self.files = []
+
+
+    def NAME(self, checker, node):
+        self.names.append(node)
+
+
+    def scopePopped(self, checker, scope):
+        if scope.__class__.__name__ == 'ModuleScope':
+            self.files.append([node.id for node in self.names])
+            if self.names:
+                checker.report(PrintUsed, self.names[0])
+            self.names = []
+
+
+
+class CheckerTests(TestCase):
+    """
+    Tests for the I{plugins} of L{checker.Checker}.
+    """
+
+    def test_nodes(self):
+        """
+        Plugins are shown the nodes of the classes they subscribe to, and
+        report on them along with the checker.
+        """
+        w = checker.Checker(parse('print 1\nx\nif 1:\n    print 2\n'),
+                            plugins=[NoPrint()])
+        self.assertEquals(
+            sorted((message.lineno, message.__class__) for message in
+                   w.messages),
+            [(1, PrintUsed), (2, messages.UndefinedName), (4, PrintUsed)])
+
+
+    def test_scopes(self):
+        """
+        Plugins are told of bindings as they are added and of scopes as they
+        are left, and are shown the nodes the checker handles as part of
+        their parent.
+        """
+        recorder = Recorder()
+        checker.Checker(parse('''\
+import os
+def f(a):
+    return os
+if a:
+    pass
+elif a:
+    pass
+try:
+    pass
+except os.error:
+    pass
+'''), plugins=[recorder])
+        self.assertEquals(recorder.events, [
+            ('bound', 'os', 1),
+            ('bound', 'f', 2),
+            ('if', 4, 'Module'),
+            ('name', 'a'),
+            ('popped', 'ConditionScope', []),
+            ('if', 6, 'If'),
+            ('name', 'a'),
+            ('popped', 'ConditionScope', []),
+            ('popped', 'ConditionScope', []),
+            ('popped', 'ConditionScope', []),
+            ('except', 10),
+            ('name', 'os'),
+            ('popped', 'ConditionScope', []),
+            ('name', 'a'),
+            ('bound', 'a', 2),
+            ('name', 'os'),
+            ('popped', 'FunctionScope', ['a']),
+            ('popped', 'ModuleScope', ['f', 'os'])])
+
+
+    def test_consumedNodes(self):
+        '''
+        Plugins are shown the names of imports and the parameters of
+        functions, which the checker handles as part of their statement.
+        '''
+        recorder = ParentRecorder()
+        checker.Checker(parse(
+            'from os import path\n'
+            'import sys\n'
+            'def f(a, (b, c)=()):\n'
+            '    pass\n'
+            'lambda x: 1\n'), plugins=[recorder])
+        self.assertEquals(recorder.events, [
+            ('Module', 'NoneType'),
+            ('alias', 'ImportFrom'),
+            ('alias', 'Import'),
+            ('arguments', 'FunctionDef'),
+            ('Tuple', 'FunctionDef'),
+            ('arguments', 'Lambda'),
+            ('Name', 'arguments'),
+            ('Tuple', 'arguments'),
+            ('Name', 'Tuple'),
+            ('Name', 'Tuple'),
+            ('Name', 'arguments')])
+
+
+    def test_checkedNodes(self):
+        '''
+        Plugins are shown the tree itself and the strings whose formats the
+        checker looks into.
+        '''
+        recorder = ParentRecorder()
+        checker.Checker(parse(
+            "'%s' % (1,)\n"
+            "'{0}'.format(1)\n"), plugins=[recorder])
+        self.assertEquals(recorder.events, [
+            ('Module', 'NoneType'),
+            ('Str', 'BinOp'),
+            ('Tuple', 'BinOp'),
+            ('Str', 'Attribute')])
+
+
+    def test_truncated(self):
+        '''
+        The module scope is popped even when checking stops at the message
+        budget, so that the next file is checked afresh.
+        '''
+        plugin = FileNames()
+        w = checker.Checker(parse('a\nb\nc\n'), plugins=[plugin],
+                            maxMessages=1)
+        self.assertTrue(w.truncated)
+        self.assertEquals([message.lineno for message in w.messages], [1])
+        w = checker.Checker(parse('import os\nos\n'), plugins=[plugin])
+        self.assertEquals(plugin.files, [['a', 'b'], ['os']])
+        self.assertEquals([message.__class__ for message in w.messages],
+                          [PrintUsed])
+
+
+    def test_noOverhead(self):
+        """
+        Node classes no plugin subscribes to keep the handlers shared by all
+        checkers, and without plugins all of them do.
+        """
+        table = checker.Checker._nodeHandlers()
+        w = checker.Checker(parse(''), plugins=[NoPrint()])
+        self.assertIs(w._handlers[_ast.Num], table[_ast.Num])
+        self.assertIs(w._handlers[_ast.Tuple], table[_ast.Tuple])
+        self.assertNotEquals(w._handlers[_ast.Print], table[_ast.Print])
+        self.assertIs(checker.Checker(parse(''))._handlers, table)
+        self.assertIs(checker.Checker(parse(''), plugins=[object()])._handlers,
+                      table)
+
+
+    def test_disabled(self):
+        """
+        Plugins none of whose messages are enabled are not run.
+        """
+        recorder = Recorder()
+        recorder.messages = (PrintUsed,)
+        w = checker.Checker(parse('print x\n'), plugins=[NoPrint(), recorder],
+                            enabled=set([messages.UndefinedName]))
+        self.assertEquals([message.__class__ for message in w.messages],
+                          [messages.UndefinedName])
+        self.assertEquals(recorder.events, [])
+        self.assertIs(w._handlers, checker.Checker._nodeHandlers())
+
+
+
+class LoadPluginTests(TestCase):
+    """
+    Tests for L{plugins.loadPlugin}, L{plugins.loadPlugins} and
+    L{plugins.pluginVersion}.
+    """
+
+    def test_load(self):
+        self.assertTrue(isinstance(
+            plugins.loadPlugin('pyflakes.test.test_plugins.NoPrint'), NoPrint))
+
+
+    def test_oncePerProcess(self):
+        first = plugins.loadPlugins(['pyflakes.test.test_plugins.Recorder'])
+        second = plugins.loadPlugins(['pyflakes.test.test_plugins.Recorder'])
+        self.assertEquals(len(first), 1)
+        self.assertIs(first[0], second[0])
+
+
+    def test_errors(self):
+        """
+        Names which do not lead to a class are errors.
+        """
+        for name in ['NoPrint', 'pyflakes.no_such_module.Plugin',
+                     'pyflakes.test.test_plugins.NoSuchPlugin']:
+            self.assertRaises(ValueError, plugins.loadPlugin, name)
+
+
+    def test_version(self):
+        """
+        The version of a plugin is the C{__version__} of its module, or else
+        a hash of the module's source.
+        """
+        import pyflakes
+        self.assertEquals(plugins.pluginVersion('pyflakes.Plugin'),
+                          pyflakes.__version__)
+        source = open(__file__.replace('.pyc', '.py'), 'rb').read()
+        self.assertEquals(
+            plugins.pluginVersion('pyflakes.test.test_plugins.NoPrint'),
+            sha1(source).hexdigest())
+        self.assertRaises(ValueError, plugins.pluginVersion,
+                          'pyflakes.no_such_module.Plugin')
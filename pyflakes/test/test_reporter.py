@@ -0,0 +1,93 @@
+"""
+Tests for L{pyflakes.reporter}.
+"""
+
+import time
+from StringIO import StringIO
+
+from unittest import TestCase
+
+from pyflakes.reporter import BufferedStream, Reporter
+from pyflakes.scripts.pyflakes import _checkSource
+
+
+class CountingStream(StringIO):
+    writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        StringIO.write(self, data)
+
+
+
+class ReporterTests(TestCase):
+    """
+    Tests for L{Reporter} and L{BufferedStream}.
+    """
+
+    def test_buffering(self):
+        """
+        Output is passed on in chunks of at least the buffer size.
+        """
+        stream = CountingStream()
+        buffered = BufferedStream(stream, 10)
+        print >> buffered, 'abc'
+        print >> buffered, 'def'
+        self.assertEquals(stream.writes, 0)
+        print >> buffered, 'ghi', 'jkl'
+        self.assertEquals(stream.writes, 1)
+        self.assertEquals(stream.getvalue(), 'abc\ndef\nghi')
+        buffered.flush()
+        self.assertEquals(stream.getvalue(), 'abc\ndef\nghi jkl\n')
+
+
+    def test_report(self):
+        """
+        L{Reporter} prints what L{FileResult.report} would, in the same order,
+        with problems and warnings sharing one stream by default.
+        """
+        results = [_checkSource('import os\nimport sys\n', 'a.py'),
+                   _checkSource('def f(:\n', 'b.py'),
+                   _checkSource('x\n', 'c.py')]
+        expected = StringIO()
+        for result in results:
+            result.report(expected, expected)
+
+        stream = CountingStream()
+        reporter = Reporter(stream, interval=3600)
+        self.assertEquals(sum(map(reporter.report, results)), 4)
+        self.assertEquals(stream.writes, 0)
+        reporter.close()
+        self.assertEquals(stream.writes, 1)
+        self.assertEquals(stream.getvalue(), expected.getvalue())
+        self.assertEquals(reporter.count, 4)
+
+
+    def test_separateStreams(self):
+        """
+        Problems which prevent checking go to C{stderr} if it is given.
+        """
+        out, err = StringIO(), StringIO()
+        reporter = Reporter(out, err)
+        reporter.report(_checkSource('def f(:\n', 'b.py'))
+        reporter.report(_checkSource('x\n', 'c.py'))
+        reporter.close()
+        self.assertEquals(out.getvalue(), "c.py:1: undefined name 'x'\n")
+        self.assertEquals(err.getvalue().splitlines()[0],
+                          'b.py:1: invalid syntax')
+
+
+    def test_interval(self):
+        """
+        Buffered output is written out after C{interval} seconds even when
+        no further result is reported, until the reporter is closed.
+        """
+        stream = CountingStream()
+        reporter = Reporter(stream, interval=0.01)
+        reporter.report(_checkSource('x\n', 'c.py'))
+        deadline = time.time() + 10
+        while not stream.writes and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEquals(stream.getvalue(), "c.py:1: undefined name 'x'\n")
+        reporter.close()
+        self.assertFalse(reporter._flusher.isAlive())
@@ -95,6 +95,76 @@ class ConditionalScopesTest(Test):
         """)
 
 
+    def test_alternative_imports_used_later(self):
+        self.flakes("""
+        import sys
+        if sys.platform:
+            import json
+        elif sys.version:
+            import simplejson as json
+        else:
+            json = None
+        json
+        """)
+
+    def test_import_in_some_branches(self):
+        """
+        An import in some branches of a chain but not all is only used by
+        the code after it in the branches before the last one without it.
+        """
+        self.flakes("""
+        import sys
+        if sys.platform:
+            import json
+        elif sys.version:
+            pass
+        else:
+            import simplejson as json
+        json
+        """)
+        self.flakes("""
+        import sys
+        for arg in sys.argv:
+            if arg:
+                pass
+            elif sys.version:
+                import json
+            else:
+                pass
+        """, m.UnusedImport)
+
+    def test_unused_import_in_branch_reported_once(self):
+        self.flakes("""
+        if True:
+            import os
+        elif False:
+            import sys
+        """, m.UnusedImport, m.UnusedImport)
+
+    def test_long_elif_chain(self):
+        lines = ["def f(op):", "    if op == 0:", "        result = 0"]
+        for i in range(1, 1000):
+            lines.append("    elif op == %d:" % (i,))
+            lines.append("        result = %d" % (i,))
+        lines.extend(["    else:", "        result = None",
+                      "    return result", ""])
+        self.flakes("\n".join(lines))
+
+    def test_long_elif_chain_of_imports(self):
+        arms = ["if op == 0:\n    import mod0\n"]
+        for i in range(1, 1000):
+            arms.append("elif op == %d:\n    import mod%d\n" % (i, i))
+        self.flakes("op = 1\n" + "".join(arms), *[m.UnusedImport] * 1000)
+
+    def test_elif_test_in_branch(self):
+        self.flakes("""
+        def f(a, b):
+            if a:
+                pass
+            elif [x for x in b]:
+                return x
+        """)
+
     def test_nested_id_wont_mess(self):
         self.flakes("""
             if 1:
@@ -3,12 +3,18 @@
 Tests for L{pyflakes.scripts.pyflakes}.
 """
 
+import os
 import sys
+import time
+import signal
+import shutil
+import tempfile
 from StringIO import StringIO
 
 from unittest import TestCase
-from pyflakes.scripts.pyflakes import check, checkPath
+from pyflakes.scripts.pyflakes import check, checkPath, check_many
 from pyflakes.scripts import pyflakes
+from pyflakes import messages, watchdog, formats, plugins
 
 
 class CheckTests(TestCase):
@@ -174,3 +180,380 @@ x = "\N{SNOWMAN}"
         self.assertEquals(count, 1)
         self.assertEquals(
             err.getvalue(), "dummy.py: problem decoding source\n")
+
+
+
+class StuckChecker(pyflakes.FileChecker):
+    """
+    A file checker which gets stuck on C{stuck.py}, out of reach of its own
+    timeout.
+    """
+
+    def checkItem(self, item):
+        if item[0] == 'stuck.py':
+            signal.signal(signal.SIGALRM, signal.SIG_IGN)
+            time.sleep(60)
+        return pyflakes.FileChecker.checkItem(self, item)
+
+
+
+class SlowNames(object):
+    """
+    A plugin taking its time over names, and keeping those of the file being
+    checked until its module scope is left.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.files = 0
+
+
+    def NAME(self, checker, node):
+        self.names.append(node.id)
+        time.sleep(0.005)
+
+
+    def scopePopped(self, checker, scope):
+        if scope.__class__.__name__ == 'ModuleScope':
+            self.names = []
+            self.files += 1
+
+
+
+class CheckManyTests(TestCase):
+    """
+    Tests for L{check_many}, the batch checking API.
+    """
+
+    def test_results(self):
+        """
+        Sources and paths are checked in order, yielding structured results.
+        """
+        results = check_many([('a.py', 'import os\n'),
+                              ('b.py', 'def f(:\n'),
+                              'no/such/file.py'])
+        a, b, c = list(results)
+
+        self.assertEquals(a.filename, 'a.py')
+        self.assertEquals([type(m) for m in a.messages],
+                          [messages.UnusedImport])
+        self.assertEquals(a.messages[0].lineno, 1)
+        self.assertEquals(a.count, 1)
+        self.assertTrue(a.elapsed >= 0)
+
+        self.assertEquals(b.messages, [])
+        msg, lineno, offset, line = b.syntaxError
+        self.assertEquals((lineno, line), (1, 'def f(:'))
+
+        self.assertEquals(c.ioError, 'No such file or directory')
+
+
+    def test_lazy(self):
+        """
+        Results are produced as they are asked for.
+        """
+        seen = []
+        def items():
+            for i in range(3):
+                seen.append(i)
+                yield ('m%d.py' % i, 'x%d\n' % i)
+        results = check_many(items())
+        self.assertEquals(seen, [])
+        results.next()
+        self.assertEquals(seen, [0])
+
+
+    def test_jobs(self):
+        """
+        A worker pool produces the same results in the same order.
+        """
+        items = [('m%d.py' % i, 'import os\n' * (i % 3)) for i in range(12)]
+        serial = [map(str, r.messages) for r in check_many(items)]
+        pooled = [map(str, r.messages) for r in check_many(items, jobs=3)]
+        self.assertEquals(pooled, serial)
+
+
+    def test_timeout(self):
+        """
+        Files taking too long to check are reported as timed out, along with
+        how long they took, and the others are checked as usual.
+        """
+        if not watchdog.canInterrupt():
+            self.skipTest('SIGALRM timers are not available')
+        slow = ''.join(['x%d = y%d\n' % (i, i) for i in range(20000)])
+        results = list(check_many(
+            [('a.py', 'a\n'), ('slow.py', slow), ('b.py', 'b\n')],
+            checkFile=pyflakes.FileChecker(timeout=0.01)))
+        self.assertEquals([(r.filename, r.count, r.timedOut) for r in results],
+                          [('a.py', 1, False), ('slow.py', 1, True),
+                           ('b.py', 1, False)])
+        self.assertEquals(results[1].messages, [])
+        self.assertTrue(results[1].elapsed >= 0.01)
+        err = StringIO()
+        results[1].report(err, err)
+        self.assertTrue(err.getvalue().startswith('slow.py: timed out after '),
+                        err.getvalue())
+
+
+    def test_timeoutResets(self):
+        """
+        A timeout may strike anywhere, so the format caches are emptied
+        afterwards, and plugins are told that the module scope is left.
+        """
+        if not watchdog.canInterrupt():
+            self.skipTest('SIGALRM timers are not available')
+        name = 'pyflakes.test.test_script.SlowNames'
+        plugin, = plugins.loadPlugins([name])
+        files = plugin.files
+        checkFile = pyflakes.FileChecker(pluginNames=[name], timeout=0.01)
+        result = checkFile(('slow.py', "'%s' % (x,)\n" + 'x\n' * 100))
+        self.assertTrue(result.timedOut)
+        self.assertEquals(len(formats.percentFormats), 0)
+        self.assertEquals((plugin.names, plugin.files), ([], files + 1))
+
+
+    def test_stuckWorker(self):
+        """
+        A worker stuck on a file well past the timeout is replaced, and the
+        file is reported as timed out.
+        """
+        items = [('a.py', 'a\n'), ('stuck.py', ''), ('b.py', 'b\n'),
+                 ('c.py', 'c\n')]
+        start = time.time()
+        results = list(check_many(items, 2, StuckChecker(timeout=0.2)))
+        self.assertTrue(time.time() - start < 30)
+        self.assertEquals([(r.filename, r.count, r.timedOut) for r in results],
+                          [('a.py', 1, False), ('stuck.py', 1, True),
+                           ('b.py', 1, False), ('c.py', 1, False)])
+
+
+
+class MainTests(TestCase):
+    """
+    Tests for L{pyflakes.main}, the command-line entry point.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+
+    def makeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        f = open(path, 'w')
+        f.write(content)
+        f.close()
+        return path
+
+
+    def runMain(self, *args):
+        """
+        Run L{pyflakes.main} with C{args}, returning its exit status and what
+        it wrote to standard output.
+        """
+        out = StringIO()
+        self.patch(sys, 'stdout', out)
+        try:
+            pyflakes.main(list(args))
+        except SystemExit, e:
+            return e.code, out.getvalue()
+        self.fail('main() did not exit')
+
+
+    def patch(self, obj, name, value):
+        old = getattr(obj, name)
+        setattr(obj, name, value)
+        self.addCleanup(setattr, obj, name, old)
+
+
+    def test_clean(self):
+        """
+        A tree without warnings produces no output and a zero exit status.
+        """
+        self.makeFile('a.py', 'import os\nos\n')
+        self.assertEquals(self.runMain(self.tempdir), (False, ''))
+
+
+    def test_jobs(self):
+        """
+        Checking with several processes gives exactly the output and exit
+        status of checking serially.
+        """
+        for i in range(20):
+            self.makeFile('pkg%d/mod%d.py' % (i % 3, i),
+                          'import os\n' * (i % 2) + 'undefined%d\n' % i)
+        self.makeFile('pkg1/broken.py', 'def f(:\n')
+        serial = self.runMain('--jobs', '1', self.tempdir)
+        self.assertEquals(serial[0], True)
+        self.assertEquals(serial[1].count('undefined name'), 20)
+        self.assertEquals(self.runMain('-j', '4', self.tempdir), serial)
+
+
+    def test_cache(self):
+        """
+        Running again with a result cache gives the same output.
+        """
+        for i in range(5):
+            self.makeFile('mod%d.py' % i, 'import os\n' * (i % 2))
+        self.makeFile('broken.py', 'def f(:\n')
+        cacheFile = os.path.join(self.tempdir, 'cache.sqlite')
+        first = self.runMain('-j1', '--cache', cacheFile, self.tempdir)
+        self.assertEquals(first[1].count('imported but unused'), 2)
+        self.assertEquals(
+            self.runMain('-j2', '--cache', cacheFile, self.tempdir), first)
+
+
+    def test_builtins(self):
+        """
+        I{--target-version} selects the builtins names may come from, and
+        I{--builtins} adds more.
+        """
+        path = self.makeFile('a.py', 'next\n_\n')
+        status, out = self.runMain('--target-version', '2.5', path)
+        self.assertEquals(out.splitlines(), [
+            "%s:1: undefined name 'next'" % (path,),
+            "%s:2: undefined name '_'" % (path,)])
+        self.assertEquals(self.runMain('--builtins', 'foo, _', path),
+                          (False, ''))
+
+
+    def test_builtinsCacheKey(self):
+        """
+        Results cached under other builtins are not reused.
+        """
+        path = self.makeFile('a.py', '_\n')
+        cacheFile = os.path.join(self.tempdir, 'cache.sqlite')
+        self.assertEquals(
+            self.runMain('-j1', '--cache', cacheFile, path),
+            (True, "%s:1: undefined name '_'\n" % (path,)))
+        self.assertEquals(
+            self.runMain('-j1', '--cache', cacheFile, '--builtins', '_', path),
+            (False, ''))
+
+
+    def test_pluginCacheKey(self):
+        """
+        Results cached while a plugin was different are not reused.
+        """
+        pluginDir = os.path.join(self.tempdir, 'plugins')
+        pluginFile = os.path.join(pluginDir, 'cachedplugin.py')
+        self.makeFile(pluginFile, 'from pyflakes.test.test_plugins '
+                                  'import NoPrint as Checks\n')
+        path = self.makeFile(os.path.join('src', 'a.py'), 'print 1\n')
+        cacheFile = os.path.join(self.tempdir, 'cache.sqlite')
+        self.patch(sys, 'path', [pluginDir] + sys.path)
+        self.patch(sys, 'dont_write_bytecode', True)
+        def forget():
+            sys.modules.pop('cachedplugin', None)
+            plugins._loaded.pop('cachedplugin.Checks', None)
+        self.addCleanup(forget)
+        args = ('-j1', '--cache', cacheFile, '--plugin', 'cachedplugin.Checks',
+                path)
+        self.assertEquals(self.runMain(*args),
+                          (True, '%s:1: print statement used\n' % (path,)))
+        forget()
+        self.makeFile(pluginFile, 'class Checks(object):\n    pass\n')
+        self.assertEquals(self.runMain(*args), (False, ''))
+
+
+    def test_plugin(self):
+        """
+        I{--plugin} runs the checks of a plugin class as well, in worker
+        processes too; an unknown class is a usage error.
+        """
+        path = self.makeFile('a.py', 'print x\n')
+        self.assertEquals(
+            self.runMain('-j2', '--plugin',
+                         'pyflakes.test.test_plugins.NoPrint', path),
+            (True, "%s:1: print statement used\n"
+                   "%s:1: undefined name 'x'\n" % (path, path)))
+        self.patch(sys, 'stderr', StringIO())
+        self.assertRaises(SystemExit, pyflakes.main,
+                          ['--plugin', 'pyflakes.test.NoSuchPlugin', path])
+
+
+    def test_selectIgnore(self):
+        """
+        I{--select} and I{--ignore} choose the messages reported by code or
+        class name, including those of plugins; unknown ones are a usage
+        error.
+        """
+        path = self.makeFile('a.py', 'import os\nprint x\n')
+        self.assertEquals(
+            self.runMain('--select', 'F8,PrintUsed', '--plugin',
+                         'pyflakes.test.test_plugins.NoPrint', path),
+            (True, "%s:2: print statement used\n"
+                   "%s:2: undefined name 'x'\n" % (path, path)))
+        self.assertEquals(
+            self.runMain('--ignore', 'F821', path),
+            (True, "%s:1: 'os' imported but unused\n" % (path,)))
+        self.assertEquals(
+            self.runMain('--select', 'F8', '--ignore', 'UndefinedName', path),
+            (False, ''))
+        self.patch(sys, 'stderr', StringIO())
+        self.assertRaises(SystemExit, pyflakes.main,
+                          ['--select', 'PrintUsed', path])
+
+
+    def test_maxMessagesPerFile(self):
+        """
+        I{--max-messages-per-file} stops checking a file with too many
+        warnings and says so.
+        """
+        path = self.makeFile('a.py', 'a\nb\nc\n')
+        self.assertEquals(
+            self.runMain('--max-messages-per-file', '2', path),
+            (True, "%s:1: undefined name 'a'\n"
+                   "%s:2: undefined name 'b'\n"
+                   "%s: more than 2 messages, stopped\n" % (path, path, path)))
+        self.assertEquals(
+            self.runMain('--max-messages-per-file', '3', path)[1].count('\n'),
+            3)
+
+
+    def test_failFast(self):
+        """
+        With I{--fail-fast}, files after the first with warnings are not
+        reported, whether checked serially or in parallel.
+        """
+        paths = [self.makeFile('m%d.py' % (i,),
+                               'undefined%d\n' % (i,) * (i % 2))
+                 for i in range(8)]
+        for jobs in ['1', '3']:
+            self.assertEquals(
+                self.runMain('-j', jobs, '--fail-fast', *paths),
+                (True, "%s:1: undefined name 'undefined1'\n" % (paths[1],)))
+        self.assertEquals(
+            self.runMain('--fail-fast', paths[0], paths[2]), (False, ''))
+
+
+    def test_timeout(self):
+        """
+        I{--timeout} gives up on files taking too long, reporting them as
+        timed out, and goes on with the others.
+        """
+        if not watchdog.canInterrupt():
+            self.skipTest('SIGALRM timers are not available')
+        slow = self.makeFile(
+            'slow.py', ''.join(['x%d = y%d\n' % (i, i) for i in range(20000)]))
+        other = self.makeFile('other.py', 'other\n')
+        status, out = self.runMain('-j1', '--timeout', '0.01', slow, other)
+        self.assertEquals(status, True)
+        lines = out.splitlines()
+        self.assertTrue(lines[0].startswith('%s: timed out after ' % (slow,)),
+                        lines[0])
+        self.assertEquals(lines[1:],
+                          ["%s:1: undefined name 'other'" % (other,)])
+
+
+    def test_listMessages(self):
+        status, out = self.runMain('--list-messages')
+        self.assertEquals(status, False)
+        self.assertEquals(out.splitlines()[0], 'F401 UnusedImport')
+        self.assertEquals(len(out.splitlines()),
+                          len(pyflakes.messages.messageClasses()))
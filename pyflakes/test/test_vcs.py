@@ -0,0 +1,260 @@
+"""
+Tests for L{pyflakes.vcs}.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from unittest import TestCase
+from pyflakes import vcs
+from pyflakes.scripts import pyflakes
+
+
+DIFF = """\
+diff --git a/a.py b/a.py
+index 1111111..2222222 100644
+--- a/a.py
++++ b/a.py
+@@ -3,0 +4,2 @@ def f():
++    x = 1
++    y = 2
+@@ -10 +12 @@ def g():
+-    old
++    new
+@@ -20,3 +21,0 @@ def h():
+-    gone
+-    gone
+-    gone
+diff --git a/README b/README
+--- a/README
++++ b/README
+@@ -1 +1 @@
+-old
++new
+diff --git a/removed.py b/removed.py
+--- a/removed.py
++++ b/removed.py
+@@ -5,2 +4,0 @@
+-x
+-y
+"""
+
+
+class ParseDiffTests(TestCase):
+    """
+    Tests for L{vcs.parseDiff} and L{vcs.inRanges}.
+    """
+
+    def test_parseDiff(self):
+        """
+        Added and changed lines of Python files are collected; deletions and
+        other files are not.
+        """
+        self.assertEquals(vcs.parseDiff(DIFF, '/root'),
+                          {'/root/a.py': [(4, 5), (12, 12)]})
+
+
+    def test_inRanges(self):
+        ranges = [(4, 5), (12, 12), (20, 30)]
+        self.assertEquals(
+            [n for n in range(35) if vcs.inRanges(n, ranges)],
+            [4, 5, 12] + range(20, 31))
+        self.assertFalse(vcs.inRanges(1, []))
+
+
+
+class RepositoryTestCase(TestCase):
+    """
+    A test case run in a fresh git repository.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tempdir)
+        try:
+            vcs.git(['init', '-q'])
+        except vcs.GitError:
+            os.chdir(self.cwd)
+            shutil.rmtree(self.tempdir)
+            self.skipTest('git is not available')
+        vcs.git(['config', 'user.email', 'test@example.com'])
+        vcs.git(['config', 'user.name', 'Test'])
+
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tempdir)
+
+
+    def makeFile(self, name, content):
+        if os.path.dirname(name) and not os.path.isdir(os.path.dirname(name)):
+            os.makedirs(os.path.dirname(name))
+        f = open(name, 'w')
+        f.write(content)
+        f.close()
+
+
+    def commit(self):
+        vcs.git(['add', '-A'])
+        vcs.git(['commit', '-q', '-m', 'commit'])
+
+
+    def runMain(self, *args):
+        out = StringIO()
+        stdout, sys.stdout = sys.stdout, out
+        try:
+            pyflakes.main(list(args))
+        except SystemExit, e:
+            sys.stdout = stdout
+            return e.code, out.getvalue()
+        sys.stdout = stdout
+        self.fail('main() did not exit')
+
+
+
+class DiffModeTests(RepositoryTestCase):
+    """
+    Tests for the I{--diff} option of L{pyflakes.main}.
+    """
+
+    def test_changedLinesOnly(self):
+        """
+        Only changed files are checked, and only warnings on changed lines
+        are reported.
+        """
+        self.makeFile('a.py', 'import os\n\nundefined1\n')
+        self.makeFile('pkg/b.py', 'undefined2\n')
+        self.commit()
+        self.makeFile('a.py', 'import os\nimport sys\nundefined1\nundefined3\n')
+        status, out = self.runMain('--diff', 'HEAD')
+        self.assertEquals(status, True)
+        self.assertEquals(out.splitlines(), [
+            "a.py:2: 'sys' imported but unused",
+            "a.py:4: undefined name 'undefined3'"])
+
+
+    def test_paths(self):
+        """
+        Paths restrict which part of the diff is considered.
+        """
+        self.makeFile('a.py', '')
+        self.makeFile('pkg/b.py', '')
+        self.commit()
+        self.makeFile('a.py', 'undefined1\n')
+        self.makeFile('pkg/b.py', 'undefined2\n')
+        status, out = self.runMain('--diff', 'HEAD', 'pkg')
+        self.assertEquals(out, "%s:1: undefined name 'undefined2'\n"
+                          % (os.path.join('pkg', 'b.py'),))
+
+
+    def test_unchanged(self):
+        """
+        Nothing is reported when no Python file changed.
+        """
+        self.makeFile('a.py', 'undefined1\n')
+        self.commit()
+        self.assertEquals(self.runMain('--diff', 'HEAD'), (False, ''))
+
+
+    def test_prefixConfiguration(self):
+        """
+        The diff is parsed whatever prefixes the user configured git to show
+        instead of C{a/} and C{b/}.
+        """
+        self.makeFile('a.py', '')
+        self.commit()
+        self.makeFile('a.py', 'undefined1\n')
+        for name in ['diff.noprefix', 'diff.mnemonicPrefix']:
+            vcs.git(['config', name, 'true'])
+            self.assertEquals(self.runMain('--diff', 'HEAD'),
+                              (True, "a.py:1: undefined name 'undefined1'\n"))
+            vcs.git(['config', '--unset', name])
+
+
+    def test_relativePath(self):
+        """
+        Changed files are named relative to the current directory, even
+        from a subdirectory of the working tree.
+        """
+        self.makeFile('a.py', '')
+        self.makeFile('pkg/b.py', '')
+        self.commit()
+        self.makeFile('a.py', 'x\n')
+        self.makeFile('pkg/b.py', 'y\n')
+        os.chdir('pkg')
+        self.assertEquals(
+            sorted(vcs.changedLines('HEAD')),
+            [os.path.join(os.pardir, 'a.py'), 'b.py'])
+
+
+    def test_badRevision(self):
+        """
+        An unknown revision is a usage error.
+        """
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            self.assertRaises(SystemExit, pyflakes.main,
+                              ['--diff', 'no-such-revision'])
+        finally:
+            sys.stderr = stderr
+
+
+
+class GitModeTests(RepositoryTestCase):
+    """
+    Tests for L{vcs.indexedFiles} and the I{--git} option of
+    L{pyflakes.main}.
+    """
+
+    def test_indexedFiles(self):
+        """
+        Tracked Python files are listed with their blob unless modified.
+        """
+        self.makeFile('a.py', 'x = 1\n')
+        self.makeFile('b.py', 'y = 1\n')
+        self.makeFile('gone.py', '')
+        self.makeFile('README', '')
+        self.makeFile('pkg/c.py', '')
+        self.commit()
+        self.makeFile('b.py', 'y = 2\n')
+        self.makeFile('untracked.py', '')
+        os.remove('gone.py')
+        blob = vcs.git(['rev-parse', 'HEAD:a.py']).strip()
+        self.assertEquals(
+            [(entry.path, entry.blob) for entry in vcs.indexedFiles()],
+            [('a.py', blob), ('b.py', None),
+             ('pkg/c.py', vcs.git(['rev-parse', 'HEAD:pkg/c.py']).strip())])
+        self.assertEquals(
+            [entry.path for entry in vcs.indexedFiles(['pkg'])],
+            ['pkg/c.py'])
+
+
+    def test_blobCache(self):
+        """
+        With a cache, unmodified files are answered for by their blob hash
+        without being read.
+        """
+        self.makeFile('a.py', 'import os\n')
+        self.makeFile('b.py', 'undefined\n')
+        self.commit()
+        cacheFile = os.path.join(self.tempdir, '.git', 'pyflakes.sqlite')
+        first = self.runMain('--git', '-j1', '--cache', cacheFile)
+        self.assertEquals(first, (True, "a.py:1: 'os' imported but unused\n"
+                                        "b.py:1: undefined name 'undefined'\n"))
+        self.makeFile('b.py', 'import sys\n')
+        opened = []
+        def recordingOpen(name, *args):
+            opened.append(name)
+            return open(name, *args)
+        pyflakes.open = recordingOpen
+        try:
+            second = self.runMain('--git', '-j1', '--cache', cacheFile)
+        finally:
+            del pyflakes.open
+        self.assertEquals(opened, ['b.py'])
+        self.assertEquals(second, (True, "a.py:1: 'os' imported but unused\n"
+                                         "b.py:1: 'sys' imported but unused\n"))
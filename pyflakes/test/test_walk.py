@@ -0,0 +1,120 @@
+"""
+Tests for L{pyflakes.walk}.
+"""
+
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+from pyflakes import walk
+from pyflakes.scripts.pyflakes import iterSourcePaths
+
+
+class CompileExcludeTests(TestCase):
+    """
+    Tests for L{walk.compileExclude}.
+    """
+
+    def test_none(self):
+        self.assertEquals(walk.compileExclude([]), None)
+
+
+    def test_names(self):
+        """
+        Patterns without a separator match base names only.
+        """
+        excluded = walk.compileExclude(['.git', '*.egg', 'build?'])
+        self.assertTrue(excluded('x/.git', '.git'))
+        self.assertTrue(excluded('foo.egg', 'foo.egg'))
+        self.assertTrue(excluded('a/build2', 'build2'))
+        self.assertFalse(excluded('a/build', 'build'))
+        self.assertFalse(excluded('a/.github', '.github'))
+        self.assertFalse(excluded('a/foo.egg.py', 'foo.egg.py'))
+
+
+    def test_paths(self):
+        """
+        Patterns with a separator match absolute paths.
+        """
+        excluded = walk.compileExclude(['./gen/*'])
+        self.assertTrue(excluded('gen/a.py', 'a.py'))
+        self.assertTrue(excluded(os.path.abspath('gen/a.py'), 'a.py'))
+        self.assertFalse(excluded('src/gen/a.py', 'a.py'))
+
+
+
+class WalkTests(TestCase):
+    """
+    Tests for L{walk.walk} and L{iterSourcePaths}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        for name in ['a.py', 'b.txt', 'pkg/c.py', 'pkg/sub/d.py',
+                     '.git/hooks/e.py', 'node_modules/f.py', 'pkg/.tox/g.py',
+                     'z.py']:
+            path = os.path.join(self.tempdir, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+
+    def relative(self, paths):
+        return [os.path.relpath(path, self.tempdir) for path in paths]
+
+
+    def test_walk(self):
+        """
+        Directories come parents first, in sorted order, with their files.
+        """
+        self.assertEquals(
+            [(os.path.relpath(dirpath, self.tempdir), filenames)
+             for dirpath, filenames in walk.walk(self.tempdir)],
+            [('.', ['a.py', 'b.txt', 'z.py']),
+             ('.git', []),
+             ('.git/hooks', ['e.py']),
+             ('node_modules', ['f.py']),
+             ('pkg', ['c.py']),
+             ('pkg/.tox', ['g.py']),
+             ('pkg/sub', ['d.py'])])
+
+
+    def test_prune(self):
+        """
+        Excluded directories are not descended into.
+        """
+        listed = []
+        entries = walk._entries
+        def recordingEntries(directory):
+            listed.append(os.path.relpath(directory, self.tempdir))
+            return entries(directory)
+        walk._entries = recordingEntries
+        try:
+            list(walk.walk(self.tempdir,
+                           walk.compileExclude(walk.DEFAULT_EXCLUDE)))
+        finally:
+            walk._entries = entries
+        self.assertEquals(listed, ['.', 'pkg', 'pkg/sub'])
+
+
+    def test_defaultExclude(self):
+        self.assertEquals(
+            self.relative(iterSourcePaths([self.tempdir])),
+            ['a.py', 'z.py', 'pkg/c.py', 'pkg/sub/d.py'])
+
+
+    def test_exclude(self):
+        """
+        Files can be excluded too, and explicitly named paths never are.
+        """
+        exclude = walk.compileExclude(['sub', 'z.py'])
+        self.assertEquals(
+            self.relative(iterSourcePaths(
+                [self.tempdir, os.path.join(self.tempdir, 'z.py')], exclude)),
+            ['a.py', '.git/hooks/e.py', 'node_modules/f.py', 'pkg/c.py',
+             'pkg/.tox/g.py', 'z.py'])
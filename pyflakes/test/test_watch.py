@@ -0,0 +1,114 @@
+"""
+Tests for L{pyflakes.watch}.
+"""
+
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from unittest import TestCase
+
+from pyflakes import watch
+from pyflakes.scripts.pyflakes import FileChecker, iterSourcePaths
+
+
+class WatcherTests(TestCase):
+    """
+    Tests for L{watch.Watcher} and the observers which drive it.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+
+    def makeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        f = open(path, 'w')
+        f.write(content)
+        f.close()
+        return path
+
+
+    def test_difference(self):
+        """
+        Repeated entries are compared by how often they occur.
+        """
+        self.assertEquals(watch._difference(['a', 'b', 'b'], ['b', 'c']),
+                          (['c'], ['a', 'b']))
+
+
+    def test_deltas(self):
+        """
+        After the initial full report, only warnings which appeared or went
+        away are reported, and only changed files are checked again.
+        """
+        a = self.makeFile('a.py', 'import os\n')
+        b = self.makeFile('b.py', 'import sys\n')
+        checked = []
+        def checkFile(path):
+            checked.append(path)
+            return FileChecker()(path)
+        out = StringIO()
+        watcher = watch.Watcher(checkFile, out)
+        watcher.checkAll(iterSourcePaths([self.tempdir]))
+        self.assertEquals(out.getvalue(),
+                          "%s:1: 'os' imported but unused\n"
+                          "%s:1: 'sys' imported but unused\n" % (a, b))
+
+        out.truncate(0)
+        del checked[:]
+        self.makeFile('a.py', 'import os\nos\nundefined\n')
+        watcher.update([a])
+        self.assertEquals(checked, [a])
+        self.assertEquals(out.getvalue(),
+                          "- %s:1: 'os' imported but unused\n"
+                          "+ %s:3: undefined name 'undefined'\n" % (a, a))
+
+        out.truncate(0)
+        os.remove(b)
+        watcher.update([b])
+        self.assertEquals(out.getvalue(),
+                          "- %s:1: 'sys' imported but unused\n" % (b,))
+        self.assertEquals(watcher.count(), 1)
+
+
+    def test_polling(self):
+        """
+        L{watch.PollingObserver} reports created, modified and deleted files.
+        """
+        a = self.makeFile('a.py', 'x = 1\n')
+        b = self.makeFile('b.py', 'x = 1\n')
+        observer = watch.PollingObserver([self.tempdir], iterSourcePaths, 0)
+        self.makeFile('a.py', 'x = 12\n')
+        os.remove(b)
+        c = self.makeFile('c.py', '')
+        self.assertEquals(observer.wait(), set([a, b, c]))
+
+
+    def test_inotify(self):
+        """
+        L{watch.InotifyObserver} reports Python files written below the
+        watched directories, including newly created ones.
+        """
+        try:
+            observer = watch.InotifyObserver([self.tempdir], iterSourcePaths)
+        except OSError:
+            return
+        try:
+            os.mkdir(os.path.join(self.tempdir, 'pkg'))
+            a = self.makeFile('a.py', 'x = 1\n')
+            self.makeFile('notes.txt', '')
+            b = self.makeFile(os.path.join('pkg', 'b.py'), '')
+            changed = set()
+            for i in range(5):
+                changed.update(observer.wait())
+                if changed == set([a, b]):
+                    break
+            self.assertEquals(changed, set([a, b]))
+        finally:
+            observer.close()
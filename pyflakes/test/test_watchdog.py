@@ -0,0 +1,58 @@
+"""
+Tests for L{pyflakes.watchdog}.
+"""
+
+import time
+import signal
+import threading
+
+from unittest import TestCase
+from pyflakes import watchdog
+
+
+def spin():
+    while True:
+        pass
+
+
+
+class CallWithTimeoutTests(TestCase):
+    """
+    Tests for L{watchdog.callWithTimeout}.
+    """
+
+    def setUp(self):
+        if not watchdog.canInterrupt():
+            self.skipTest('SIGALRM timers are not available')
+
+
+    def test_inTime(self):
+        self.assertEquals(watchdog.callWithTimeout(5, max, 1, 2), 2)
+
+
+    def test_timeout(self):
+        """
+        Code running too long is interrupted, and the timer and the previous
+        handler are restored.
+        """
+        handler = signal.getsignal(signal.SIGALRM)
+        start = time.time()
+        self.assertRaises(watchdog.Timeout, watchdog.callWithTimeout, 0.1,
+                          spin)
+        self.assertTrue(time.time() - start < 5)
+        self.assertIs(signal.getsignal(signal.SIGALRM), handler)
+        self.assertEquals(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+
+    def test_otherThreads(self):
+        """
+        In other threads than the main one, code runs without limit.
+        """
+        outcome = []
+        def run():
+            outcome.append(watchdog.canInterrupt())
+            outcome.append(watchdog.callWithTimeout(0.01, time.sleep, 0.1))
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        self.assertEquals(outcome, [False, None])
@@ -0,0 +1,190 @@
+# -*- test-case-name: pyflakes.test.test_vcs -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Asking the local git repository which files and lines to check.
+"""
+
+import os
+import re
+import sys
+import subprocess
+from bisect import bisect_right
+
+
+class GitError(Exception):
+    """
+    Raised when git cannot be run or fails.
+    """
+
+
+
+def git(args, cwd=None):
+    """
+    Run git with C{args} and return its output.
+
+    @raise GitError: If git is missing or exits with an error.
+    """
+    try:
+        process = subprocess.Popen(['git'] + list(args), cwd=cwd,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+    except OSError, e:
+        raise GitError('cannot run git: %s' % (e.strerror,))
+    out, err = process.communicate()
+    if process.returncode:
+        raise GitError(err.strip() or 'git %s failed' % (args[0],))
+    return out
+
+
+def topLevel(cwd=None):
+    """
+    Return the root of the working tree containing C{cwd}.
+    """
+    return git(['rev-parse', '--show-toplevel'], cwd).rstrip('\n')
+
+
+_hunk = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+def parseDiff(diff, root):
+    """
+    Parse the output of C{git diff -U0} into a mapping of the paths of
+    changed Python files, below C{root}, to the sorted list of
+    C{(first, last)} ranges of lines added or changed in them.
+    """
+    changes = {}
+    ranges = None
+    for line in diff.splitlines():
+        if line.startswith('+++ '):
+            name = line[4:]
+            if name.startswith('b/') and name.endswith('.py'):
+                ranges = changes.setdefault(
+                    os.path.join(root, name[2:]), [])
+            else:
+                ranges = None
+        elif line.startswith('@@') and ranges is not None:
+            match = _hunk.match(line)
+            if match:
+                start = int(match.group(1))
+                count = match.group(2)
+                count = 1 if count is None else int(count)
+                if count:
+                    ranges.append((start, start + count - 1))
+    for path, ranges in changes.items():
+        if ranges:
+            ranges.sort()
+        else:
+            # only deletions; nothing to report on
+            del changes[path]
+    return changes
+
+
+def _relativePath(path):
+    """
+    Return C{path} relative to the current directory, like
+    C{os.path.relpath}, which Python 2.5 lacks.
+    """
+    pathParts = [part for part in os.path.abspath(path).split(os.sep) if part]
+    hereParts = [part for part in os.getcwd().split(os.sep) if part]
+    common = 0
+    for pathPart, herePart in zip(pathParts, hereParts):
+        if pathPart != herePart:
+            break
+        common += 1
+    parts = [os.pardir] * (len(hereParts) - common) + pathParts[common:]
+    if not parts:
+        return os.curdir
+    return os.path.join(*parts)
+
+
+def changedLines(base, paths=()):
+    """
+    Return the changed lines of Python files in the working tree compared to
+    the revision C{base}, as L{parseDiff} does, keyed by paths relative to
+    the current directory.  If C{paths} are given, only changes below them
+    are considered.
+    """
+    root = topLevel()
+    # the prefixes parseDiff expects, whatever diff.noprefix and
+    # diff.mnemonicPrefix say
+    diff = git(['diff', '--no-color', '--no-ext-diff', '--no-renames',
+                '--src-prefix=a/', '--dst-prefix=b/', '-U0',
+                '--diff-filter=AM', base, '--'] + list(paths))
+    changes = {}
+    for path, ranges in parseDiff(diff, root).iteritems():
+        changes[_relativePath(path)] = ranges
+    return changes
+
+
+class IndexedFile(object):
+    """
+    A file tracked by git.
+
+    @ivar path: The path of the file, relative to the current directory.
+
+    @ivar blob: The SHA-1 of the blob the index records for the file, or
+        C{None} if the file in the working tree may differ from it.
+    """
+
+    def __init__(self, path, blob=None):
+        self.path = path
+        self.blob = blob
+
+
+    def __repr__(self):
+        return 'IndexedFile(%r, %r)' % (self.path, self.blob)
+
+
+
+def _lsFiles(args, paths):
+    return git(['ls-files', '-z'] + args + ['--'] + list(paths)
+               ).split('\0')[:-1]
+
+
+def indexedFiles(paths=()):
+    """
+    Return an L{IndexedFile} for each Python file in the git index below
+    the current directory, or below C{paths} if given, in index order.
+
+    Files git finds modified keep no blob, and deleted ones are left out.
+    Git decides this from the stat data it keeps in the index, so files
+    which are unchanged are not read.
+    """
+    deleted = set(_lsFiles(['--deleted'], paths))
+    modified = set(_lsFiles(['--modified'], paths))
+    files = []
+    seen = set()
+    for entry in _lsFiles(['--stage'], paths):
+        info, path = entry.split('\t', 1)
+        mode, blob, stage = info.split()
+        if (not path.endswith('.py') or path in deleted or path in seen or
+            not mode.startswith('100')):
+            # links, submodules and the other sides of a conflict
+            continue
+        seen.add(path)
+        if path in modified or stage != '0':
+            blob = None
+        files.append(IndexedFile(path, blob))
+    return files
+
+
+def inRanges(lineno, ranges):
+    """
+    Return whether C{lineno} lies within one of the sorted, non-overlapping
+    C{(first, last)} C{ranges}.
+    """
+    index = bisect_right(ranges, (lineno, sys.maxint)) - 1
+    return index >= 0 and lineno <= ranges[index][1]
+
+
+def restrictToLines(result, ranges):
+    """
+    Drop the messages of C{result} which are not about one of the lines in
+    C{ranges}.  Problems which prevented the file from being checked are
+    kept, wherever they are.
+    """
+    result.messages = [message for message in result.messages
+                       if inRanges(message.lineno, ranges)]
+    return result
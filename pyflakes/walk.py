@@ -0,0 +1,112 @@
+# -*- test-case-name: pyflakes.test.test_walk -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Finding the files to check below a directory, without descending into
+excluded directories.
+"""
+
+import os
+import re
+import fnmatch
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+DEFAULT_EXCLUDE = ('.svn', 'CVS', '.bzr', '.hg', '.git', '__pycache__',
+                   '.tox', '.nox', '.eggs', '*.egg', '.venv', 'node_modules')
+
+
+def _translate(pattern):
+    regex = fnmatch.translate(pattern)
+    # fnmatch anchors and flags each pattern; that is done once for all
+    if regex.endswith('\\Z(?ms)'):
+        regex = regex[:-len('\\Z(?ms)')]
+    return regex
+
+
+def compileExclude(patterns):
+    """
+    Compile the glob C{patterns} into a single predicate taking the path and
+    the base name of a file or directory and telling whether it is excluded.
+
+    Patterns without a path separator are matched against base names, the
+    others against absolute paths.
+
+    @return: The predicate, or C{None} if there are no patterns.
+    """
+    names = []
+    paths = []
+    for pattern in patterns:
+        if os.sep in pattern or '/' in pattern:
+            paths.append(_translate(os.path.abspath(pattern)))
+        else:
+            names.append(_translate(pattern))
+    if not (names or paths):
+        return None
+    nameMatch = pathMatch = None
+    if names:
+        nameMatch = re.compile('(?:%s)\\Z' % '|'.join(names), re.S).match
+    if paths:
+        pathMatch = re.compile('(?:%s)\\Z' % '|'.join(paths), re.S).match
+
+    def excluded(path, name):
+        if nameMatch is not None and nameMatch(name):
+            return True
+        return pathMatch is not None and bool(
+            pathMatch(os.path.abspath(path)))
+    return excluded
+
+
+def _entries(directory):
+    """
+    Return the names in C{directory} along with whether each is a directory
+    which may be descended into.
+    """
+    if scandir is not None:
+        # the type comes with the directory entry, so there is no stat
+        return [(entry.name, entry.is_dir() and not entry.is_symlink())
+                for entry in scandir(directory)]
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        entries.append((name, os.path.isdir(path) and not os.path.islink(path)))
+    return entries
+
+
+def walk(top, exclude=None):
+    """
+    Yield a C{(dirpath, filenames)} pair for C{top} and every directory
+    below it, parents first and in sorted order, like C{os.walk}.
+
+    Entries for which the C{exclude} predicate from L{compileExclude} is
+    true are left out, and excluded directories are not even listed.
+    Symbolic links to directories are not followed.
+    """
+    stack = [top]
+    while stack:
+        dirpath = stack.pop()
+        try:
+            entries = _entries(dirpath)
+        except OSError:
+            continue
+        entries.sort()
+        filenames = []
+        subdirs = []
+        for name, isdir in entries:
+            path = os.path.join(dirpath, name)
+            if exclude is not None and exclude(path, name):
+                continue
+            if isdir:
+                subdirs.append(path)
+            else:
+                filenames.append(name)
+        yield dirpath, filenames
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,348 @@
+# -*- test-case-name: pyflakes.test.test_watch -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Continuously re-check files as they change.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+from pyflakes import walk
+
+
+def _entries(result):
+    """
+    Return one line of text for each warning or problem in C{result}, as
+    compared between successive checks of a file.
+    """
+    if result.ioError is not None:
+        return ['%s: %s' % (result.filename, result.ioError)]
+    if result.timedOut:
+        return ['%s: timed out' % (result.filename,)]
+    if result.syntaxError is not None:
+        msg, lineno, offset, line = result.syntaxError
+        if line is None:
+            return ['%s: problem decoding source' % (result.filename,)]
+        return ['%s:%d: %s' % (result.filename, lineno, msg)]
+    return [str(message) for message in result.messages]
+
+
+def _difference(old, new):
+    """
+    Return the items of C{new} not in C{old} and those of C{old} not in
+    C{new}, counting repeated items.
+    """
+    counts = {}
+    for entry in old:
+        counts[entry] = counts.get(entry, 0) + 1
+    added = []
+    for entry in new:
+        if counts.get(entry):
+            counts[entry] -= 1
+        else:
+            added.append(entry)
+    removed = []
+    for entry in old:
+        if counts.get(entry):
+            counts[entry] -= 1
+            removed.append(entry)
+    return added, removed
+
+
+
+class PollingObserver(object):
+    """
+    I notice changes to Python files by walking the watched paths at regular
+    intervals and comparing modification times and sizes.
+    """
+
+    def __init__(self, paths, listPaths, interval=1.0):
+        self.paths = paths
+        self.listPaths = listPaths
+        self.interval = interval
+        self.snapshot = self._scan()
+
+
+    def _scan(self):
+        snapshot = {}
+        for path in self.listPaths(self.paths):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime, st.st_size, st.st_ino)
+        return snapshot
+
+
+    def wait(self):
+        """
+        Block until some files changed, and return the set of their paths.
+        """
+        while True:
+            time.sleep(self.interval)
+            snapshot = self._scan()
+            changed = set(path for path in snapshot
+                          if self.snapshot.get(path) != snapshot[path])
+            changed.update(path for path in self.snapshot
+                           if path not in snapshot)
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+
+    def close(self):
+        pass
+
+
+
+class InotifyObserver(object):
+    """
+    I notice changes to Python files using the Linux inotify interface,
+    watching every directory below the watched paths.
+
+    @ivar settle: Seconds to keep collecting events after the first one, so
+        that an editor's save, which may take several writes and renames, is
+        handled as one change.
+
+    @ivar exclude: C{None}, or a predicate from
+        L{pyflakes.walk.compileExclude} for files and directories to ignore.
+    """
+
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+
+    MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+    _header = struct.Struct('iIII')
+
+    def __init__(self, paths, listPaths, settle=0.05, exclude=None):
+        libc = _libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._libc = libc
+        self.listPaths = listPaths
+        self.settle = settle
+        self.exclude = exclude
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        self.directories = {}
+        # explicitly named files are watched through their directory
+        self.files = {}
+        self.paths = paths
+        for path in paths:
+            if os.path.isdir(path):
+                for dirpath, filenames in walk.walk(path, exclude):
+                    self._addWatch(dirpath)
+            else:
+                self.files[os.path.normpath(path)] = path
+                self._addWatch(os.path.dirname(path) or os.curdir)
+
+
+    def _addWatch(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, directory, self.MASK)
+        if wd >= 0:
+            self.directories[wd] = directory
+
+
+    def _inTree(self, directory):
+        directory = os.path.normpath(directory)
+        for path in self.paths:
+            path = os.path.normpath(path)
+            if directory == path or directory.startswith(path + os.sep):
+                return True
+        return False
+
+
+    def _read(self, timeout):
+        """
+        Read pending events, waiting at most C{timeout} seconds (forever if
+        C{None}) for the first one.  Return the set of affected paths, or
+        C{None} if events were lost and everything should be rescanned.
+        """
+        ready = select.select([self.fd], [], [], timeout)[0]
+        if not ready:
+            return set()
+        data = os.read(self.fd, 65536)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self._header.unpack_from(data, offset)
+            offset += self._header.size
+            name = data[offset:offset + length].rstrip('\0')
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self.directories[wd]
+            elif mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # pick up files which appeared before the watch did
+                    new = os.path.join(directory, name)
+                    if self.exclude is not None and self.exclude(new, name):
+                        continue
+                    for dirpath, filenames in walk.walk(new, self.exclude):
+                        self._addWatch(dirpath)
+                    changed.update(self.listPaths([new]))
+            elif name:
+                path = os.path.join(directory, name)
+                if os.path.normpath(path) in self.files:
+                    changed.add(self.files[os.path.normpath(path)])
+                elif (name.endswith('.py') and self._inTree(directory) and
+                      (self.exclude is None or not self.exclude(path, name))):
+                    changed.add(path)
+        return changed
+
+
+    def wait(self):
+        """
+        Block until some files changed, and return the set of their paths,
+        or C{None} if events were lost.
+        """
+        while True:
+            changed = self._read(None)
+            while changed:
+                more = self._read(self.settle)
+                if more is None:
+                    return None
+                if not more:
+                    break
+                changed.update(more)
+            if changed is None or changed:
+                return changed
+
+
+    def close(self):
+        os.close(self.fd)
+
+
+
+def _libc():
+    """
+    Return the C library if it provides inotify, otherwise C{None}.
+    """
+    if ctypes is None or not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+
+def makeObserver(paths, listPaths, interval=1.0, exclude=None):
+    """
+    Return an inotify observer for C{paths} if possible, otherwise a polling
+    one which looks every C{interval} seconds.  The inotify observer does not
+    watch the directories the C{exclude} predicate rejects.
+    """
+    try:
+        return InotifyObserver(paths, listPaths, exclude=exclude)
+    except OSError:
+        return PollingObserver(paths, listPaths, interval)
+
+
+
+class Watcher(object):
+    """
+    I keep the results of checking a set of files and report how they change
+    when files do.
+
+    @ivar checkFile: Called with a path to check it, returning a
+        L{pyflakes.scripts.pyflakes.FileResult}.
+
+    @ivar entries: Mapping of each checked path to the L{_entries} of its
+        latest result.
+    """
+
+    def __init__(self, checkFile, stdout=None, record=None):
+        self.checkFile = checkFile
+        self.stdout = stdout
+        self.record = record
+        self.entries = {}
+
+
+    def count(self):
+        """
+        The number of warnings in the latest results of all files.
+        """
+        return sum(map(len, self.entries.itervalues()))
+
+
+    def checkAll(self, paths):
+        """
+        Check all of C{paths}, reporting the results in full.
+        """
+        for path in paths:
+            result = self.checkFile(path)
+            if self.record is not None:
+                self.record(result)
+            self.entries[path] = _entries(result)
+            result.report(self.stdout, self.stdout)
+
+
+    def update(self, paths):
+        """
+        Re-check the changed C{paths} and report warnings which appeared,
+        prefixed with C{+}, and warnings which went away, prefixed with C{-}.
+        Paths which no longer exist are forgotten.
+        """
+        for path in sorted(paths):
+            old = self.entries.pop(path, [])
+            if os.path.exists(path):
+                result = self.checkFile(path)
+                if self.record is not None:
+                    self.record(result)
+                new = self.entries[path] = _entries(result)
+            else:
+                new = []
+            added, removed = _difference(old, new)
+            for entry in removed:
+                print >> self.stdout, '-', entry
+            for entry in added:
+                print >> self.stdout, '+', entry
+
+
+    def run(self, paths, observer):
+        """
+        Check C{paths}, then keep re-checking whatever C{observer} reports as
+        changed until interrupted.
+        """
+        try:
+            self.checkAll(observer.listPaths(paths))
+            while True:
+                (self.stdout or sys.stdout).flush()
+                changed = observer.wait()
+                if changed is None:
+                    changed = set(self.entries)
+                    changed.update(observer.listPaths(paths))
+                self.update(changed)
+        finally:
+            observer.close()
@@ -0,0 +1,53 @@
+# -*- test-case-name: pyflakes.test.test_watchdog -*-
+# (c) 2005-2010 Divmod, Inc.
+# See LICENSE file for details
+
+"""
+Limiting how long checking a single file may take.
+"""
+
+import signal
+import threading
+
+
+class Timeout(Exception):
+    """
+    Raised in the code run by L{callWithTimeout} once it has taken too long.
+    """
+
+
+
+def canInterrupt():
+    """
+    Return whether L{callWithTimeout} can interrupt code in the current
+    thread.
+    """
+    return (hasattr(signal, 'setitimer') and
+            isinstance(threading.current_thread(), threading._MainThread))
+
+
+def callWithTimeout(timeout, function, *args, **kwargs):
+    """
+    Call C{function} with C{args} and C{kwargs}, and raise L{Timeout} in it
+    once C{timeout} seconds have passed.
+
+    The watchdog is a C{SIGALRM} timer, which only the main thread of a
+    process receives.  Elsewhere, and on platforms without one, C{function}
+    runs without limit.  Code running in C, such as the compiler, is only
+    interrupted once it returns to Python.  Elsewhere L{Timeout} may be
+    raised between any two bytecodes, so state which outlives the call has
+    to be reset by the caller when it is.
+    """
+    if not canInterrupt():
+        return function(*args, **kwargs)
+    def expired(signum, frame):
+        raise Timeout(timeout)
+    previous = signal.signal(signal.SIGALRM, expired)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        signal.signal(signal.SIGALRM, previous)
@@ -13,7 +13,7 @@ setup(
     maintainer_email="moe@divmod.com",
     url="http://www.divmod.org/trac/wiki/DivmodPyflakes",
     packages=["pyflakes", "pyflakes.scripts", "pyflakes.test"],
-    scripts=["bin/pyflakes"],
+    scripts=["bin/pyflakes", "bin/pyflakesd", "bin/pyflakes-client"],
     long_description="""Pyflakes is program to analyze Python programs and detect various errors. It
 works by parsing the source file, not importing it, so it is safe to use on
 modules with side effects. It's also much faster.""",